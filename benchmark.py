@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Verilog symbol tools.
+Times the single-pass parse_verilog_module() against the original regex
+implementation (parse_verilog_module_reference) on real Verilog files.
+
+With --suite, the whole pipeline (read, parse, render, compact render,
+write, combine) is timed on synthetic netlists of 10 to 100k ports (ANSI,
+non-ANSI, parameterized and multi-module) and on the real files, and
+throughput, peak memory, SVG sizes and per-stage timings are reported as
+JSON.
+
+With --large, a flat netlist of the given size in MB is parsed in child
+processes through a str read and through the memory-mapped path, and the
+time and peak RSS of each are reported.
+"""
+
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import contextlib
+import platform
+import subprocess
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from verilog_to_svg import (GENERATOR_VERSION, parse_verilog_module, parse_verilog_module_reference,
+                            parse_verilog_modules, parse_verilog_file_modules, generate_svg,
+                            expand_verilog_paths)
+from combine_svgs import combine
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Directories benchmarked when no paths are given
+DEFAULT_PATHS = ['source', 'adc/verilog']
+
+# Port counts of the synthetic netlists
+DEFAULT_SCALES = [10, 100, 1000, 10000, 100000]
+
+# Synthetic port list styles
+STYLES = ('ansi', 'non-ansi', 'param', 'multi')
+
+# The reference parser is quadratic on non-ANSI port lists; skip it above this
+REFERENCE_PORT_LIMIT = 10000
+
+# Modules per file for the 'multi' style
+MULTI_MODULES = 8
+
+# Ports of the flat netlist written for --large
+LARGE_PORTS = 1000
+
+def time_call(func, arg, repeat):
+    """Return (best wall-clock seconds, result) over repeat calls of func(arg)."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            result = func(arg)
+        except ValueError as e:
+            result = ('error', str(e))
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def benchmark_parser(files, repeat):
+    """Compare both parser implementations on each file and print a table."""
+    print(f"\n{'='*70}")
+    print(f"Parser benchmark: {len(files)} file(s), best of {repeat}")
+    print(f"{'='*70}")
+    print(f"{'File':<34}{'KB':>7}{'reference ms':>14}{'single-pass ms':>16}{'speedup':>9}")
+    print(f"{'─'*80}")
+    
+    total_ref = 0.0
+    total_new = 0.0
+    mismatches = []
+    
+    for verilog_file in files:
+        verilog_code = verilog_file.read_text()
+        ref_time, ref_result = time_call(parse_verilog_module_reference, verilog_code, repeat)
+        new_time, new_result = time_call(parse_verilog_module, verilog_code, repeat)
+        total_ref += ref_time
+        total_new += new_time
+        if ref_result != new_result:
+            mismatches.append(verilog_file)
+        
+        speedup = ref_time / new_time if new_time else float('inf')
+        print(f"{verilog_file.name:<34}{len(verilog_code) / 1024:>7.1f}"
+              f"{ref_time * 1e3:>14.3f}{new_time * 1e3:>16.3f}{speedup:>8.1f}x")
+    
+    print(f"{'─'*80}")
+    speedup = total_ref / total_new if total_new else float('inf')
+    print(f"{'TOTAL':<41}{total_ref * 1e3:>14.3f}{total_new * 1e3:>16.3f}{speedup:>8.1f}x")
+    
+    if mismatches:
+        print(f"\n⚠️  Port lists differ from the reference for {len(mismatches)} file(s):")
+        for verilog_file in mismatches:
+            print(f"    {verilog_file}")
+    print()
+
+def _port_width(index):
+    """Deterministic mix of scalar and bus ports."""
+    return (1, 1, 8, 1, 16, 4, 1, 32)[index % 8]
+
+def _port_range(index, param=False):
+    width = _port_width(index)
+    if width == 1:
+        return ''
+    if param and index % 3 == 0:
+        return '[WIDTH-1:0] '
+    return f'[{width - 1}:0] '
+
+def _port_direction(index):
+    return 'inout' if index % 50 == 49 else ('input', 'output')[index % 2]
+
+def synthetic_module(name, ports, style='ansi', rng=None):
+    """Return Verilog source for one module with the given number of ports.
+    
+    style is 'ansi' (directions in the header), 'non-ansi' (names in the
+    header, declarations in the body) or 'param' (ANSI with a #() parameter
+    list and parameterized widths). A few cell instances and comments are
+    added to the body so body scanning is exercised as well.
+    """
+    rng = rng or random.Random(ports)
+    param = style == 'param'
+    lines = [f'// Synthetic {style} module, {ports} ports']
+    if param:
+        lines.append(f'module {name} #(')
+        lines.append('    parameter WIDTH = 8,')
+        lines.append('    parameter DEPTH = 16')
+        lines.append(')(')
+    else:
+        lines.append(f'module {name} (')
+    
+    names = [f'p{i}_{rng.randrange(1 << 16):04x}' for i in range(ports)]
+    if style == 'non-ansi':
+        for i, port in enumerate(names):
+            lines.append(f'    {port}{"," if i < ports - 1 else ""}')
+        lines.append(');')
+        for i, port in enumerate(names):
+            if i % 64 == 0:
+                lines.append(f'// Section {i // 64}')
+            lines.append(f'{_port_direction(i)} {_port_range(i)}{port};')
+    else:
+        for i, port in enumerate(names):
+            if i % 64 == 0:
+                lines.append(f'    // Section {i // 64}')
+            kind = 'reg' if _port_direction(i) == 'output' and i % 4 == 1 else 'wire'
+            lines.append(f'    {_port_direction(i)} {kind} {_port_range(i, param)}{port}'
+                         f'{"," if i < ports - 1 else ""}')
+        lines.append(');')
+    
+    # Some body content: internal wires and cell instances
+    for i in range(min(ports, 64)):
+        lines.append(f'wire n{i};')
+        lines.append(f'INVX1 u{i} (.A({names[i]}), .Y(n{i}));')
+    lines.append('endmodule')
+    lines.append('')
+    return '\n'.join(lines)
+
+def synthetic_source(ports, style):
+    """Return (source text, module count) for a synthetic netlist file."""
+    rng = random.Random(f'{style}-{ports}')
+    if style == 'multi':
+        per_module = max(1, ports // MULTI_MODULES)
+        modules = [synthetic_module(f'cell_{m}', per_module, ('ansi', 'non-ansi')[m % 2], rng)
+                   for m in range(MULTI_MODULES)]
+        return '\n'.join(modules), MULTI_MODULES
+    return synthetic_module(f'bench_{style.replace("-", "_")}_{ports}', ports, style, rng), 1
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KB elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def time_stage(func, repeat):
+    """Return (best wall-clock seconds, result) over repeat calls of func()."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def measure_peak(func):
+    """Return the peak Python allocation in bytes of one call of func().
+    
+    Run separately from the timed calls, as tracemalloc slows allocation.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def benchmark_pipeline(name, sources, work_dir, repeat, reference=True, memory=True):
+    """Time each pipeline stage over a list of Verilog files.
+    
+    sources is a list of paths to existing .v files. Returns a result record
+    with per-stage seconds, throughput and peak allocation per stage.
+    """
+    out_dir = work_dir / name
+    out_dir.mkdir(parents=True, exist_ok=True)
+    
+    def read():
+        return [source.read_text() for source in sources]
+    
+    def parse():
+        return [module for code in texts for module in parse_verilog_modules(code)]
+    
+    def parse_reference():
+        results = []
+        for code in texts:
+            try:
+                results.append(parse_verilog_module_reference(code))
+            except ValueError:
+                pass
+        return results
+    
+    def render():
+        return [(module_name, generate_svg(module_name, inputs, outputs))
+                for module_name, inputs, outputs in modules]
+    
+    def render_compact():
+        return [(module_name, generate_svg(module_name, inputs, outputs, compact=True))
+                for module_name, inputs, outputs in modules]
+    
+    def write():
+        paths = []
+        for index, (module_name, svg) in enumerate(svgs):
+            path = out_dir / f'{index:04d}_{module_name}_symbol.svg'
+            path.write_text(svg)
+            paths.append(path)
+        return paths
+    
+    def combine_tree():
+        return combine(svg_paths, work_dir / f'{name}_tree.svg')
+    
+    def combine_stream():
+        return combine(svg_paths, work_dir / f'{name}_stream.svg', stream=True)
+    
+    stages = {}
+    stages['read'], texts = time_stage(read, repeat)
+    stages['parse'], modules = time_stage(parse, repeat)
+    if reference:
+        stages['parse_reference'], _ = time_stage(parse_reference, repeat)
+    stages['render'], svgs = time_stage(render, repeat)
+    stages['render_compact'], compact_svgs = time_stage(render_compact, repeat)
+    stages['write'], svg_paths = time_stage(write, repeat)
+    if svg_paths:
+        stages['combine_tree'], _ = time_stage(combine_tree, repeat)
+        stages['combine_stream'], _ = time_stage(combine_stream, repeat)
+    
+    peaks = {}
+    if memory:
+        peaks['parse'] = measure_peak(parse)
+        peaks['render'] = measure_peak(render)
+        peaks['render_compact'] = measure_peak(render_compact)
+        if svg_paths:
+            peaks['combine_tree'] = measure_peak(combine_tree)
+            peaks['combine_stream'] = measure_peak(combine_stream)
+    
+    size = sum(len(code.encode()) for code in texts)
+    ports = sum(len(inputs) + len(outputs) for _, inputs, outputs in modules)
+    # Reading through rendering; combining scales with symbols, not source size
+    pipeline = stages['read'] + stages['parse'] + stages['render'] + stages['write']
+    mb = size / 1e6
+    return {
+        'name': name,
+        'files': len(sources),
+        'modules': len(modules),
+        'ports': ports,
+        'bytes': size,
+        'stages': stages,
+        'svg_bytes': {
+            'default': sum(len(svg) for _, svg in svgs),
+            'compact': sum(len(svg) for _, svg in compact_svgs),
+        },
+        'throughput': {
+            'parse_mb_s': mb / stages['parse'] if stages['parse'] else None,
+            'pipeline_mb_s': mb / pipeline if pipeline else None,
+            'files_s': len(sources) / pipeline if pipeline else None,
+            'ports_s': ports / stages['parse'] if stages['parse'] else None,
+        },
+        'peak_alloc_bytes': peaks,
+    }
+
+def write_large_netlist(path, megabytes):
+    """Write a flat non-ANSI netlist of about megabytes MB to path.
+    
+    A port list and its declarations are followed by cell instances until
+    the size is reached, like a synthesised top level.
+    """
+    rng = random.Random(megabytes)
+    header, _ = synthetic_source(LARGE_PORTS, 'non-ansi')
+    header = header[:header.rindex('endmodule')]
+    target = megabytes * 1024 * 1024
+    with open(path, 'w') as f:
+        f.write(header)
+        size = len(header)
+        cell = 0
+        while size < target:
+            lines = []
+            for _ in range(1000):
+                lines.append(f'ND2D1 u{cell} (.A1(n{rng.randrange(1 << 20)}), .A2(n{cell}), '
+                             f'.ZN(n{cell + 1}));  // cell {cell}\n')
+                cell += 1
+            chunk = ''.join(lines)
+            f.write(chunk)
+            size += len(chunk)
+        f.write('endmodule\n')
+
+def measure_child(mode, path):
+    """Parse path in this process by mode ('str' or 'mmap'); return timing and peak RSS."""
+    start = time.perf_counter()
+    if mode == 'str':
+        with open(path, 'r') as f:
+            modules = list(parse_verilog_modules(f.read()))
+    elif mode == 'mmap':
+        modules = list(parse_verilog_file_modules(path))
+    else:
+        modules = []
+    return {
+        'mode': mode,
+        'seconds': time.perf_counter() - start,
+        'modules': len(modules),
+        'ports': sum(len(inputs) + len(outputs) for _, inputs, outputs in modules),
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+def run_large(megabytes, work_dir):
+    """Compare the str and memory-mapped parse paths on a large netlist."""
+    path = work_dir / f'large_{megabytes}mb.v'
+    print(f"\nWriting {megabytes} MB netlist...")
+    write_large_netlist(path, megabytes)
+    size = path.stat().st_size
+    
+    print(f"\n{'='*70}")
+    print(f"Large netlist: {size / 1e6:.1f} MB, each mode in a fresh process")
+    print(f"{'='*70}")
+    print(f"{'Mode':<12}{'seconds':>10}{'MB/s':>10}{'peak RSS MB':>14}{'ports':>10}")
+    print(f"{'─'*70}")
+    results = []
+    # 'baseline' only imports the tools, to show the interpreter's own RSS
+    for mode in ('baseline', 'str', 'mmap'):
+        child = subprocess.run([sys.executable, __file__, '--child', mode, str(path)],
+                               capture_output=True, text=True, check=True)
+        result = json.loads(child.stdout)
+        results.append(result)
+        rss = result['peak_rss_kb']
+        rate = size / 1e6 / result['seconds'] if mode != 'baseline' and result['seconds'] else 0
+        print(f"{mode:<12}{result['seconds']:>10.3f}{rate:>10.1f}"
+              f"{rss / 1024 if rss is not None else float('nan'):>14.1f}{result['ports']:>10}")
+    print(f"{'─'*70}")
+    return {'bytes': size, 'results': results}
+
+def print_case(case):
+    stages = case['stages']
+    throughput = case['throughput']
+    cells = ''.join(f"{stages[stage] * 1e3:>10.2f}" if stage in stages else f"{'-':>10}"
+                    for stage in ('parse', 'parse_reference', 'render', 'render_compact', 'write',
+                                  'combine_stream'))
+    print(f"{case['name']:<24}{case['bytes'] / 1024:>9.1f}{case['ports']:>8}{cells}"
+          f"{throughput['parse_mb_s'] or 0:>9.1f}")
+
+def run_suite(files, scales, styles, repeat, work_dir, memory=True):
+    """Run the synthetic and real-file pipeline benchmarks; return the report dict."""
+    print(f"\n{'='*102}")
+    print(f"Pipeline benchmark: best of {repeat}, stage times in ms")
+    print(f"{'='*102}")
+    print(f"{'Case':<24}{'KB':>9}{'ports':>8}{'parse':>10}{'reference':>10}{'render':>10}"
+          f"{'compact':>10}{'write':>10}{'combine':>10}{'MB/s':>9}")
+    print(f"{'─'*102}")
+    
+    cases = []
+    source_dir = work_dir / 'verilog'
+    source_dir.mkdir(parents=True, exist_ok=True)
+    for style in styles:
+        for ports in scales:
+            code, _ = synthetic_source(ports, style)
+            source = source_dir / f'{style}_{ports}.v'
+            source.write_text(code)
+            case = benchmark_pipeline(f'{style}_{ports}', [source], work_dir, repeat,
+                                      reference=ports <= REFERENCE_PORT_LIMIT, memory=memory)
+            case.update(kind='synthetic', style=style)
+            cases.append(case)
+            print_case(case)
+            # Large synthetic outputs are not needed once measured
+            for path in (work_dir / case['name']).iterdir():
+                path.unlink()
+    
+    if files:
+        case = benchmark_pipeline('real_files', files, work_dir, repeat, memory=memory)
+        case.update(kind='real', paths=[str(path) for path in files])
+        cases.append(case)
+        print_case(case)
+    print(f"{'─'*102}")
+    
+    report = {
+        'meta': {
+            'generator_version': GENERATOR_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'repeat': repeat,
+        },
+        'cases': cases,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+    if report['peak_rss_kb'] is not None:
+        print(f"Peak RSS: {report['peak_rss_kb'] / 1024:.1f} MB")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the Verilog port parser against the reference implementation',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Benchmark source/ and adc/verilog/
+  %(prog)s
+  
+  # Benchmark specific files or directories
+  %(prog)s source/TLM.v testbenches/
+  
+  # Full pipeline suite on synthetic netlists and source/, results as JSON
+  %(prog)s --suite --json bench.json source/
+  
+  # Quick suite on small netlists only
+  %(prog)s --suite --scales 10,100,1000 --repeat 3
+  
+  # Peak memory of str vs memory-mapped parsing on a 200 MB netlist
+  %(prog)s --large 200
+        """
+    )
+    parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS,
+                        help=f'Verilog files or directories (default: {" ".join(DEFAULT_PATHS)})')
+    parser.add_argument('-r', '--repeat', type=int,
+                        help='Number of timed runs per file; the best is reported (default: 20, 3 with --suite)')
+    parser.add_argument('--suite', action='store_true',
+                        help='Time the whole pipeline on synthetic netlists and the given files')
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help='Comma-separated synthetic port counts (default: %(default)s)')
+    parser.add_argument('--styles', default=','.join(STYLES),
+                        help='Comma-separated synthetic styles out of %(default)s')
+    parser.add_argument('--json', metavar='FILE',
+                        help='Write the suite results as JSON to FILE (- for stdout)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Skip the tracemalloc peak allocation measurements')
+    parser.add_argument('--large', type=int, metavar='MB',
+                        help='Compare str and memory-mapped parsing of a generated MB-sized netlist')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'FILE'), help=argparse.SUPPRESS)
+    
+    args = parser.parse_args()
+    
+    if args.child:
+        print(json.dumps(measure_child(*args.child)))
+        return
+    
+    if not args.suite and not args.large:
+        files = expand_verilog_paths(args.paths)
+        if not files:
+            print("No Verilog files (.v or .sv) found")
+            sys.exit(1)
+        benchmark_parser(files, max(1, args.repeat or 20))
+        return
+    
+    try:
+        scales = [int(scale) for scale in args.scales.split(',') if scale]
+    except ValueError:
+        parser.error(f"--scales must be comma-separated integers, got '{args.scales}'")
+    styles = [style for style in args.styles.split(',') if style]
+    unknown = set(styles) - set(STYLES)
+    if unknown:
+        parser.error(f"Unknown style(s): {', '.join(sorted(unknown))}")
+    
+    # JSON results on stdout move the tables and progress lines to stderr
+    json_out = sys.stdout
+    with contextlib.ExitStack() as stack:
+        if args.json == '-':
+            stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        work_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix='pepper_bench_'))
+        report = {}
+        if args.suite:
+            files = expand_verilog_paths(args.paths)
+            report = run_suite(files, scales, styles, max(1, args.repeat or 3), Path(work_dir),
+                               memory=not args.no_memory)
+        if args.large:
+            report['large'] = run_large(args.large, Path(work_dir))
+    
+    if args.json == '-':
+        json.dump(report, json_out, indent=2)
+        json_out.write('\n')
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to: {args.json}")
+
+if __name__ == '__main__':
+    main()
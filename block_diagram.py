@@ -0,0 +1,682 @@
+#!/usr/bin/env python3
+"""
+Hierarchy Block Diagram Generator
+Reads the module instantiations of a top-level Verilog module (e.g. TLM.v),
+builds a net connectivity index and draws the instances as a wired block
+diagram, placed in layers from left to right by signal flow.
+
+The layout is a Sugiyama-style layered drawing done in near-linear time:
+feedback edges are found with one DFS, layers by longest path in
+topological order, and the order inside each layer by a few barycenter
+sweeps. Long edges are routed through the channels between layers
+instead of through dummy nodes, so the work stays proportional to the
+number of pins even for thousands of instances.
+"""
+
+import re
+import sys
+import json
+import argparse
+from xml.sax.saxutils import escape, quoteattr
+
+from verilog_to_svg import (Port, scan_module, find_module, clean_span, split_top_level,
+                            declared_words, TYPE_KEYWORDS, expand_verilog_paths)
+
+# Statement openers that are never a module instantiation
+_KEYWORDS = TYPE_KEYWORDS | frozenset((
+    'module', 'endmodule', 'input', 'output', 'inout', 'assign', 'always', 'always_ff',
+    'always_comb', 'always_latch', 'initial', 'final', 'if', 'else', 'case', 'casez', 'casex',
+    'endcase', 'default', 'for', 'while', 'repeat', 'forever', 'begin', 'end', 'generate',
+    'endgenerate', 'genvar', 'parameter', 'localparam', 'defparam', 'function', 'endfunction',
+    'task', 'endtask', 'specify', 'endspecify', 'wait', 'disable', 'fork', 'join', 'return',
+    'force', 'release', 'deassign',
+))
+
+# Net types whose declarations may carry an initial assignment (wire x = a & b;)
+_NET_TYPES = frozenset(('wire', 'tri', 'wand', 'wor', 'uwire', 'logic'))
+
+# Block labels and generate constructs left over in front of a statement
+_LEADING_RE = re.compile(r'\s*(?:(?:begin|end|endgenerate|generate|else|endcase)\b'
+                         r'(?:\s*:\s*[A-Za-z_][\w$]*)?\s*)*')
+_IDENT_RE = re.compile(r'\s*([A-Za-z_][\w$]*|\\\S+)')
+# Identifiers in an expression; based literals (8'hFF) and $functions are skipped
+_EXPR_NAME_RE = re.compile(r"(?<![\w$'])[A-Za-z_][\w$]*")
+
+# Drawing configuration
+PIN_SPACING = 16
+BOX_MIN_WIDTH = 140
+BOX_PADDING = 34
+CHAR_WIDTH = 6.2
+NODE_GAP = 30
+CHANNEL_WIDTH = 140
+TRACK_SPACING = 5
+MARGIN = 60
+BARYCENTER_SWEEPS = 4
+
+class Instance:
+    """A module instantiation: instance name, module and pin connections.
+    
+    connections holds (pin, nets) pairs; pin is the port name for named
+    connections and its position for ordered ones, nets the names of the
+    nets the connection expression refers to.
+    """
+    __slots__ = ('module', 'name', 'parameters', 'connections')
+    
+    def __init__(self, module, name, parameters=None, connections=None):
+        self.module = module
+        self.name = name
+        self.parameters = parameters or {}
+        self.connections = connections or []
+    
+    def __repr__(self):
+        return f"Instance({self.module!r}, {self.name!r}, {len(self.connections)} connections)"
+
+def _expression_nets(expr):
+    """Names of the nets referenced by a connection or assignment expression."""
+    return [name for name in _EXPR_NAME_RE.findall(expr) if name not in _KEYWORDS]
+
+def _balanced_end(text, pos):
+    """Offset just past the ')' matching the '(' at text[pos], or -1."""
+    depth = 0
+    for i in range(pos, len(text)):
+        char = text[i]
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+def _named_arguments(text):
+    """Parse '.NAME(expr), ...' (or ordered 'expr, ...') into (key, expr) pairs."""
+    arguments = []
+    for index, item in enumerate(split_top_level(text)):
+        item = item.strip()
+        if not item:
+            continue
+        if item[0] == '.':
+            pin, paren, expr = item[1:].partition('(')
+            pin = pin.strip()
+            # '.name' alone connects the net of the same name
+            expr = expr.rpartition(')')[0] if paren else pin
+            arguments.append((pin, expr.strip()))
+        else:
+            arguments.append((index, item))
+    return arguments
+
+def _parse_instance(statement):
+    """Return an Instance for a 'Module #(...) name (...)' statement, or None."""
+    m = _IDENT_RE.match(statement)
+    if m is None or m.group(1) in _KEYWORDS:
+        return None
+    module = m.group(1)
+    pos = m.end()
+    while pos < len(statement) and statement[pos].isspace():
+        pos += 1
+    
+    parameters = {}
+    if statement.startswith('#', pos):
+        open_paren = statement.find('(', pos)
+        if open_paren == -1 or statement[pos + 1:open_paren].strip():
+            return None
+        close = _balanced_end(statement, open_paren)
+        if close == -1:
+            return None
+        parameters = {key: expr for key, expr in _named_arguments(statement[open_paren + 1:close - 1])}
+        pos = close
+    
+    m = _IDENT_RE.match(statement, pos)
+    if m is None or m.group(1) in _KEYWORDS:
+        return None
+    name = m.group(1)
+    rest = statement[m.end():].lstrip()
+    if rest.startswith('['):
+        # Instance array: u_cell [3:0] (...)
+        rest = rest[rest.find(']') + 1:].lstrip()
+    if not rest.startswith('(') or not rest.rstrip().endswith(')'):
+        return None
+    
+    connections = []
+    for pin, expr in _named_arguments(rest.rstrip()[1:-1]):
+        connections.append((pin, _expression_nets(expr)))
+    return Instance(module, name, parameters, connections)
+
+def parse_module_body(text, start, end):
+    """Read the instances and continuous assignments between start and end.
+    
+    Returns (instances, assigns) where assigns holds (target nets, source
+    nets) pairs from 'assign' statements and net declaration assignments.
+    Procedural (always/initial) logic is not traced.
+    """
+    instances = []
+    assigns = []
+    for statement in clean_span(text, start, end).split(';'):
+        statement = statement[_LEADING_RE.match(statement).end():]
+        if not statement:
+            continue
+        first = statement.split(None, 1)[0]
+        if first == 'assign' or (first in _NET_TYPES and '=' in statement):
+            body = statement[len(first):]
+            for item in split_top_level(body):
+                target, equals, source = item.partition('=')
+                if not equals:
+                    continue
+                if first == 'assign':
+                    targets = _expression_nets(target)
+                else:
+                    words = declared_words(target)
+                    targets = words[-1:]
+                assigns.append((targets, _expression_nets(source)))
+            continue
+        instance = _parse_instance(statement)
+        if instance is not None:
+            instances.append(instance)
+    return instances, assigns
+
+def load_design(paths):
+    """Parse every module in the given files and directories.
+    
+    Returns a dict: module name -> {'inputs', 'outputs' (Port records),
+    'instances', 'assigns', 'file'}.
+    """
+    design = {}
+    for verilog_file in expand_verilog_paths(paths):
+        try:
+            code = verilog_file.read_text()
+        except OSError as e:
+            print(f"Error reading file: {e}")
+            continue
+        pos = 0
+        while True:
+            start = find_module(code, pos)
+            if start == -1:
+                break
+            try:
+                module_name, inputs, outputs, end = scan_module(code, pos, records=True)
+            except ValueError as e:
+                print(f"Error parsing Verilog in {verilog_file}: {e}")
+                break
+            instances, assigns = parse_module_body(code, start, end)
+            design[module_name] = {
+                'inputs': inputs or [],
+                'outputs': outputs or [],
+                'instances': instances,
+                'assigns': assigns,
+                'file': str(verilog_file),
+            }
+            pos = end
+    return design
+
+def find_top(design):
+    """Name of the module with the most instances that nobody instantiates."""
+    instantiated = {instance.module for module in design.values() for instance in module['instances']}
+    candidates = [name for name, module in design.items()
+                  if module['instances'] and name not in instantiated]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda name: len(design[name]['instances']))
+
+def print_hierarchy(design, top, indent=0, seen=None):
+    """Print the instance tree below top."""
+    seen = seen or set()
+    if indent == 0:
+        print(f"🏗️  {top}")
+    seen = seen | {top}
+    for instance in design.get(top, {}).get('instances', []):
+        known = '' if instance.module in design else '  (no definition)'
+        print(f"{'    ' * (indent + 1)}└─ {instance.name}: {instance.module}{known}")
+        if instance.module in design and instance.module not in seen:
+            print_hierarchy(design, instance.module, indent + 1, seen)
+
+def _module_ports(design, module_name):
+    """Map port name -> Port for a module (inouts appear once)."""
+    module = design.get(module_name)
+    if module is None:
+        return {}
+    return {port.name: port for port in module['inputs'] + module['outputs']}
+
+def build_net_index(design, top):
+    """Index the nets of module top by the pins that drive and read them.
+    
+    Returns a dict: net -> {'drivers': [(node, pin)], 'sinks': [(node, pin)],
+    'sources': [net], 'width': bits or None}. Nodes are instance names, or
+    'in:NAME' / 'out:NAME' for the top-level ports. 'sources' lists the
+    nets a continuous assignment to this net reads from.
+    """
+    index = {}
+    
+    def entry(net):
+        record = index.get(net)
+        if record is None:
+            record = index[net] = {'drivers': [], 'sinks': [], 'bidir': [], 'sources': [], 'width': None}
+        return record
+    
+    module = design[top]
+    for port in module['inputs']:
+        record = entry(port.name)
+        record['drivers' if port.direction != 'inout' else 'bidir'].append((f"in:{port.name}", port.name))
+        record['width'] = port.width
+    for port in module['outputs']:
+        if port.direction == 'output':
+            record = entry(port.name)
+            record['sinks'].append((f"out:{port.name}", port.name))
+            record['width'] = port.width
+    
+    for instance in module['instances']:
+        ports = _module_ports(design, instance.module)
+        port_order = list(ports)
+        for pin, nets in instance.connections:
+            if pin == '*':
+                # .* connects every port to the net of the same name
+                for port in ports.values():
+                    _connect(entry(port.name), instance.name, port)
+                continue
+            if isinstance(pin, int):
+                pin = port_order[pin] if pin < len(port_order) else f"#{pin}"
+            port = ports.get(pin)
+            for net in nets:
+                _connect(entry(net), instance.name, port or Port(pin, None, '', None))
+    
+    for targets, sources in module['assigns']:
+        for net in targets:
+            entry(net)['sources'].extend(sources)
+        for net in sources:
+            entry(net)
+    
+    # Bidirectional and unknown pins read a driven net and drive an undriven one
+    for record in index.values():
+        bidir = record.pop('bidir')
+        if not bidir:
+            continue
+        if record['drivers'] or record['sources']:
+            record['sinks'].extend(bidir)
+        else:
+            record['drivers'].append(bidir[0])
+            record['sinks'].extend(bidir[1:])
+    return index
+
+def _connect(record, node, port):
+    if port.direction == 'output':
+        record['drivers'].append((node, port.name))
+    elif port.direction == 'input':
+        record['sinks'].append((node, port.name))
+    else:
+        record['bidir'].append((node, port.name))
+    if record['width'] is None and port.width and port.direction:
+        record['width'] = port.width
+
+def _effective_drivers(index):
+    """Drivers of every net, following continuous assignments back to pins."""
+    resolved = {}
+    for net in index:
+        if net in resolved:
+            continue
+        # Iterative DFS over 'sources' so long assign chains cannot overflow the stack
+        stack = [(net, iter(index[net]['sources']))]
+        on_stack = {net}
+        while stack:
+            current, pending = stack[-1]
+            for source in pending:
+                if source not in resolved and source not in on_stack and source in index:
+                    stack.append((source, iter(index[source]['sources'])))
+                    on_stack.add(source)
+                    break
+            else:
+                stack.pop()
+                on_stack.discard(current)
+                drivers = list(index[current]['drivers'])
+                for source in index[current]['sources']:
+                    drivers.extend(resolved.get(source, ()))
+                resolved[current] = list(dict.fromkeys(drivers))
+    return resolved
+
+def build_wires(index):
+    """List the point-to-point wires (driver node, pin, sink node, pin, net)."""
+    drivers = _effective_drivers(index)
+    wires = []
+    for net, record in index.items():
+        for driver in drivers[net]:
+            for sink in record['sinks']:
+                if driver[0] != sink[0]:
+                    wires.append((driver[0], driver[1], sink[0], sink[1], net))
+    return wires
+
+def layered_layout(nodes, wires):
+    """Assign each node a layer and an order inside its layer.
+    
+    Returns (layers, reversed_edges): layers is a list of node lists, left
+    to right, and reversed_edges the (u, v) edges that point backwards
+    (feedback). Runs in O((V + E) * sweeps + V log V).
+    """
+    successors = {node: [] for node in nodes}
+    predecessors = {node: [] for node in nodes}
+    for edge in dict.fromkeys((u, v) for u, _, v, _, _ in wires):
+        successors[edge[0]].append(edge[1])
+        predecessors[edge[1]].append(edge[0])
+    
+    # 1. Feedback edges: the back edges of a DFS started from the sources
+    reversed_edges = set()
+    state = dict.fromkeys(nodes, 0)  # 0 new, 1 on stack, 2 done
+    discovery = []
+    roots = [node for node in nodes if not predecessors[node]] + list(nodes)
+    for root in roots:
+        if state[root]:
+            continue
+        state[root] = 1
+        discovery.append(root)
+        stack = [(root, iter(successors[root]))]
+        while stack:
+            node, pending = stack[-1]
+            for succ in pending:
+                if state[succ] == 0:
+                    state[succ] = 1
+                    discovery.append(succ)
+                    stack.append((succ, iter(successors[succ])))
+                    break
+                if state[succ] == 1:
+                    reversed_edges.add((node, succ))
+            else:
+                state[node] = 2
+                stack.pop()
+    
+    # 2. Layers: longest path from the sources over the acyclic edges
+    forward = {node: [] for node in nodes}
+    indegree = dict.fromkeys(nodes, 0)
+    for u in nodes:
+        for v in successors[u]:
+            if (u, v) in reversed_edges:
+                u_, v_ = v, u
+            else:
+                u_, v_ = u, v
+            forward[u_].append(v_)
+            indegree[v_] += 1
+    layer = dict.fromkeys(nodes, 0)
+    ready = [node for node in nodes if indegree[node] == 0]
+    while ready:
+        node = ready.pop()
+        for succ in forward[node]:
+            layer[succ] = max(layer[succ], layer[node] + 1)
+            indegree[succ] -= 1
+            if indegree[succ] == 0:
+                ready.append(succ)
+    
+    # Top-level ports sit in the outermost layers
+    inner = [layer[node] for node in nodes if not node.startswith(('in:', 'out:'))]
+    last = max(inner, default=0) + 1
+    for node in nodes:
+        if node.startswith('in:'):
+            layer[node] = 0
+        elif node.startswith('out:'):
+            layer[node] = last
+    has_inputs = any(node.startswith('in:') for node in nodes)
+    if has_inputs and any(layer[node] == 0 for node in nodes if not node.startswith('in:')):
+        # Keep the input column to itself
+        for node in nodes:
+            if not node.startswith('in:'):
+                layer[node] += 1
+    
+    count = max(layer.values(), default=-1) + 1
+    layers = [[] for _ in range(count)]
+    for node in discovery:
+        layers[layer[node]].append(node)
+    layers = [nodes_in_layer for nodes_in_layer in layers if nodes_in_layer]
+    
+    # 3. Order inside layers: alternate downward and upward barycenter sweeps
+    position = {}
+    for nodes_in_layer in layers:
+        for i, node in enumerate(nodes_in_layer):
+            position[node] = (i + 0.5) / len(nodes_in_layer)
+    for _ in range(BARYCENTER_SWEEPS):
+        for neighbours, sweep in ((predecessors, layers[1:]), (successors, layers[-2::-1])):
+            for nodes_in_layer in sweep:
+                def barycenter(node):
+                    linked = neighbours[node]
+                    if not linked:
+                        return position[node]
+                    return sum(position[other] for other in linked) / len(linked)
+                nodes_in_layer.sort(key=barycenter)
+                for i, node in enumerate(nodes_in_layer):
+                    position[node] = (i + 0.5) / len(nodes_in_layer)
+    return layers, reversed_edges
+
+def _label_width(text):
+    return len(text) * CHAR_WIDTH
+
+def _node_pins(design, instances, node, wires_by_node):
+    """(title, subtitle, input pins, output pins) for drawing a node, found in instances by name."""
+    if node.startswith('in:'):
+        return node[3:], None, [], [node[3:]]
+    if node.startswith('out:'):
+        return node[4:], None, [node[4:]], []
+    instance = instances[node]
+    module = design.get(instance.module)
+    used = wires_by_node.get(node, ())
+    if module is not None:
+        inputs = [port.name for port in module['inputs'] if port.direction == 'input']
+        outputs = [port.name for port in module['outputs']]
+    else:
+        inputs = []
+        outputs = []
+    # Pins without a known direction go where their wires attach
+    known = set(inputs) | set(outputs)
+    for pin, side in used:
+        if pin not in known:
+            (outputs if side == 'out' else inputs).append(pin)
+            known.add(pin)
+    return node, instance.module, inputs, outputs
+
+def render_block_diagram(design, top, index, wires, layers, reversed_edges):
+    """Draw the layered block diagram as an SVG string."""
+    instances = {instance.name: instance for instance in design[top]['instances']}
+    wires_by_node = {}
+    for u, upin, v, vpin, _ in wires:
+        wires_by_node.setdefault(u, []).append((upin, 'out'))
+        wires_by_node.setdefault(v, []).append((vpin, 'in'))
+    
+    # Box sizes
+    boxes = {}
+    for nodes_in_layer in layers:
+        for node in nodes_in_layer:
+            title, subtitle, inputs, outputs = _node_pins(design, instances, node, wires_by_node)
+            terminal = subtitle is None
+            if terminal:
+                width = _label_width(title) + 24
+                height = 22
+            else:
+                width = max(BOX_MIN_WIDTH,
+                            _label_width(max(inputs, key=len, default='')) +
+                            _label_width(max(outputs, key=len, default='')) + BOX_PADDING,
+                            _label_width(subtitle) + 20)
+                height = max(len(inputs), len(outputs), 1) * PIN_SPACING + 44
+            boxes[node] = {'title': title, 'subtitle': subtitle, 'inputs': inputs,
+                           'outputs': outputs, 'width': width, 'height': height,
+                           'terminal': terminal,
+                           'in': {pin: i for i, pin in enumerate(inputs)},
+                           'out': {pin: i for i, pin in enumerate(outputs)}}
+    
+    # Layer columns: x of each layer, y stacked and centred on the tallest layer
+    layer_of = {}
+    column_x = []
+    x = MARGIN
+    for number, nodes_in_layer in enumerate(layers):
+        column_x.append(x)
+        x += max(boxes[node]['width'] for node in nodes_in_layer) + CHANNEL_WIDTH
+        for node in nodes_in_layer:
+            layer_of[node] = number
+    total_width = x - CHANNEL_WIDTH + MARGIN
+    heights = [sum(boxes[node]['height'] for node in nodes_in_layer) + NODE_GAP * (len(nodes_in_layer) - 1)
+               for nodes_in_layer in layers]
+    tallest = max(heights, default=0)
+    top_y = MARGIN + 40
+    for number, nodes_in_layer in enumerate(layers):
+        y = top_y + (tallest - heights[number]) / 2
+        column_width = max(boxes[node]['width'] for node in nodes_in_layer)
+        for node in nodes_in_layer:
+            box = boxes[node]
+            # Inputs column hugs the right edge, other columns the left
+            box['x'] = column_x[number] + (column_width - box['width'] if number == 0 else 0)
+            box['y'] = y
+            y += box['height'] + NODE_GAP
+    
+    def pin_point(node, pin, side):
+        box = boxes[node]
+        if box['terminal']:
+            return (box['x'] + box['width'] if side == 'out' else box['x'], box['y'] + box['height'] / 2)
+        y = box['y'] + 36 + box[side].get(pin, 0) * PIN_SPACING
+        return (box['x'] + box['width'] if side == 'out' else box['x'], y)
+    
+    # Wires, routed through the channel left of the sink's layer on one track
+    # per driver pin; feedback wires loop back below the drawing
+    tracks = {}
+    lanes = {}
+    feedback_y = top_y + tallest + 30
+    paths = []
+    for u, upin, v, vpin, net in wires:
+        x1, y1 = pin_point(u, upin, 'out')
+        x2, y2 = pin_point(v, vpin, 'in')
+        capacity = max(1, int((CHANNEL_WIDTH - 40) / TRACK_SPACING))
+        if layer_of[v] > layer_of[u]:
+            channel = tracks.setdefault(layer_of[v], {})
+            track = channel.setdefault((u, upin), len(channel)) % capacity
+            xt = x2 - CHANNEL_WIDTH + 20 + track * TRACK_SPACING
+            points = [(x1, y1), (xt, y1), (xt, y2), (x2, y2)]
+        else:
+            channel = tracks.setdefault(layer_of[u] + 1, {})
+            track = channel.setdefault((u, upin), len(channel)) % capacity
+            column_right = column_x[layer_of[u] + 1] - CHANNEL_WIDTH if layer_of[u] + 1 < len(column_x) else total_width - MARGIN
+            xa = column_right + 20 + track * TRACK_SPACING
+            lane = lanes.setdefault((u, upin), len(lanes))
+            yl = feedback_y + lane * TRACK_SPACING
+            xb = x2 - 20 - track * TRACK_SPACING
+            points = [(x1, y1), (xa, y1), (xa, yl), (xb, yl), (xb, y2), (x2, y2)]
+        width = index[net]['width']
+        paths.append((net, points, (u, v) in reversed_edges or layer_of[v] <= layer_of[u],
+                      width is not None and width > 1))
+    total_height = max(feedback_y + len(lanes) * TRACK_SPACING, top_y + tallest) + MARGIN
+    
+    svg = []
+    svg.append('<?xml version="1.0" encoding="UTF-8"?>')
+    svg.append(f'<svg width="{total_width:g}" height="{total_height:g}" '
+               f'viewBox="0 0 {total_width:g} {total_height:g}" '
+               f'xmlns="http://www.w3.org/2000/svg">')
+    svg.append(f'  <rect x="0" y="0" width="{total_width:g}" height="{total_height:g}" fill="white"/>')
+    svg.append(f'  <text x="{MARGIN}" y="{MARGIN}" font-family="Arial, Helvetica, sans-serif" '
+               f'font-size="22" font-weight="bold" fill="#2c3e50">{escape(top)} block diagram</text>')
+    
+    # Wires first, so boxes are drawn over any that pass behind them
+    svg.append('  <g fill="none" stroke-linejoin="round">')
+    for net, points, feedback, bus in paths:
+        colour = '#c0392b' if feedback else '#34495e'
+        dash = ' stroke-dasharray="6 3"' if feedback else ''
+        coords = ' '.join(f'{px:g},{py:g}' for px, py in points)
+        svg.append(f'    <polyline points="{coords}" stroke="{colour}" '
+                   f'stroke-width="{2.5 if bus else 1.2}"{dash}><title>{escape(net)}</title></polyline>')
+    svg.append('  </g>')
+    
+    for node, box in boxes.items():
+        x, y, w, h = box['x'], box['y'], box['width'], box['height']
+        if box['terminal']:
+            svg.append(f'  <rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" '
+                       f'fill="#ecf0f1" stroke="#7f8c8d" stroke-width="1" rx="11" ry="11"/>')
+            svg.append(f'  <text x="{x + w / 2:g}" y="{y + 15:g}" text-anchor="middle" '
+                       f'font-family="Arial, Helvetica, sans-serif" font-size="11" '
+                       f'fill="#2c3e50">{escape(box["title"])}</text>')
+            continue
+        svg.append(f'  <g id={quoteattr(node)}>')
+        svg.append(f'    <rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" '
+                   f'fill="#f8f9fa" stroke="#2c3e50" stroke-width="2" rx="6" ry="6"/>')
+        svg.append(f'    <text x="{x + w / 2:g}" y="{y + 15:g}" text-anchor="middle" '
+                   f'font-family="Arial, Helvetica, sans-serif" font-size="12" font-weight="bold" '
+                   f'fill="#2c3e50">{escape(box["title"])}</text>')
+        svg.append(f'    <text x="{x + w / 2:g}" y="{y + 28:g}" text-anchor="middle" '
+                   f'font-family="Arial, Helvetica, sans-serif" font-size="10" '
+                   f'fill="#7f8c8d">{escape(box["subtitle"])}</text>')
+        for i, pin in enumerate(box['inputs']):
+            py = y + 36 + i * PIN_SPACING
+            svg.append(f'    <text x="{x + 5:g}" y="{py + 3.5:g}" font-family="Arial, Helvetica, sans-serif" '
+                       f'font-size="10" fill="#2c3e50">{escape(pin)}</text>')
+        for i, pin in enumerate(box['outputs']):
+            py = y + 36 + i * PIN_SPACING
+            svg.append(f'    <text x="{x + w - 5:g}" y="{py + 3.5:g}" text-anchor="end" '
+                       f'font-family="Arial, Helvetica, sans-serif" font-size="10" '
+                       f'fill="#2c3e50">{escape(pin)}</text>')
+        svg.append('  </g>')
+    
+    svg.append('</svg>')
+    return '\n'.join(svg)
+
+def block_diagram(paths, top=None, index_file=None):
+    """Build the block diagram of top (default: found automatically).
+    
+    Returns (top, svg, design, layers). With index_file, the net connectivity index is also
+    written there as JSON.
+    """
+    design = load_design(paths)
+    top = top or find_top(design)
+    if top is None:
+        raise ValueError("No module with instances found")
+    if top not in design:
+        raise ValueError(f"Module '{top}' not found")
+    
+    index = build_net_index(design, top)
+    wires = build_wires(index)
+    driving = {u for u, _, _, _, _ in wires}
+    nodes = ([f"in:{port.name}" for port in design[top]['inputs'] if f"in:{port.name}" in driving] +
+             [instance.name for instance in design[top]['instances']] +
+             [f"out:{port.name}" for port in design[top]['outputs'] if port.direction == 'output'])
+    nodes = list(dict.fromkeys(nodes))
+    layers, reversed_edges = layered_layout(nodes, wires)
+    svg = render_block_diagram(design, top, index, wires, layers, reversed_edges)
+    
+    if index_file:
+        with open(index_file, 'w') as f:
+            json.dump({net: {'drivers': [f"{node}.{pin}" for node, pin in record['drivers']],
+                             'sinks': [f"{node}.{pin}" for node, pin in record['sinks']],
+                             'sources': record['sources'],
+                             'width': record['width']}
+                       for net, record in sorted(index.items())}, f, indent=1)
+    return top, svg, design, layers
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description='Draw a wired block diagram of the instances in a top-level Verilog module',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Block diagram of TLM, with module definitions taken from source/
+  %(prog)s source/ --top TLM -o docs/images/TLM_block_diagram.svg
+  
+  # Also save the net connectivity index
+  %(prog)s source/ --index tlm_nets.json
+        """
+    )
+    parser.add_argument('paths', nargs='+', help='Verilog files or directories holding the top module '
+                                                 'and the modules it instantiates')
+    parser.add_argument('--top', help='Top-level module (default: the module with the most instances '
+                                      'that is not instantiated anywhere)')
+    parser.add_argument('-o', '--output', help='Output SVG file (default: <top>_block_diagram.svg)')
+    parser.add_argument('--index', metavar='FILE', help='Write the net connectivity index as JSON')
+    parser.add_argument('--hierarchy', action='store_true', help='Print the instance hierarchy')
+    args = parser.parse_args(argv)
+    
+    try:
+        top, svg, design, layers = block_diagram(args.paths, args.top, args.index)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    if args.hierarchy:
+        print_hierarchy(design, top)
+    
+    output = args.output or f"{top}_block_diagram.svg"
+    with open(output, 'w') as f:
+        f.write(svg)
+    instances = len(design[top]['instances'])
+    print(f"✅ Block diagram of {top} ({instances} instances, {len(layers)} layers) saved to: {output}")
+    if args.index:
+        print(f"🔗 Net index saved to: {args.index}")
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,16 @@
+import io
 import os
+import re
+import sys
+import math
+import json
+import hashlib
+import argparse
+import contextlib
+import collections
 import xml.etree.ElementTree as ET
 from pathlib import Path
+from xml.sax.saxutils import escape
 
 # Configuration
 svg_dir = Path("docs/images")
@@ -8,98 +18,699 @@ output_file = "docs/images/combined_diagrams.svg"
 spacing = 50  # Space between diagrams
 columns = 3  # Number of columns in grid
 
-# Get all SVG files
-svg_files = sorted(svg_dir.glob("*.svg"))
-
-if not svg_files:
-    print("No SVG files found!")
-    exit(1)
-
-# Parse all SVGs and collect their content
-diagrams = []
-max_width = 0
-total_height = 0
-
-for svg_file in svg_files:
-    tree = ET.parse(svg_file)
-    root = tree.getroot()
-    
-    # Get dimensions
-    width = float(root.get('width', 800))
-    height = float(root.get('height', 600))
-    viewBox = root.get('viewBox', f"0 0 {width} {height}")
-    
-    # Extract all children (the actual diagram content)
-    content = list(root)
-    
-    diagrams.append({
-        'name': svg_file.stem,
-        'width': width,
-        'height': height,
-        'viewBox': viewBox,
-        'content': content,
-        'root': root
-    })
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+ET.register_namespace('xlink', XLINK_NS)
+
+# Title of a symbol (verilog_to_svg.py); everything else depends only on the ports
+_MODULE_NAME_RE = re.compile(rb'<text\b[^>]*\bclass="module-name"[^>]*>.*?</text>', re.S)
+
+# Sidecar index of a sheet's diagram groups, written next to it (see write_index)
+INDEX_SUFFIX = '.index.json'
+INDEX_VERSION = 1
+
+# Opening line of a diagram's top-level group in a written sheet
+_TOP_GROUP_RE = re.compile(rb'^  <g id="[^"]*" transform="([^"]*)"', re.M)
+
+def read_svg_size(svg_file):
+    """Read width, height and viewBox from the root element only.
+    
+    iterparse stops at the first start event, so the rest of the file is
+    never parsed.
+    """
+    with open(svg_file, 'rb') as f:
+        for _, root in ET.iterparse(f, events=('start',)):
+            width = float(root.get('width', 800))
+            height = float(root.get('height', 600))
+            viewBox = root.get('viewBox', f"0 0 {width} {height}")
+            return width, height, viewBox
+    raise ValueError(f"{svg_file} has no root element")
+
+def _local_name(name):
+    """Drop the SVG namespace from a tag or attribute name (xlink keeps its prefix)."""
+    if name.startswith('{'):
+        uri, _, local = name[1:].partition('}')
+        return f'xlink:{local}' if uri == XLINK_NS else local
+    return name
+
+def _quote_attribute(value):
+    """Quote an attribute value the way ElementTree does."""
+    return '"' + escape(value, {'"': '&quot;', '\n': '&#10;'}) + '"'
+
+def _content(text):
+    """Text or tail of an element, or '' when it is only whitespace (indentation)."""
+    return text if text and not text.isspace() else ''
+
+def write_element(out, elem, level):
+    """Serialise one element subtree to out, indented like ET.indent()."""
+    out.write('  ' * level)
+    _write_subtree(out, elem, level)
+    out.write('\n')
+
+def _write_subtree(out, elem, level):
+    """Write elem and its children without a leading indent or its own tail.
+    
+    As with ET.indent(), whitespace-only text and tails are replaced by the
+    indentation, while any other text is kept as is, so mixed content such
+    as <text>a<tspan>b</tspan>c</text> survives.
+    """
+    attrs = ''.join(f' {_local_name(k)}={_quote_attribute(v)}' for k, v in elem.items())
+    tag = _local_name(elem.tag)
+    text = _content(elem.text)
+    if len(elem):
+        inner = '\n' + '  ' * (level + 1)
+        out.write(f'<{tag}{attrs}>{escape(text) if text else inner}')
+        last = len(elem) - 1
+        for i, child in enumerate(elem):
+            _write_subtree(out, child, level + 1)
+            tail = _content(child.tail)
+            if tail:
+                out.write(escape(tail))
+            else:
+                out.write(inner if i < last else '\n' + '  ' * level)
+        out.write(f'</{tag}>')
+    elif text:
+        out.write(f'<{tag}{attrs}>{escape(text)}</{tag}>')
+    else:
+        out.write(f'<{tag}{attrs} />')
+
+def _shared_defs(elem, seen_defs):
+    """True if elem is a <defs> whose children were all written already.
+    
+    Compact symbols (verilog_to_svg.py --compact) all carry the same pin
+    <symbol> and <style> definitions; the sheet keeps the first copy of
+    each id. Otherwise the ids are added to seen_defs.
+    """
+    if seen_defs is None or _local_name(elem.tag) != 'defs':
+        return False
+    ids = [child.get('id') for child in elem]
+    if ids and all(ids) and seen_defs.issuperset(ids):
+        return True
+    seen_defs.update(i for i in ids if i)
+    return False
+
+def stream_svg_children(svg_file, out, level, seen_defs=None, skip_names=False):
+    """Copy the root's children of svg_file to out one subtree at a time.
+    
+    Each top-level child is written and detached from the root as soon as
+    its end tag is parsed, so only one subtree is held in memory. With a
+    seen_defs set, <defs> already written to the sheet are skipped; with
+    skip_names, so is the module-name title.
+    """
+    root = None
+    depth = 0
+    with open(svg_file, 'rb') as f:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 1:
+                if not (_shared_defs(elem, seen_defs)
+                        or skip_names and elem.get('class') == 'module-name'):
+                    write_element(out, elem, level)
+                root.remove(elem)
+
+def grid_layout(sizes, columns, spacing):
+    """Place (width, height) boxes in a grid with the given number of columns.
+    
+    Each row is as tall as its tallest box and each column as wide as its
+    widest; both are computed once, so layout is linear in the number of
+    boxes. Returns (positions, sheet_width, sheet_height).
+    """
+    rows = (len(sizes) + columns - 1) // columns
+    col_widths = [0] * min(columns, len(sizes))
+    row_heights = [0] * rows
+    for idx, (width, height) in enumerate(sizes):
+        row, col = divmod(idx, columns)
+        col_widths[col] = max(col_widths[col], width)
+        row_heights[row] = max(row_heights[row], height)
+    
+    col_x = [0] * len(col_widths)
+    for col in range(1, len(col_widths)):
+        col_x[col] = col_x[col - 1] + col_widths[col - 1] + spacing
+    row_y = [0] * rows
+    for row in range(1, rows):
+        row_y[row] = row_y[row - 1] + row_heights[row - 1] + spacing
+    
+    positions = [(col_x[idx % columns], row_y[idx // columns]) for idx in range(len(sizes))]
+    sheet_width = sum(col_widths) + (len(col_widths) - 1) * spacing
+    sheet_height = sum(row_heights) + (rows - 1) * spacing
+    return positions, sheet_width, sheet_height
+
+def _pack_shelves(sizes, order, strip_width, spacing):
+    """Next-fit shelf packing of boxes (taken in order) into a strip of given width."""
+    positions = [None] * len(sizes)
+    x = y = 0
+    shelf_height = 0
+    used_width = 0
+    for idx in order:
+        width, height = sizes[idx]
+        if x > 0 and x + width > strip_width:
+            y += shelf_height + spacing
+            x = 0
+            shelf_height = 0
+        positions[idx] = (x, y)
+        used_width = max(used_width, x + width)
+        x += width + spacing
+        shelf_height = max(shelf_height, height)
+    return positions, used_width, y + shelf_height
+
+def shelf_layout(sizes, spacing):
+    """Pack boxes onto shelves to keep the sheet area small.
+    
+    Boxes are sorted by decreasing height once (NFDH), so each shelf is as
+    tall as its first box. A handful of strip widths around the square root
+    of the total area are packed in one linear pass each, and the smallest
+    sheet wins. Returns (positions, sheet_width, sheet_height).
+    """
+    order = sorted(range(len(sizes)), key=lambda idx: -sizes[idx][1])
+    widest = max(width for width, _ in sizes)
+    ideal = math.sqrt(sum((w + spacing) * (h + spacing) for w, h in sizes))
+    candidates = sorted({max(widest, ideal * f) for f in (0.5, 0.75, 1.0, 1.25, 1.5, 2.0)})
+    
+    best = None
+    for strip_width in candidates:
+        layout = _pack_shelves(sizes, order, strip_width, spacing)
+        if best is None or layout[1] * layout[2] < best[1] * best[2]:
+            best = layout
+    return best
+
+def find_svg_files(directory, output=None):
+    """Sorted SVG files in directory, never including the combined sheet itself."""
+    exclude = Path(output).resolve() if output else None
+    return sorted(f for f in Path(directory).glob("*.svg") if f.resolve() != exclude)
+
+def load_diagrams(paths, stream=False):
+    """Read the size of each SVG, plus its content unless streaming."""
+    diagrams = []
+    for svg_file in map(Path, paths):
+        if stream:
+            width, height, viewBox = read_svg_size(svg_file)
+            content = None
+            root = None
+        else:
+            tree = ET.parse(svg_file)
+            root = tree.getroot()
+            
+            # Get dimensions
+            width = float(root.get('width', 800))
+            height = float(root.get('height', 600))
+            viewBox = root.get('viewBox', f"0 0 {width} {height}")
+            
+            # Extract all children (the actual diagram content)
+            content = list(root)
+        
+        diagrams.append({
+            'name': svg_file.stem,
+            'path': svg_file,
+            'width': width,
+            'height': height,
+            'viewBox': viewBox,
+            'content': content,
+            'root': root
+        })
+    return diagrams
+
+def _fingerprint(data):
+    """SHA-1 of a symbol file's content, and of its content without the module-name title."""
+    return hashlib.sha1(data).hexdigest(), hashlib.sha1(_MODULE_NAME_RE.sub(b'', data)).hexdigest()
+
+def _read_stamped(path):
+    """Content of a file and its [mtime_ns, size], taken from the same open file."""
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        return f.read(), [stat.st_mtime_ns, stat.st_size]
+
+def mark_shared(diagrams):
+    """Find diagrams that differ from another one only in their module name.
+    
+    Each diagram's file is hashed without its module-name title. Diagrams
+    whose hash occurs more than once get it as diagram['shared'] (else
+    None) and their title elements as diagram['names'], so the sheet can
+    hold one copy and <use> it for the rest. The file's stat and hashes are
+    kept as diagram['digests'] for write_index(), so each file is read once.
+    Returns the number of copies saved.
+    """
+    for diagram in diagrams:
+        data, stat = _read_stamped(diagram['path'])
+        digest, signature = _fingerprint(data)
+        diagram['names'] = _MODULE_NAME_RE.findall(data)
+        diagram['shared'] = 'sig-' + signature[:12]
+        diagram['digests'] = (stat, digest, signature)
+    counts = collections.Counter(d['shared'] for d in diagrams)
+    for diagram in diagrams:
+        if counts[diagram['shared']] < 2:
+            diagram['shared'] = None
+    return sum(count - 1 for count in counts.values())
+
+def write_streaming(diagrams, positions, grid_width, grid_height, out_file):
+    """Write the sheet directly, streaming each diagram's children from its file."""
+    tmp_file = str(out_file) + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as out:
+        out.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        out.write(f'<svg width="{grid_width}" height="{grid_height}" '
+                  f'viewBox="0 0 {grid_width} {grid_height}" xmlns="{SVG_NS}" xmlns:xlink="{XLINK_NS}">\n')
+        out.write(f'  <rect x="0" y="0" width="{grid_width}" height="{grid_height}" fill="white" />\n')
+        
+        seen_defs = set()
+        shared = set()
+        for idx, diagram in enumerate(diagrams):
+            x, y = positions[idx]
+            write_diagram_group(out, diagram, f'translate({x}, {y})', seen_defs, shared)
+        
+        out.write('</svg>')
+    os.replace(tmp_file, out_file)
+
+def write_diagram_group(out, diagram, transform, seen_defs=None, shared=None):
+    """Write one diagram's titled <g> group, streaming its content from its file.
     
-    max_width = max(max_width, width)
-    total_height += height + spacing
-
-# Calculate grid layout
-rows = (len(diagrams) + columns - 1) // columns
-grid_width = columns * max_width + (columns - 1) * spacing
-grid_height = rows * max(d['height'] for d in diagrams) + (rows - 1) * spacing
-
-# Create combined SVG
-combined = ET.Element('svg', {
-    'width': str(grid_width),
-    'height': str(grid_height),
-    'viewBox': f"0 0 {grid_width} {grid_height}",
-    'xmlns': 'http://www.w3.org/2000/svg'
-})
-
-# Add background
-ET.SubElement(combined, 'rect', {
-    'x': '0', 'y': '0',
-    'width': str(grid_width),
-    'height': str(grid_height),
-    'fill': 'white'
-})
-
-# Place diagrams in grid
-for idx, diagram in enumerate(diagrams):
-    row = idx // columns
-    col = idx % columns
-    
-    x = col * (max_width + spacing)
-    y = row * (max(d['height'] for d in diagrams) + spacing)
-    
-    # Create group for this diagram
-    g = ET.SubElement(combined, 'g', {
-        'transform': f'translate({x}, {y})'
+    With a shared set, a diagram marked by mark_shared() is written as a
+    <g id="sig-..."> the first time and as a <use> of it afterwards, each
+    followed by its own module name.
+    """
+    out.write(f'  <g id={_quote_attribute(diagram["name"])} transform="{transform}">\n')
+    out.write(f'    <text x="{diagram["width"] / 2}" y="20" text-anchor="middle" '
+              f'font-family="Arial, Helvetica, sans-serif" font-size="16" font-weight="bold" '
+              f'fill="#2c3e50">{escape(diagram["name"])}</text>\n')
+    out.write('    <g>\n')
+    signature = diagram.get('shared')
+    if shared is None or signature is None:
+        stream_svg_children(diagram['path'], out, 3, seen_defs)
+    else:
+        if signature in shared:
+            out.write(f'      <use xlink:href="#{signature}" />\n')
+        else:
+            shared.add(signature)
+            out.write(f'      <g id="{signature}">\n')
+            stream_svg_children(diagram['path'], out, 4, seen_defs, skip_names=True)
+            out.write('      </g>\n')
+        for name in diagram['names']:
+            write_element(out, ET.fromstring(name), 3)
+    out.write('    </g>\n')
+    out.write('  </g>\n')
+
+_DEFS_RE = re.compile(r'<defs\b[^>]*>(.*?)</defs>', re.S)
+_ID_RE = re.compile(r'<\w[^>]*?\sid="([^"]*)"')
+
+def _defined_ids(text):
+    """Ids of the elements inside the <defs> blocks of a piece of the sheet."""
+    return {i for body in _DEFS_RE.findall(text) for i in _ID_RE.findall(body)}
+
+def index_file(sheet_file):
+    """Path of the sidecar index of a sheet."""
+    return str(sheet_file) + INDEX_SUFFIX
+
+def _save_index(sheet_file, index):
+    """Write a sheet's index atomically, stamped with the sheet's current size and mtime."""
+    stat = os.stat(sheet_file)
+    index['sheet'] = [stat.st_mtime_ns, stat.st_size]
+    tmp_file = index_file(sheet_file) + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_file, index_file(sheet_file))
+
+def write_index(sheet_file, diagrams, settings):
+    """Record where each diagram's group lies in a freshly written sheet.
+    
+    For every diagram the index keeps the byte offset and size of its
+    top-level <g> in the sheet, its transform and the <defs> ids it
+    defines, plus the size, mtime and content hashes of its SVG file, so
+    patch_sheet() can find changed symbols and rewrite their groups
+    without parsing the sheet or the unchanged symbols. settings are the
+    layout options the sheet was built with. Returns False (and removes a
+    stale index) when the groups cannot be matched to the diagrams.
+    """
+    with open(sheet_file, 'rb') as f:
+        sheet = f.read()
+    starts = [(m.start(), m.group(1).decode()) for m in _TOP_GROUP_RE.finditer(sheet)]
+    if len(starts) != len(diagrams):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(index_file(sheet_file))
+        return False
+    
+    entries = []
+    bounds = [start for start, _ in starts[1:]] + [sheet.rfind(b'</svg>')]
+    for diagram, (start, transform), end in zip(diagrams, starts, bounds):
+        digests = diagram.get('digests')
+        if digests is None:
+            data, stat = _read_stamped(diagram['path'])
+            digests = (stat, *_fingerprint(data))
+        stat, digest, signature = digests
+        entries.append({
+            'name': diagram['name'],
+            'path': str(diagram['path']),
+            'stat': stat,
+            'hash': digest,
+            'signature': signature,
+            'width': diagram['width'],
+            'height': diagram['height'],
+            'transform': transform,
+            'offset': start,
+            'size': end - start,
+            'defs': sorted(_defined_ids(sheet[start:end].decode('utf-8')))
+        })
+    _save_index(sheet_file, {'version': INDEX_VERSION, 'settings': settings, 'diagrams': entries})
+    return True
+
+def _copy_range(src, dst, start, end):
+    """Copy bytes [start, end) of one open file to another."""
+    src.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = src.read(min(remaining, 1 << 20))
+        if not chunk:
+            break
+        dst.write(chunk)
+        remaining -= len(chunk)
+
+def index_settings(sheet_file):
+    """Layout settings a sheet was built with, from its index ({} without a readable index)."""
+    try:
+        with open(index_file(sheet_file), 'r') as f:
+            return json.load(f).get('settings') or {}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def read_index(sheet_file, paths, settings):
+    """The index of a sheet, or None unless it still describes the sheet as built now.
+    
+    The index must be of this version, stamped with the sheet's current
+    size and mtime, list exactly the given symbol paths in order, and have
+    been written with the given settings (only the keys passed are compared).
+    """
+    try:
+        with open(index_file(sheet_file), 'r') as f:
+            index = json.load(f)
+        stat = os.stat(sheet_file)
+    except (OSError, ValueError):
+        return None
+    recorded = index.get('settings') or {}
+    if (index.get('version') != INDEX_VERSION
+            or any(recorded.get(key) != value for key, value in settings.items())
+            or index.get('sheet') != [stat.st_mtime_ns, stat.st_size]
+            or [entry['path'] for entry in index.get('diagrams', [])] != [str(Path(p)) for p in paths]):
+        return None
+    return index
+
+def patch_sheet(paths, out, columns=columns, spacing=spacing, layout='grid', dedupe=True):
+    """Bring a sheet up to date by rewriting only the groups of changed symbols.
+    
+    Symbols are matched to the sheet's index (see write_index): files whose
+    size and mtime are unchanged are not read at all, the rest are hashed
+    and only those whose content changed are re-rendered. A new group is
+    written over the old one in place, padded with spaces if it is shorter;
+    only when one grew is the sheet copied once to make room. Returns the
+    names of the patched diagrams, or None when the sheet has to be rebuilt
+    with combine(): no usable index (other files or settings, or a sheet
+    changed since it was indexed), a symbol whose size changed so the
+    layout would re-flow, or a change to a de-duplicated symbol or to
+    shared <defs>.
+    """
+    # Patched groups are always written by the streaming writer, whichever built the sheet
+    index = read_index(out, paths, {'columns': columns, 'spacing': spacing, 'layout': layout,
+                                    'dedupe': dedupe})
+    if index is None:
+        return None
+    entries = index.get('diagrams', [])
+    
+    # Find the symbols whose content changed
+    changed = {}
+    touched = False
+    for idx, entry in enumerate(entries):
+        stat = os.stat(entry['path'])
+        if entry['stat'] == [stat.st_mtime_ns, stat.st_size]:
+            continue
+        data = Path(entry['path']).read_bytes()
+        entry['stat'] = [stat.st_mtime_ns, stat.st_size]
+        touched = True
+        if _fingerprint(data)[0] != entry['hash']:
+            changed[idx] = data
+    
+    # Render their groups at the same place, unless the sheet needs re-flowing
+    counts = collections.Counter(entry['signature'] for entry in entries)
+    seen_defs = set()
+    later_defs = collections.Counter(i for entry in entries for i in entry['defs'])
+    patches = []
+    for idx, entry in enumerate(entries):
+        later_defs.subtract(entry['defs'])
+        if idx in changed:
+            width, height, _ = read_svg_size(entry['path'])
+            if (width, height) != (entry['width'], entry['height']):
+                return None
+            digest, signature = _fingerprint(changed[idx])
+            if dedupe:
+                if counts[entry['signature']] > 1:
+                    return None
+                counts[entry['signature']] -= 1
+                if counts[signature]:
+                    return None
+                counts[signature] += 1
+            group = io.StringIO()
+            write_diagram_group(group, {'name': entry['name'], 'path': entry['path'], 'width': width},
+                                entry['transform'], set(seen_defs))
+            text = group.getvalue()
+            new_defs = _defined_ids(text)
+            if (not set(entry['defs']) <= seen_defs | new_defs
+                    or any(later_defs[i] > 0 for i in new_defs - set(entry['defs']))):
+                return None
+            patches.append((idx, text.encode('utf-8'), digest, signature, sorted(new_defs)))
+        seen_defs.update(entry['defs'])
+    
+    if patches and all(len(data) <= entries[idx]['size'] for idx, data, _, _, _ in patches):
+        # Every group fits its old slot: overwrite just those bytes
+        with open(out, 'r+b') as f:
+            for idx, data, _, _, _ in patches:
+                f.seek(entries[idx]['offset'])
+                f.write(data[:-1] + b' ' * (entries[idx]['size'] - len(data)) + b'\n')
+    elif patches:
+        # A group grew: copy the sheet once, shifting everything after it
+        tmp_file = str(out) + '.tmp'
+        with open(out, 'rb') as src, open(tmp_file, 'wb') as dst:
+            pos = 0
+            for idx, data, _, _, _ in patches:
+                entry = entries[idx]
+                _copy_range(src, dst, pos, entry['offset'])
+                dst.write(data[:-1] + b' ' * max(0, entry['size'] - len(data)) + b'\n')
+                pos = entry['offset'] + entry['size']
+            _copy_range(src, dst, pos, os.fstat(src.fileno()).st_size)
+        os.replace(tmp_file, out)
+        shift = 0
+        sizes = {idx: max(len(data), entries[idx]['size']) for idx, data, _, _, _ in patches}
+        for idx, entry in enumerate(entries):
+            entry['offset'] += shift
+            if idx in sizes:
+                shift += sizes[idx] - entry['size']
+                entry['size'] = sizes[idx]
+    
+    for idx, _, digest, signature, defs in patches:
+        entries[idx].update(hash=digest, signature=signature, defs=defs)
+    if touched:
+        _save_index(out, index)
+    return [entries[idx]['name'] for idx, _, _, _, _ in patches]
+
+def write_tree(diagrams, positions, grid_width, grid_height, out_file):
+    """Build the sheet as an ElementTree and write it out."""
+    # Create combined SVG
+    combined = ET.Element('svg', {
+        'width': str(grid_width),
+        'height': str(grid_height),
+        'viewBox': f"0 0 {grid_width} {grid_height}",
+        'xmlns': 'http://www.w3.org/2000/svg'
     })
     
-    # Add title
-    title = ET.SubElement(g, 'text', {
-        'x': str(diagram['width'] / 2),
-        'y': '20',
-        'text-anchor': 'middle',
-        'font-family': 'Arial, Helvetica, sans-serif',
-        'font-size': '16',
-        'font-weight': 'bold',
-        'fill': '#2c3e50'
+    # Add background
+    ET.SubElement(combined, 'rect', {
+        'x': '0', 'y': '0',
+        'width': str(grid_width),
+        'height': str(grid_height),
+        'fill': 'white'
     })
-    title.text = diagram['name']
     
-    # Add diagram content
-    diagram_group = ET.SubElement(g, 'g')
-    for elem in diagram['content']:
-        diagram_group.append(elem)
+    # Place diagrams in grid
+    seen_defs = set()
+    shared = set()
+    for idx, diagram in enumerate(diagrams):
+        x, y = positions[idx]
+        
+        # Create group for this diagram
+        g = ET.SubElement(combined, 'g', {
+            'id': diagram['name'],
+            'transform': f'translate({x}, {y})'
+        })
+        
+        # Add title
+        title = ET.SubElement(g, 'text', {
+            'x': str(diagram['width'] / 2),
+            'y': '20',
+            'text-anchor': 'middle',
+            'font-family': 'Arial, Helvetica, sans-serif',
+            'font-size': '16',
+            'font-weight': 'bold',
+            'fill': '#2c3e50'
+        })
+        title.text = diagram['name']
+        
+        # Add diagram content; repeated symbols are stored once (see mark_shared)
+        diagram_group = ET.SubElement(g, 'g')
+        signature = diagram.get('shared')
+        names = [elem for elem in diagram['content'] if elem.get('class') == 'module-name']
+        if signature is None:
+            body = diagram_group
+            names = []
+        elif signature in shared:
+            ET.SubElement(diagram_group, 'use', {f'{{{XLINK_NS}}}href': f'#{signature}'})
+            body = None
+        else:
+            shared.add(signature)
+            body = ET.SubElement(diagram_group, 'g', {'id': signature})
+        if body is not None:
+            for elem in diagram['content']:
+                if elem in names or _shared_defs(elem, seen_defs):
+                    continue
+                body.append(elem)
+        for elem in names:
+            diagram_group.append(elem)
+    
+    # Write output
+    tree = ET.ElementTree(combined)
+    ET.indent(tree, space="  ")
+    tree.write(out_file, encoding='utf-8', xml_declaration=True)
+
+def combine(paths, out, columns=columns, spacing=spacing, layout='grid', stream=False, dedupe=True,
+            index=True):
+    """Combine SVG files into a single sheet written to out.
+    
+    layout is 'grid' (columns wide) or 'shelf'; with stream=True the
+    symbols are copied into the sheet without building a DOM. With dedupe,
+    symbols that differ only in their module name are stored once and
+    <use>d (see mark_shared). With index, a sidecar index is written for
+    patch_sheet(). Returns the sheet (width, height).
+    """
+    diagrams = load_diagrams(paths, stream)
+    if not diagrams:
+        raise ValueError("No SVG files to combine")
+    if dedupe:
+        mark_shared(diagrams)
+    
+    # Calculate layout
+    sizes = [(d['width'], d['height']) for d in diagrams]
+    if layout == 'shelf':
+        positions, grid_width, grid_height = shelf_layout(sizes, spacing)
+    else:
+        positions, grid_width, grid_height = grid_layout(sizes, columns, spacing)
+    
+    if stream:
+        write_streaming(diagrams, positions, grid_width, grid_height, out)
+    else:
+        write_tree(diagrams, positions, grid_width, grid_height, out)
+    if index:
+        write_index(out, diagrams, {'columns': columns, 'spacing': spacing, 'layout': layout,
+                                    'dedupe': dedupe, 'stream': stream})
+    return grid_width, grid_height
 
-# Write output
-tree = ET.ElementTree(combined)
-ET.indent(tree, space="  ")
-tree.write(output_file, encoding='utf-8', xml_declaration=True)
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Combine SVG symbols into a single grid sheet')
+    parser.add_argument('-d', '--directory', default=str(svg_dir),
+                        help=f'Directory of SVG symbols to combine (default: {svg_dir})')
+    parser.add_argument('-o', '--output', default=output_file,
+                        help=f'Combined SVG file to write (default: {output_file})')
+    parser.add_argument('--columns', type=int, default=columns,
+                        help=f'Number of columns in grid layout (default: {columns})')
+    parser.add_argument('--spacing', type=float, default=spacing,
+                        help=f'Space between diagrams (default: {spacing})')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild even if no input SVG changed since the last run')
+    parser.add_argument('--stream', action='store_true',
+                        help='Two-pass streaming mode: read only symbol sizes first, then copy each '
+                             'symbol into the output one element at a time (flat memory use)')
+    parser.add_argument('--layout', choices=('grid', 'shelf'), default='grid',
+                        help='grid: fixed columns with per-row heights (default); '
+                             'shelf: bin-pack symbols onto shelves to minimise sheet area')
+    parser.add_argument('--no-dedupe', action='store_true',
+                        help='Inline every symbol, even those that only differ from another in '
+                             'their module name (default: store them once and <use> the copies)')
+    parser.add_argument('--no-index', action='store_true',
+                        help=f'Do not write the {INDEX_SUFFIX} sidecar that lets later runs patch only the '
+                             f'changed symbols into the sheet; without it every run rebuilds the sheet')
+    parser.add_argument('--raster', action='append', metavar='FILE',
+                        help='Also render the sheet to FILE (.png, or .jpg with Pillow); may be repeated')
+    parser.add_argument('--dpi', type=float, default=96,
+                        help='Resolution of --raster output (default: 96, one pixel per SVG unit)')
+    parser.add_argument('--tile', type=int, default=512,
+                        help='Tile edge in pixels for --raster rendering (default: 512)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Worker processes rendering --raster tiles (0 = one per CPU, default: 1)')
+    args = parser.parse_args(argv)
+    
+    if args.columns < 1:
+        parser.error("--columns must be a positive number")
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or a positive number")
+    
+    # Get all SVG files
+    svg_files = find_svg_files(args.directory, args.output)
+    
+    if not svg_files:
+        print("No SVG files found!")
+        sys.exit(1)
+    
+    # Skip the rebuild when the sheet's index shows it was built from the same symbols
+    # with the same options, and no symbol (or this script) changed since
+    output_path = Path(args.output)
+    settings = {'columns': args.columns, 'spacing': args.spacing, 'layout': args.layout,
+                'dedupe': not args.no_dedupe, 'stream': args.stream}
+    if (not args.force and not args.no_index and output_path.exists()
+            and read_index(args.output, svg_files, settings) is not None):
+        sheet_mtime = output_path.stat().st_mtime
+        newest_input = max(f.stat().st_mtime for f in svg_files + [Path(__file__)])
+        if newest_input <= sheet_mtime:
+            print(f"{args.output} is up to date ({len(svg_files)} SVGs unchanged)")
+            write_rasters(args, stale_only=True)
+            return
+        
+        # Only symbols changed: rewrite their groups in place if the layout holds
+        if Path(__file__).stat().st_mtime <= sheet_mtime:
+            patched = patch_sheet(svg_files, args.output, args.columns, args.spacing, args.layout,
+                                  not args.no_dedupe)
+            if patched is not None:
+                print(f"Patched {len(patched)} changed SVG(s) into {args.output} in place")
+                write_rasters(args, stale_only=not patched)
+                return
+    
+    grid_width, grid_height = combine(svg_files, args.output, args.columns, args.spacing,
+                                      args.layout, args.stream, not args.no_dedupe, not args.no_index)
+    
+    print(f"Combined {len(svg_files)} SVGs into {args.output}")
+    if args.layout == 'shelf':
+        print("Layout: shelf packing")
+    else:
+        rows = (len(svg_files) + args.columns - 1) // args.columns
+        print(f"Grid: {args.columns} columns × {rows} rows")
+    print(f"Dimensions: {grid_width} × {grid_height}")
+    write_rasters(args)
+
+def write_rasters(args, stale_only=False):
+    """Render the sheet to each --raster file (only those older than it with stale_only)."""
+    if not args.raster:
+        return
+    # Imported here so SVG-only runs skip the cost
+    import svg_raster
+    
+    jobs = args.jobs or os.cpu_count() or 1
+    sheet_mtime = Path(args.output).stat().st_mtime
+    for raster_file in args.raster:
+        if stale_only and Path(raster_file).exists() and Path(raster_file).stat().st_mtime >= sheet_mtime:
+            print(f"{raster_file} is up to date")
+            continue
+        try:
+            width, height = svg_raster.rasterize(args.output, raster_file, args.dpi, args.tile, jobs)
+        except (OSError, ValueError) as e:
+            print(f"Error rendering {raster_file}: {e}")
+            sys.exit(1)
+        print(f"Rendered {raster_file}: {width} × {height} px at {args.dpi:g} DPI")
 
-print(f"Combined {len(svg_files)} SVGs into {output_file}")
-print(f"Grid: {columns} columns × {rows} rows")
-print(f"Dimensions: {grid_width} × {grid_height}")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Pepper Symbol Tools
+Single command-line entry point and in-process API for the Verilog symbol
+generator (verilog_to_svg.py) and the sheet combiner (combine_svgs.py).
+
+Nothing heavy is imported up front: each subcommand imports only the tool
+it runs, and the API functions are loaded on first attribute access, so a
+long-running build can call them repeatedly without per-call start-up.
+
+    import pepper_symbols
+    name, inputs, outputs = pepper_symbols.parse_verilog_module(code)
+    name, inputs, outputs = pepper_symbols.parse_verilog_module(code, records=True)
+    widths = {port.name: port.width for port in inputs + outputs}
+    svg = pepper_symbols.generate_svg(name, inputs, outputs)
+    with open('sym.svg', 'w') as f:
+        pepper_symbols.write_svg(f, name, inputs, outputs, compact=True)
+    pepper_symbols.combine(paths, 'sheet.svg', columns=3, spacing=50)
+    pepper_symbols.rasterize('sheet.svg', 'sheet.png', dpi=150, jobs=4)
+"""
+
+import importlib
+
+# Public API: attribute name -> module that defines it
+_EXPORTS = {
+    'parse_verilog_module': 'verilog_to_svg',
+    'parse_verilog_modules': 'verilog_to_svg',
+    'Port': 'verilog_to_svg',
+    'eval_constant': 'verilog_to_svg',
+    'generate_svg': 'verilog_to_svg',
+    'write_svg': 'verilog_to_svg',
+    'text_width': 'verilog_to_svg',
+    'SymbolIndex': 'verilog_to_svg',
+    'port_signature': 'verilog_to_svg',
+    'verilog_to_svg': 'verilog_to_svg',
+    'verilog_modules_to_svg': 'verilog_to_svg',
+    'process_directory': 'verilog_to_svg',
+    'combine': 'combine_svgs',
+    'patch_sheet': 'combine_svgs',
+    'block_diagram': 'block_diagram',
+    'rasterize': 'svg_raster',
+    'cross_check': 'port_check',
+    'Preprocessor': 'verilog_preprocess',
+}
+
+__all__ = sorted(_EXPORTS)
+
+# Subcommand -> (module providing main(), help text)
+COMMANDS = {
+    'symbol': ('verilog_to_svg', 'Generate SVG block symbols from Verilog (see verilog_to_svg.py)'),
+    'combine': ('combine_svgs', 'Combine SVG symbols into one sheet (see combine_svgs.py)'),
+    'diagram': ('block_diagram', 'Draw a wired block diagram of a top module (see block_diagram.py)'),
+    'raster': ('svg_raster', 'Render an SVG sheet or diagram to PNG/JPEG (see svg_raster.py)'),
+    'preprocess': ('verilog_preprocess', 'Expand `define/`ifdef/`include and print the result (see verilog_preprocess.py)'),
+    'check': ('port_check', 'Cross-check Verilog ports against block_ios.txt and the register map (see port_check.py)'),
+}
+
+def __getattr__(name):
+    """Import API functions lazily, on first use."""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+def main(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description='Pepper symbol tools',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="Commands:\n" + "\n".join(f"  {name:<12}{help_text}"
+                                          for name, (_, help_text) in COMMANDS.items()) + """
+
+Examples:
+  # Generate symbols for a directory, then combine them
+  %(prog)s symbol -d source/ -o docs/images/ --cache
+  %(prog)s combine --layout shelf --raster docs/images/combined_diagrams.png
+  
+  # Wired block diagram of the TLM instances
+  %(prog)s diagram source/ --top TLM
+  
+  # Compare the Verilog ports with block_ios.txt and the register map
+  %(prog)s check source/ --top TLM
+  
+  # Options of a subcommand
+  %(prog)s symbol --help
+        """
+    )
+    parser.add_argument('command', choices=sorted(COMMANDS), help='Tool to run')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='Arguments passed to the tool')
+    args = parser.parse_args(argv)
+    
+    module_name, _ = COMMANDS[args.command]
+    module = importlib.import_module(module_name)
+    module.main(args.args, prog=f"{parser.prog} {args.command}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Port Cross-Check
+Compares the ports parsed from the Verilog sources with the two hand-kept
+specifications: the block_ios.txt listing (one section per block) and the
+register map CSV, whose Input/Output fields are ports of the top module.
+
+Both sources are read in one linear pass into dict indexes keyed by
+module and port name, with bus notation normalised (RTGB<3:0>,
+RTGB[3:0], RTGB [3:0] and cfg_data [5:0][7:0] all become a name and a
+width). Each port is then looked up once, so full-chip register maps
+with tens of thousands of fields check in linear time. Missing ports,
+extra ports, width and direction mismatches are reported per module.
+"""
+
+import re
+import csv
+import sys
+import json
+import argparse
+from pathlib import Path
+
+from verilog_to_svg import parse_verilog_file_modules, eval_constant, expand_verilog_paths
+
+# Specification files looked for when none are given
+DEFAULT_BLOCK_IOS = 'block_ios.txt'
+DEFAULT_REGISTER_MAP = 'pepper_t4_digital_requirements(Register map).csv'
+DEFAULT_TOP = 'TLM'
+
+# A port as written in the specs: name, any number of <msb:lsb>/[msb:lsb]
+# ranges, and an optional suffix after the range (CHEN[7:0]_sync)
+_SPEC_PORT_RE = re.compile(r'([A-Za-z_][\w$]*)\s*((?:[<\[][^\]>]*[\]>]\s*)*)([\w$]*)')
+_RANGE_RE = re.compile(r'[<\[]([^\]>]*)[\]>]')
+_SECTION_KEY_RE = re.compile(r'[^a-z0-9]')
+
+class SpecPort:
+    """A port expected by a specification, with where it was written."""
+    
+    __slots__ = ('name', 'direction', 'width', 'source')
+    
+    def __init__(self, name, direction, width, source):
+        self.name = name
+        self.direction = direction
+        self.width = width
+        self.source = source
+    
+    def __repr__(self):
+        return f"SpecPort({self.name!r}, {self.direction!r}, {self.width!r}, {self.source!r})"
+
+def _range_width(text):
+    """Bits of one 'msb:lsb' range (or a single 'n' index), or None if not constant."""
+    msb, sep, lsb = text.partition(':')
+    if not sep:
+        return 1 if msb.strip() else None
+    high = eval_constant(msb)
+    low = eval_constant(lsb)
+    # eval_constant gives None for anything it cannot evaluate, such as WIDTH-1
+    if high is None or low is None:
+        return None
+    return abs(high - low) + 1
+
+def normalize_port(text):
+    """Split a port as written in a spec into (name, width).
+    
+    Returns None for text that is not a port. The width is the product of
+    all ranges, 1 without a range, and None when a range is not constant.
+    """
+    m = _SPEC_PORT_RE.fullmatch(text.strip())
+    if m is None:
+        return None
+    name, ranges, suffix = m.groups()
+    width = 1
+    for bounds in _RANGE_RE.findall(ranges):
+        bits = _range_width(bounds)
+        width = None if bits is None or width is None else width * bits
+    return name + suffix, width
+
+def _add(index, module, port, issues):
+    """Add a spec port to index[module], noting conflicting duplicates."""
+    ports = index.setdefault(module, {})
+    previous = ports.get(port.name)
+    if previous is None:
+        ports[port.name] = port
+    elif (previous.direction, previous.width) != (port.direction, port.width):
+        issues.append({'kind': 'duplicate', 'module': module, 'port': port.name,
+                       'source': f"{previous.source}, {port.source}",
+                       'expected': f"{previous.direction} width {previous.width}",
+                       'actual': f"{port.direction} width {port.width}"})
+
+def load_block_ios(path, issues):
+    """Index a block_ios.txt listing as {section: {port: SpecPort}}.
+    
+    A section is a title line followed by 'inputs:' and 'outputs...:'
+    lines of comma-separated ports.
+    """
+    index = {}
+    section = None
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            head, sep, rest = line.partition(':')
+            head = head.strip().lower()
+            if not sep or not head.startswith(('input', 'output', 'inout')):
+                section = line
+                index.setdefault(section, {})
+                continue
+            if section is None:
+                continue
+            direction = 'input' if head.startswith('input') else 'inout' if head.startswith('inout') else 'output'
+            for item in rest.split(','):
+                parsed = normalize_port(item) if item.strip() else None
+                if parsed is not None:
+                    _add(index, section, SpecPort(parsed[0], direction, parsed[1],
+                                                  f"{Path(path).name}:{line_number}"), issues)
+    return index
+
+def _column(header, *keywords):
+    """Index of the first header cell containing one of the keywords, or None."""
+    for i, cell in enumerate(header):
+        if any(keyword in cell.strip().lower() for keyword in keywords):
+            return i
+    return None
+
+def load_register_map(path, top, issues):
+    """Index the Input/Output fields of a register map CSV as {top: {port: SpecPort}}.
+    
+    The name column may carry the range (RTGB<3:0>); otherwise the Width
+    column gives the width. Rows without a direction are internal
+    registers and are skipped.
+    """
+    index = {top: {}}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        name_col = _column(header, 'register name', 'name')
+        direction_col = _column(header, 'input/output', 'direction')
+        width_col = _column(header, 'width')
+        if name_col is None or direction_col is None:
+            raise ValueError(f"{path}: no name or Input/Output column in the header")
+        
+        for row_number, row in enumerate(reader, 2):
+            if len(row) <= max(name_col, direction_col):
+                continue
+            direction = row[direction_col].strip().lower()
+            if direction not in ('input', 'output', 'inout'):
+                continue
+            parsed = normalize_port(row[name_col])
+            if parsed is None:
+                continue
+            name, width = parsed
+            if '<' not in row[name_col] and '[' not in row[name_col] and width_col is not None:
+                try:
+                    width = int(row[width_col])
+                except (IndexError, ValueError):
+                    pass
+            _add(index, top, SpecPort(name, direction, width, f"{Path(path).name}:{row_number}"), issues)
+    return index
+
+def load_verilog_ports(paths):
+    """Index the ports of every module in the given files and directories as {module: {port: Port}}."""
+    index = {}
+    for verilog_file in expand_verilog_paths(paths):
+        try:
+            for module_name, inputs, outputs in parse_verilog_file_modules(verilog_file, records=True):
+                index.setdefault(module_name, {port.name: port for port in inputs + outputs})
+        except (OSError, ValueError) as e:
+            print(f"Warning: skipping {verilog_file}: {e}")
+    return index
+
+def match_sections(sections, modules):
+    """Map spec section titles to module names.
+    
+    Titles match a module with the same letters and digits ignoring case
+    and separators ('Command Interpreter' -> Command_Interpreter), or else
+    the only module whose name starts with them ('SPI' -> spiCore).
+    """
+    keys = {_SECTION_KEY_RE.sub('', module.lower()): module for module in modules}
+    matched = {}
+    for section in sections:
+        key = _SECTION_KEY_RE.sub('', section.lower())
+        if key in keys:
+            matched[section] = keys[key]
+            continue
+        candidates = [module for module_key, module in keys.items() if key and module_key.startswith(key)]
+        if len(candidates) == 1:
+            matched[section] = candidates[0]
+    return matched
+
+def cross_check(expected, actual, source, sections=None):
+    """Diff spec ports against Verilog ports; returns a list of issue dicts.
+    
+    expected is {section: {port: SpecPort}}, actual {module: {port: Port}}.
+    sections maps section titles to module names (default: identical).
+    """
+    issues = []
+    for section, spec_ports in expected.items():
+        module = (sections or {}).get(section, section if sections is None else None)
+        ports = actual.get(module) if module else None
+        if ports is None:
+            issues.append({'kind': 'no-module', 'module': section, 'port': None, 'source': source,
+                           'expected': f"{len(spec_ports)} ports", 'actual': None})
+            continue
+        for name, spec in spec_ports.items():
+            port = ports.get(name)
+            if port is None:
+                issues.append({'kind': 'missing', 'module': module, 'port': name, 'source': spec.source,
+                               'expected': f"{spec.direction} width {spec.width}", 'actual': None})
+                continue
+            if spec.direction != port.direction:
+                issues.append({'kind': 'direction', 'module': module, 'port': name, 'source': spec.source,
+                               'expected': spec.direction, 'actual': port.direction})
+            if spec.width is not None and port.width is not None and spec.width != port.width:
+                issues.append({'kind': 'width', 'module': module, 'port': name, 'source': spec.source,
+                               'expected': spec.width, 'actual': port.width})
+        for name, port in ports.items():
+            if name not in spec_ports:
+                issues.append({'kind': 'extra', 'module': module, 'port': name, 'source': source,
+                               'expected': None, 'actual': f"{port.direction} {port.label}"})
+    return issues
+
+_ICONS = {'missing': '❌', 'extra': '➕', 'width': '📏', 'direction': '🔀', 'duplicate': '♊',
+          'no-module': '❓'}
+
+def print_report(title, issues):
+    """Print the issues of one specification grouped by module."""
+    print(f"\n{'='*70}")
+    print(f"{title}: {len(issues)} issue(s)")
+    print(f"{'='*70}")
+    module = None
+    for issue in issues:
+        if issue['module'] != module:
+            module = issue['module']
+            print(f"\n📦 {module}")
+        icon = _ICONS[issue['kind']]
+        if issue['kind'] == 'missing':
+            print(f"  {icon} missing   {issue['port']} ({issue['expected']}, {issue['source']})")
+        elif issue['kind'] == 'extra':
+            print(f"  {icon} extra     {issue['actual']}")
+        elif issue['kind'] == 'duplicate':
+            print(f"  {icon} duplicate {issue['port']}: {issue['expected']} and {issue['actual']} "
+                  f"({issue['source']})")
+        elif issue['kind'] == 'no-module':
+            print(f"  {icon} no Verilog module found ({issue['expected']} expected)")
+        else:
+            print(f"  {icon} {issue['kind']:<9} {issue['port']}: expected {issue['expected']}, "
+                  f"Verilog {issue['actual']} ({issue['source']})")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description='Cross-check Verilog ports against block_ios.txt and the register map CSV',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Check source/ against block_ios.txt and the register map in this directory
+  %(prog)s
+  
+  # Only the register map, for another top module, with a JSON report
+  %(prog)s rtl/ --block-ios '' --register-map regmap.csv --top CHIP --json issues.json
+
+Exits with status 1 when any issue is found.
+        """
+    )
+    parser.add_argument('paths', nargs='*', default=['source'],
+                        help='Verilog files or directories (default: source)')
+    parser.add_argument('--block-ios', default=DEFAULT_BLOCK_IOS,
+                        help=f"Block port listing ('' to skip, default: {DEFAULT_BLOCK_IOS})")
+    parser.add_argument('--register-map', default=DEFAULT_REGISTER_MAP,
+                        help=f"Register map CSV ('' to skip, default: {DEFAULT_REGISTER_MAP})")
+    parser.add_argument('--top', default=DEFAULT_TOP,
+                        help=f'Module whose ports the register map describes (default: {DEFAULT_TOP})')
+    parser.add_argument('--json', metavar='FILE', help='Also write all issues as JSON')
+    args = parser.parse_args(argv)
+    
+    actual = load_verilog_ports(args.paths)
+    if not actual:
+        print("Error: no Verilog modules found")
+        sys.exit(1)
+    
+    reports = {}
+    try:
+        if args.block_ios:
+            issues = []
+            expected = load_block_ios(args.block_ios, issues)
+            issues += cross_check(expected, actual, Path(args.block_ios).name,
+                                  match_sections(expected, actual))
+            reports[args.block_ios] = issues
+        if args.register_map:
+            issues = []
+            expected = load_register_map(args.register_map, args.top, issues)
+            issues += cross_check(expected, actual, Path(args.register_map).name)
+            reports[args.register_map] = issues
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    for title, issues in reports.items():
+        print_report(title, issues)
+    
+    total = sum(len(issues) for issues in reports.values())
+    print(f"\n{'='*70}")
+    print(f"SUMMARY: {len(actual)} Verilog module(s), {total} issue(s)")
+    for title, issues in reports.items():
+        counts = {}
+        for issue in issues:
+            counts[issue['kind']] = counts.get(issue['kind'], 0) + 1
+        print(f"  {Path(title).name}: " + (', '.join(f"{n} {kind}" for kind, n in sorted(counts.items())) or 'OK'))
+    print(f"{'='*70}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=1)
+        print(f"📝 Issues saved to: {args.json}")
+    if total:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Differential Regression Harness for the Verilog symbol tools.
+Runs every implementation of each pipeline stage over the same inputs and
+checks that the fast paths agree with the reference ones:
+
+  parse      parse_verilog_module_reference() against the single-pass
+             parser, its Port records, the memory-mapped file parser and
+             the multi-module parsers
+  render     generate_svg() (fixed, compact and grouped pins) against the
+             SymbolIndex templates the converters write from
+  directory  a serial process_directory() run against worker processes,
+             the read-ahead/write-behind pipeline and a cached re-run
+  combine    the ElementTree sheet against the streaming writer, and a
+             patch_sheet() update against a full rebuild
+
+Port lists must be identical and symbols byte-identical; sheets are
+compared after XML canonicalisation, since the tree and streaming writers
+format them differently. The inputs are every .v file in source/,
+source/deprecated/, testbenches/ and adc/verilog/ plus seeded synthetic
+modules (random port styles, comments, parameters and body noise), and
+each path's time is reported next to its baseline.
+
+With --golden, the port lists and symbol hashes are also checked against
+a saved manifest, so changes in behaviour show up even when all paths
+agree; --update-golden rewrites it after an intended change.
+"""
+
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+import contextlib
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from verilog_to_svg import (GENERATOR_VERSION, parse_verilog_module, parse_verilog_module_reference,
+                            parse_verilog_modules, parse_verilog_file, parse_verilog_file_modules,
+                            generate_svg, SymbolIndex, process_directory, set_output_mode,
+                            expand_verilog_paths)
+from combine_svgs import combine, patch_sheet
+from benchmark import time_call, synthetic_module
+
+# Directories checked when no paths are given
+DEFAULT_PATHS = ['source', 'source/deprecated', 'testbenches', 'adc/verilog']
+
+# Synthetic modules generated per run, and the seed they are generated from
+DEFAULT_FUZZ = 200
+DEFAULT_SEED = 1
+
+# Golden manifest written by --update-golden
+DEFAULT_GOLDEN = 'regression_golden.json'
+
+# Files on which the reference parser is known to be wrong, with the reason.
+# Only their reference comparison is excused; the fast paths must still agree.
+KNOWN_DIVERGENCES = {
+    'ns_sar.v': 'the reference parser drops ports whose declaration has an `ifdef/attribute '
+                'block between the direction and the name (comparator_digital)',
+}
+
+# Mismatches printed in full; the rest are only counted
+MAX_REPORTED = 20
+
+# Symbol variants rendered for each module: (name, compact, pin_layout)
+VARIANTS = (('svg', False, 'fixed'), ('compact', True, 'fixed'), ('grouped', False, 'grouped'))
+
+class Case:
+    """One input file; reference is False for modules the reference parser cannot read."""
+    
+    def __init__(self, name, path, code, reference=True):
+        self.name = name
+        self.path = path
+        self.code = code
+        self.reference = reference
+
+def _identifier(rng, index):
+    """Random port name, unique within its module through the index suffix."""
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ' if rng.random() < 0.5 else 'abcdefghijklmnopqrstuvwxyz'
+    return 'p_' + ''.join(rng.choice(letters) for _ in range(rng.randint(1, 8))) + str(index)
+
+def fuzz_module(rng, name, extended=False):
+    """Return Verilog source for a random module.
+    
+    The base features (ANSI or non-ANSI ports, simple parameter lists,
+    types, ranges, some shifted with '<<', comment headings, some with '&'
+    and '<', block comments holding port-like text and body noise) are
+    all read by the reference parser. With extended, attributes, `ifdef
+    lines, ANSI names sharing a declaration and nested parameter
+    expressions are added, which only the fast paths read.
+    """
+    ports = rng.randint(1, 40)
+    ansi = rng.random() < 0.6
+    params = rng.random() < 0.4
+    lines = [f'// Fuzzed module {name}']
+    if params:
+        width = f'$clog2({rng.randint(2, 64)})' if extended and rng.random() < 0.5 else str(rng.randint(1, 32))
+        lines.append(f'module {name} #(parameter WIDTH = {width}, parameter DEPTH = {rng.randint(1, 64)}) (')
+    else:
+        lines.append(f'module {name} (')
+    
+    names = [_identifier(rng, i) for i in range(ports)]
+    declarations = []
+    for i, port in enumerate(names):
+        direction = rng.choice(('input', 'input', 'output', 'output', 'inout'))
+        kind = rng.choice(('', '', 'wire ', 'logic ', 'signed ', 'wire signed '))
+        if direction == 'output' and rng.random() < 0.2:
+            kind = 'reg '
+        width = rng.choice(('', '', f'[{rng.randint(1, 63)}:0] ', f'[0:{rng.randint(1, 15)}] ')
+                           + (('[WIDTH-1:0] ', '[(WIDTH<<1)-1:0] ') if params else ()))
+        declarations.append(f'{direction} {kind}{width}{port}')
+    
+    def noise(i):
+        """Comment lines and blank lines placed before port i."""
+        out = []
+        if rng.random() < 0.15:
+            # Headings become SVG text in the grouped layout, so some need escaping
+            out.append(f'    // {rng.choice(("Group", "Bank", "Section", "Clock & reset <async>"))} {i}')
+        if rng.random() < 0.05:
+            out.append(f'    /* input fake_{i}, output fake_out_{i}; */')
+        if rng.random() < 0.1:
+            out.append('')
+        if extended and rng.random() < 0.1:
+            out.append('`ifdef FUZZ_OPTION')
+            out.append('`endif')
+        return out
+    
+    if ansi:
+        i = 0
+        while i < ports:
+            lines.extend(noise(i))
+            declaration = declarations[i]
+            if extended and rng.random() < 0.1:
+                declaration = '(* keep *) ' + declaration
+            # Extended: following names share the declaration
+            while extended and i + 1 < ports and rng.random() < 0.2:
+                i += 1
+                declaration += f', {names[i]}'
+            trailing = f' // {rng.choice(("active low", "sync", "bus"))}' if rng.random() < 0.1 else ''
+            lines.append(f'    {declaration}{"," if i < ports - 1 else ""}{trailing}')
+            i += 1
+        lines.append(');')
+    else:
+        for i, port in enumerate(names):
+            lines.extend(noise(i))
+            lines.append(f'    {port}{"," if i < ports - 1 else ""}')
+        lines.append(');')
+        for i, declaration in enumerate(declarations):
+            if rng.random() < 0.1:
+                lines.append(f'// output decoy_{i} in a comment;')
+            lines.append(f'{declaration};')
+    
+    # Body noise: nets, assignments, instances and a process
+    for i in range(rng.randint(0, 6)):
+        lines.append(f'wire n{i};')
+        lines.append(f'assign n{i} = {names[i % ports]};')
+        lines.append(f'INVX1 u{i} (.A(n{i}), .Y());')
+    if rng.random() < 0.3:
+        lines.append('always @(*) begin')
+        lines.append('    // output and input are only words here')
+        lines.append('end')
+    lines.append('endmodule')
+    lines.append('')
+    return ('\r\n' if rng.random() < 0.05 else '\n').join(lines)
+
+def fuzz_cases(count, seed, work_dir):
+    """Write count seeded synthetic modules to work_dir; return their Cases.
+    
+    A quarter use the extended features; one in ten is a benchmark.py
+    netlist, and some files hold several modules.
+    """
+    rng = random.Random(seed)
+    cases = []
+    work_dir.mkdir(parents=True, exist_ok=True)
+    for number in range(count):
+        name = f'fuzz_{number:04d}'
+        if number % 10 == 9:
+            style = rng.choice(('ansi', 'non-ansi', 'param'))
+            code = synthetic_module(name, rng.randint(1, 300), style, rng)
+            extended = False
+        else:
+            extended = rng.random() < 0.25
+            modules = rng.choice((1, 1, 1, 2, 3))
+            code = '\n'.join(fuzz_module(rng, f'{name}_{m}' if m else name, extended)
+                             for m in range(modules))
+        path = work_dir / f'{name}.v'
+        path.write_bytes(code.encode())
+        cases.append(Case(name, path, code, reference=not extended))
+    return cases
+
+class Harness:
+    """Collects timings, mismatches and golden hashes while the stages run."""
+    
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.timings = {}
+        self.counts = {}
+        self.baselines = {}
+        self.mismatches = []
+        self.known = []
+        self.golden = {}
+    
+    def timed(self, stage, path, func, arg, baseline=False):
+        """Run func(arg) (best of repeat) and add its time to stage/path."""
+        seconds, result = time_call(func, arg, self.repeat)
+        self.add_time(stage, path, seconds, baseline)
+        return result
+    
+    def add_time(self, stage, path, seconds, baseline=False):
+        paths = self.timings.setdefault(stage, {})
+        paths[path] = paths.get(path, 0.0) + seconds
+        counts = self.counts.setdefault(stage, {})
+        counts[path] = counts.get(path, 0) + 1
+        if baseline:
+            self.baselines[stage] = path
+    
+    def compare(self, stage, path, baseline, case, expected, actual, detail=None):
+        """Record a mismatch unless actual equals expected."""
+        if expected == actual:
+            return True
+        reason = KNOWN_DIVERGENCES.get(Path(case).name)
+        entry = {'stage': stage, 'path': path, 'baseline': baseline, 'input': str(case),
+                 'detail': detail or _difference(expected, actual)}
+        if reason is not None and baseline == 'reference':
+            entry['reason'] = reason
+            self.known.append(entry)
+        else:
+            self.mismatches.append(entry)
+        return False
+
+def _difference(expected, actual):
+    """Short description of where two results first differ."""
+    if isinstance(expected, (bytes, str)) and isinstance(actual, (bytes, str)):
+        for offset, (a, b) in enumerate(zip(expected, actual)):
+            if a != b:
+                break
+        else:
+            offset = min(len(expected), len(actual))
+        return (f"differs at offset {offset} (lengths {len(expected)} and {len(actual)}): "
+                f"{expected[offset:offset + 40]!r} vs {actual[offset:offset + 40]!r}")
+    return f"{str(expected)[:200]} vs {str(actual)[:200]}"
+
+def _names(result):
+    """A parse result with Port records reduced to names (errors pass through)."""
+    if result and result[0] == 'error':
+        return result
+    module_name, inputs, outputs = result
+    return module_name, [str(port) for port in inputs], [str(port) for port in outputs]
+
+def _digest(data):
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def _canonical(svg_file):
+    """Canonical XML of a sheet, with namespace prefixes rewritten."""
+    with open(svg_file, 'r') as f:
+        return ET.canonicalize(f.read(), rewrite_prefixes=True)
+
+def run_parse(harness, case):
+    """Parse stage for one file; returns the single-pass Port records (or an error tuple)."""
+    stage = 'parse'
+    code = case.code
+    fast = harness.timed(stage, 'single-pass', parse_verilog_module, code)
+    if case.reference:
+        reference = harness.timed(stage, 'reference', parse_verilog_module_reference, code, baseline=True)
+        harness.compare(stage, 'single-pass', 'reference', case.name, reference, fast)
+    records = harness.timed(stage, 'records', lambda text: parse_verilog_module(text, records=True), code)
+    harness.compare(stage, 'records', 'single-pass', case.name, fast, _names(records))
+    mapped = harness.timed(stage, 'mmap', lambda path: parse_verilog_file(path, records=True), case.path)
+    harness.compare(stage, 'mmap', 'records', case.name, records, mapped)
+    modules = harness.timed(stage, 'all-modules', lambda text: list(parse_verilog_modules(text, records=True)), code)
+    mapped_modules = harness.timed(stage, 'all-modules-mmap',
+                                   lambda path: list(parse_verilog_file_modules(path, records=True)), case.path)
+    harness.compare(stage, 'all-modules-mmap', 'all-modules', case.name, modules, mapped_modules)
+    return records
+
+def run_render(harness, case, records):
+    """Render stage for one module: direct rendering against SymbolIndex templates."""
+    stage = 'render'
+    module_name, inputs, outputs = records
+    golden = {'module': module_name,
+              'ports': _digest(repr((inputs, outputs)))}
+    # One index for all variants, as in a converter process, so signatures must not collide
+    index = SymbolIndex()
+    for variant, compact, pin_layout in VARIANTS:
+        direct = harness.timed(stage, variant,
+                               lambda name: generate_svg(name, inputs, outputs, compact, pin_layout),
+                               module_name, baseline=variant == 'svg')
+        golden[variant] = _digest(direct)
+        try:
+            ET.fromstring(direct)
+        except ET.ParseError as e:
+            harness.compare(stage, f'{variant}-xml', variant, case.name, 'well-formed', 'malformed',
+                            f'not well-formed XML: {e}')
+        
+        # First write renders and splits the template, the second reuses it
+        for label in ('template', 'template-hit'):
+            buffer = io.StringIO()
+            start = time.perf_counter()
+            index.write(buffer, module_name, inputs, outputs, compact, pin_layout)
+            harness.add_time(stage, f'{variant}-{label}', time.perf_counter() - start)
+            harness.compare(stage, f'{variant}-{label}', variant, case.name, direct, buffer.getvalue())
+    return golden
+
+def _output_files(directory):
+    """{relative path: bytes} of the symbols written below directory."""
+    return {str(path.relative_to(directory)): path.read_bytes()
+            for path in sorted(directory.rglob('*.svg'))}
+
+def run_directory(harness, cases, work_dir, jobs):
+    """Directory stage: every process_directory() mode on one flat copy of the inputs."""
+    stage = 'directory'
+    source_dir = work_dir / 'directory'
+    source_dir.mkdir()
+    for case in cases:
+        shutil.copyfile(case.path, source_dir / (case.name.replace('/', '__') if case.name.endswith('.v')
+                                                 else case.name + '.v'))
+    
+    runs = (('serial', {}), (f'jobs-{jobs}', {'jobs': jobs}),
+            ('pipeline', {'read_ahead': 8, 'write_behind': 8}),
+            ('cache-miss', {'cache_file': str(work_dir / 'cache.json')}),
+            ('cache-hit', {'cache_file': str(work_dir / 'cache.json')}))
+    outputs = {}
+    for label, options in runs:
+        output_dir = work_dir / ('out-cache' if label.startswith('cache') else f'out-{label}')
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            set_output_mode(quiet=True)
+            try:
+                process_directory(str(source_dir), str(output_dir), **options)
+            finally:
+                set_output_mode()
+        harness.add_time(stage, label, time.perf_counter() - start, baseline=label == 'serial')
+        outputs[label] = _output_files(output_dir)
+        if label != 'serial':
+            harness.compare(stage, label, 'serial', str(source_dir), sorted(outputs['serial']),
+                            sorted(outputs[label]), 'different sets of symbols written')
+            for name, data in outputs[label].items():
+                if name in outputs['serial']:
+                    harness.compare(stage, label, 'serial', name, outputs['serial'][name], data)
+    return work_dir / 'out-serial'
+
+def run_combine(harness, symbol_dir, work_dir):
+    """Combine stage: tree and streaming sheets, and patching against rebuilding."""
+    stage = 'combine'
+    paths = sorted(str(path) for path in symbol_dir.glob('*.svg'))
+    if not paths:
+        return None
+    sheets = {}
+    for label, layout, stream in (('tree', 'grid', False), ('stream', 'grid', True),
+                                  ('shelf-tree', 'shelf', False), ('shelf-stream', 'shelf', True)):
+        sheet = work_dir / f'sheet-{label}.svg'
+        start = time.perf_counter()
+        combine(paths, str(sheet), layout=layout, stream=stream)
+        harness.add_time(stage, label, time.perf_counter() - start, baseline=label == 'tree')
+        sheets[label] = _canonical(sheet)
+    harness.compare(stage, 'stream', 'tree', 'sheet', sheets['tree'], sheets['stream'])
+    harness.compare(stage, 'shelf-stream', 'shelf-tree', 'sheet', sheets['shelf-tree'], sheets['shelf-stream'])
+    
+    # Rename the first symbol's module (same length, so the layout holds), then
+    # patch the streamed sheet and compare it with a rebuild
+    patch_dir = work_dir / 'patch'
+    shutil.copytree(symbol_dir, patch_dir)
+    paths = sorted(str(path) for path in patch_dir.glob('*.svg'))
+    sheet = work_dir / 'sheet-patch.svg'
+    combine(paths, str(sheet), stream=True)
+    target = Path(paths[0])
+    text = target.read_text()
+    marker = 'class="module-name">'
+    start = text.find(marker) + len(marker)
+    end = text.find('<', start)
+    text = text[:start] + text[start:end].swapcase() + text[end:]
+    target.write_text(text)
+    begin = time.perf_counter()
+    patched = patch_sheet(paths, str(sheet))
+    harness.add_time(stage, 'patch', time.perf_counter() - begin)
+    rebuilt = work_dir / 'sheet-rebuild.svg'
+    begin = time.perf_counter()
+    combine(paths, str(rebuilt), stream=True)
+    harness.add_time(stage, 'rebuild', time.perf_counter() - begin)
+    if patched is None:
+        harness.compare(stage, 'patch', 'rebuild', target.name, 'patched', 'rebuilt',
+                        'patch_sheet() asked for a rebuild after a same-size change')
+    else:
+        harness.compare(stage, 'patch', 'rebuild', target.name, _canonical(rebuilt), _canonical(sheet))
+    return _digest(sheets['tree'])
+
+def check_golden(harness, golden_file, fuzz, seed, update):
+    """Compare the collected hashes with the manifest, or rewrite it."""
+    manifest = {'generator_version': GENERATOR_VERSION, 'fuzz': fuzz, 'seed': seed, 'inputs': harness.golden}
+    if update:
+        with open(golden_file, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+            f.write('\n')
+        print(f"✅ Golden manifest written to: {golden_file} ({len(harness.golden)} inputs)")
+        return []
+    with open(golden_file, 'r') as f:
+        saved = json.load(f)
+    changed = []
+    for name, entry in harness.golden.items():
+        expected = saved['inputs'].get(name)
+        if expected is None:
+            continue
+        for key in sorted(set(entry) | set(expected)):
+            if entry.get(key) != expected.get(key):
+                changed.append(f"{name}: {key} {expected.get(key)} -> {entry.get(key)}")
+    skipped = len(set(harness.golden) - set(saved['inputs']))
+    if skipped:
+        print(f"ℹ️  {skipped} input(s) not in {golden_file} (other paths, --fuzz or --seed)")
+    return changed
+
+def print_timings(harness):
+    """Per-stage table of each path's total time next to the stage baseline."""
+    print(f"\n{'='*78}")
+    print(f"{'Stage':<11}{'Path':<26}{'runs':>7}{'total ms':>12}{'per run ms':>12}{'vs base':>10}")
+    print(f"{'─'*78}")
+    for stage, paths in harness.timings.items():
+        base = paths.get(harness.baselines.get(stage))
+        for number, (path, seconds) in enumerate(paths.items()):
+            runs = harness.counts[stage][path]
+            ratio = f"{base / seconds:.2f}x" if base and seconds else '-'
+            print(f"{stage if number == 0 else '':<11}{path:<26}{runs:>7}{seconds * 1e3:>12.2f}"
+                  f"{seconds * 1e3 / runs:>12.3f}{ratio:>10}")
+    print(f"{'─'*78}")
+    print("vs base: baseline time / path time, so above 1x is faster than the baseline\n")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description='Check that the fast parse/render/combine paths agree with the reference ones',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+Examples:
+  # All paths over source/, source/deprecated/, testbenches/, adc/verilog/ and {DEFAULT_FUZZ} fuzzed modules
+  %(prog)s
+  
+  # A larger fuzz run with another seed, results as JSON
+  %(prog)s --fuzz 2000 --seed 7 --json regression.json
+  
+  # Pin the current output, then check later changes against it
+  %(prog)s --golden {DEFAULT_GOLDEN} --update-golden
+  %(prog)s --golden {DEFAULT_GOLDEN}
+  
+  # Quick check of one directory, parse and render only
+  %(prog)s source/ --fuzz 0 --skip-directory
+        """
+    )
+    parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS,
+                        help=f'Verilog files or directories (default: {" ".join(DEFAULT_PATHS)})')
+    parser.add_argument('--fuzz', type=int, default=DEFAULT_FUZZ, metavar='N',
+                        help='Number of synthetic modules to add (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help='Seed of the synthetic modules (default: %(default)s)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Timed runs per parse/render call; the best is reported (default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int, default=2,
+                        help='Worker processes of the parallel directory run (default: %(default)s)')
+    parser.add_argument('--skip-directory', action='store_true',
+                        help='Skip the directory and combine stages (no files written)')
+    parser.add_argument('--golden', metavar='FILE',
+                        help='Also compare port lists and symbol hashes with this manifest')
+    parser.add_argument('--update-golden', action='store_true',
+                        help='Write the manifest given by --golden instead of comparing with it')
+    parser.add_argument('--keep', metavar='DIR',
+                        help='Work in DIR (fuzzed sources, symbols, sheets) and keep it afterwards')
+    parser.add_argument('--json', metavar='FILE',
+                        help='Write timings, mismatches and known divergences as JSON to FILE')
+    args = parser.parse_args(argv)
+    
+    if args.update_golden and not args.golden:
+        parser.error("--update-golden needs --golden FILE")
+    if args.fuzz < 0 or args.repeat < 1 or args.jobs < 1:
+        parser.error("--fuzz must be 0 or positive, --repeat and --jobs positive")
+    
+    with contextlib.ExitStack() as stack:
+        if args.keep:
+            work_dir = Path(args.keep)
+            work_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            work_dir = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix='pepper_regress_')))
+        
+        cases = []
+        for verilog_file in expand_verilog_paths(args.paths):
+            with open(verilog_file, 'r', newline='') as f:
+                cases.append(Case(str(verilog_file), verilog_file, f.read()))
+        real = len(cases)
+        cases.extend(fuzz_cases(args.fuzz, args.seed, work_dir / 'fuzz'))
+        if not cases:
+            print("No Verilog files (.v or .sv) found")
+            sys.exit(1)
+        print(f"🔬 Checking {real} file(s) and {len(cases) - real} fuzzed module(s), best of {args.repeat}")
+        
+        harness = Harness(args.repeat)
+        for case in cases:
+            records = run_parse(harness, case)
+            if records and records[0] == 'error':
+                harness.golden[case.name] = {'error': records[1]}
+            else:
+                harness.golden[case.name] = run_render(harness, case, records)
+        if not args.skip_directory:
+            symbol_dir = run_directory(harness, cases, work_dir, args.jobs)
+            sheet = run_combine(harness, symbol_dir, work_dir)
+            if sheet is not None:
+                harness.golden['(sheet)'] = {'canonical': sheet}
+    
+    print_timings(harness)
+    
+    changed = []
+    if args.golden:
+        changed = check_golden(harness, args.golden, args.fuzz, args.seed, args.update_golden)
+    
+    for entry in harness.known:
+        print(f"ℹ️  Known divergence, {entry['stage']}/{entry['path']} vs {entry['baseline']} "
+              f"on {entry['input']}: {entry['reason']}")
+    for entry in harness.mismatches[:MAX_REPORTED]:
+        print(f"❌ {entry['stage']}/{entry['path']} vs {entry['baseline']} on {entry['input']}: {entry['detail']}")
+    if len(harness.mismatches) > MAX_REPORTED:
+        print(f"   ... and {len(harness.mismatches) - MAX_REPORTED} more")
+    for line in changed[:MAX_REPORTED]:
+        print(f"❌ Golden: {line}")
+    if len(changed) > MAX_REPORTED:
+        print(f"   ... and {len(changed) - MAX_REPORTED} more")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'meta': {'generator_version': GENERATOR_VERSION, 'fuzz': args.fuzz, 'seed': args.seed,
+                                'repeat': args.repeat, 'inputs': len(cases)},
+                       'timings_ms': {stage: {path: round(seconds * 1e3, 3) for path, seconds in paths.items()}
+                                      for stage, paths in harness.timings.items()},
+                       'mismatches': harness.mismatches, 'known_divergences': harness.known,
+                       'golden_changes': changed}, f, indent=2)
+        print(f"✅ Results written to: {args.json}")
+    
+    if harness.mismatches or changed:
+        print(f"\n❌ {len(harness.mismatches)} mismatch(es), {len(changed)} golden change(s)")
+        sys.exit(1)
+    print(f"\n✅ All paths agree on {len(cases)} input(s)")
+
+if __name__ == '__main__':
+    main()
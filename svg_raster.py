@@ -0,0 +1,670 @@
+#!/usr/bin/env python3
+"""
+SVG Sheet Rasteriser
+Renders the symbol sheets and block diagrams drawn by these tools (rect,
+line, circle, polyline and text elements, <use> of shared <symbol>s and
+CSS classes) to PNG, and to JPEG when Pillow is installed.
+
+The image is rendered in square tiles, one band of tiles at a time, and
+each band is compressed into the PNG as soon as it is complete, so a huge
+sheet never needs a full-resolution framebuffer. Tiles can be rendered in
+a process pool. Shapes are sampled at pixel centres without anti-aliasing
+and text is drawn with a built-in 5x7 pixel font, so the output is the
+same for every tile size and number of jobs.
+"""
+
+import os
+import re
+import sys
+import math
+import zlib
+import struct
+import argparse
+import collections
+import contextlib
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:  # only needed for JPEG output
+    Image = None
+
+# Default resolution; SVG user units are CSS pixels, 96 per inch
+DPI = 96
+# Default tile edge in pixels
+TILE_SIZE = 512
+# Compressed bytes per PNG IDAT chunk
+IDAT_SIZE = 1 << 16
+JPEG_QUALITY = 90
+
+XLINK_HREF = '{http://www.w3.org/1999/xlink}href'
+
+# 5x7 pixel font for ASCII 32-126: five column bytes per glyph, bit 0 is the
+# top row. Glyphs are 0.7 em tall with a 0.6 em advance, close to Arial.
+_FONT = bytes.fromhex(
+    '0000000000' '00005f0000' '0007000700' '147f147f14' '242a7f2a12' '2313086462' '3649552250'
+    '0005030000' '001c224100' '0041221c00' '14083e0814' '08083e0808' '0050300000' '0808080808'
+    '0060600000' '2010080402' '3e5149453e' '00427f4000' '4261514946' '2141454b31' '1814127f10'
+    '2745454539' '3c4a494930' '0171090503' '3649494936' '064949291e' '0036360000' '0056360000'
+    '0814224100' '1414141414' '0041221408' '0201510906' '324979413e' '7e1111117e' '7f49494936'
+    '3e41414122' '7f4141221c' '7f49494941' '7f09090101' '3e41415132' '7f0808087f' '00417f4100'
+    '2040413f01' '7f08142241' '7f40404040' '7f020c027f' '7f0408107f' '3e4141413e' '7f09090906'
+    '3e4151215e' '7f09192946' '4649494931' '01017f0101' '3f4040403f' '1f2040201f' '3f4038403f'
+    '6314081463' '0708700807' '6151494543' '007f414100' '0204081020' '0041417f00' '0402010204'
+    '4040404040' '0001020400' '2054545478' '7f48444438' '3844444420' '384444487f' '3854545418'
+    '087e090102' '0c5252523e' '7f08040478' '00447d4000' '2040443d00' '7f10284400' '00417f4000'
+    '7c04180478' '7c08040478' '3844444438' '7c14141408' '081414187c' '7c08040408' '4854545420'
+    '043f444020' '3c4040207c' '1c2040201c' '3c4030403c' '4428102844' '0c5050503c' '4464544c44'
+    '0008364100' '00007f0000' '0041360800' '0804081008'
+)
+_GLYPH_ROWS = 7
+_GLYPH_ADVANCE = 6
+_UNKNOWN_GLYPH = (ord('?') - 32) * 5
+
+# Properties children inherit, with their initial values
+_INITIAL_STYLE = {
+    'fill': 'black',
+    'stroke': 'none',
+    'stroke-width': '1',
+    'stroke-dasharray': 'none',
+    'stroke-linejoin': 'miter',
+    'font-size': '16',
+    'font-weight': 'normal',
+    'text-anchor': 'start',
+}
+
+_NAMED_COLOURS = {
+    'black': b'\x00\x00\x00', 'white': b'\xff\xff\xff', 'red': b'\xff\x00\x00',
+    'green': b'\x00\x80\x00', 'blue': b'\x00\x00\xff', 'gray': b'\x80\x80\x80',
+    'grey': b'\x80\x80\x80',
+}
+
+# Elements that are only drawn through a <use> reference, or never
+_NOT_DRAWN = frozenset(('defs', 'symbol', 'style', 'title', 'desc', 'metadata'))
+
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CSS_RULE_RE = re.compile(r'([^{}]+)\{([^}]*)\}')
+_TRANSFORM_RE = re.compile(r'(\w+)\s*\(([^)]*)\)')
+_NUMBER_SPLIT_RE = re.compile(r'[\s,]+')
+
+def _local_name(tag):
+    return tag.rpartition('}')[2]
+
+def _length(value, default=0.0):
+    """A length attribute in user units (a px suffix is accepted)."""
+    if value is None:
+        return default
+    try:
+        return float(value.strip().removesuffix('px'))
+    except ValueError:
+        return default
+
+def _numbers(text):
+    return [float(v) for v in _NUMBER_SPLIT_RE.split(text.strip()) if v]
+
+def parse_colour(value):
+    """RGB bytes of an SVG paint, or None for 'none' and unsupported paints."""
+    value = value.strip().lower()
+    if value.startswith('#'):
+        digits = value[1:]
+        if len(digits) == 3:
+            digits = ''.join(c * 2 for c in digits)
+        try:
+            return bytes.fromhex(digits) if len(digits) == 6 else None
+        except ValueError:
+            return None
+    if value.startswith('rgb(') and value.endswith(')'):
+        channels = [min(255, max(0, round(v))) for v in _numbers(value[4:-1].replace('%', ''))]
+        return bytes(channels) if len(channels) == 3 else None
+    return _NAMED_COLOURS.get(value)
+
+def _declarations(text):
+    props = {}
+    for item in text.split(';'):
+        name, sep, value = item.partition(':')
+        if sep:
+            props[name.strip()] = value.strip()
+    return props
+
+def parse_css(text):
+    """Rules of a stylesheet as (selector kind, name, properties).
+    
+    Only plain type (text) and class (.pin) selectors are supported, which
+    is what the compact symbols use; other rules are ignored.
+    """
+    rules = []
+    for selectors, body in _CSS_RULE_RE.findall(_CSS_COMMENT_RE.sub('', text)):
+        props = _declarations(body)
+        for selector in selectors.split(','):
+            selector = selector.strip()
+            if re.fullmatch(r'\.[\w-]+', selector):
+                rules.append(('class', selector[1:], props))
+            elif re.fullmatch(r'[\w-]+', selector):
+                rules.append(('tag', selector, props))
+    return rules
+
+def _compose(transform, text):
+    """Apply an SVG transform attribute to (sx, sy, tx, ty), left to right.
+    
+    Only translate, scale and matrices without rotation or skew occur in
+    the sheets, so device = (x * sx + tx, y * sy + ty) is enough.
+    """
+    sx, sy, tx, ty = transform
+    for name, args in _TRANSFORM_RE.findall(text):
+        values = _numbers(args)
+        if name == 'translate' and values:
+            tx += values[0] * sx
+            ty += (values[1] if len(values) > 1 else 0.0) * sy
+        elif name == 'scale' and values:
+            sx, sy = sx * values[0], sy * (values[1] if len(values) > 1 else values[0])
+        elif name == 'matrix' and len(values) == 6 and values[1] == values[2] == 0:
+            tx += values[4] * sx
+            ty += values[5] * sy
+            sx, sy = sx * values[0], sy * values[3]
+        else:
+            raise ValueError(f"Unsupported transform: {name}({args})")
+    return sx, sy, tx, ty
+
+# Drawing operations are tuples (kind, bbox, colour, ...) in device pixels;
+# bbox is (x0, y0, x1, y1). Each kind has a function returning the covered
+# x intervals of the horizontal line through a row's pixel centres.
+
+def _box(x0, y0, x1, y1, rx=0.0, ry=0.0):
+    return (x0, y0, x1, y1, min(rx, (x1 - x0) / 2), min(ry, (y1 - y0) / 2))
+
+def _box_interval(box, yc):
+    x0, y0, x1, y1, rx, ry = box
+    if yc < y0 or yc >= y1:
+        return None
+    inset = 0.0
+    if ry > 0:
+        d = max(y0 + ry - yc, yc - (y1 - ry))
+        if d > 0:
+            inset = rx * (1 - math.sqrt(max(0.0, 1 - (d / ry) ** 2)))
+    return x0 + inset, x1 - inset
+
+def _disc_interval(cx, cy, r, yc):
+    d = r * r - (yc - cy) ** 2
+    if d <= 0:
+        return None
+    half = math.sqrt(d)
+    return cx - half, cx + half
+
+def _subtract(outer, inner):
+    """outer minus inner, as a list of intervals."""
+    if outer is None:
+        return ()
+    if inner is None or inner[1] <= outer[0] or inner[0] >= outer[1]:
+        return (outer,)
+    return tuple(span for span in ((outer[0], inner[0]), (inner[1], outer[1])) if span[1] > span[0])
+
+def _box_spans(op, yc):
+    return _subtract(_box_interval(op[3], yc), op[4] and _box_interval(op[4], yc))
+
+def _disc_spans(op, yc):
+    _, _, _, cx, cy, r, inner = op
+    return _subtract(_disc_interval(cx, cy, r, yc), inner and _disc_interval(cx, cy, inner, yc))
+
+def _poly_spans(op, yc):
+    points = op[3]
+    xs = []
+    px, py = points[-1]
+    for qx, qy in points:
+        if (py <= yc < qy) or (qy <= yc < py):
+            xs.append(px + (yc - py) * (qx - px) / (qy - py))
+        px, py = qx, qy
+    return ((min(xs), max(xs)),) if len(xs) >= 2 else ()
+
+def _text_spans(op, yc):
+    _, _, _, left, top, cell, offsets, bold = op
+    row = math.floor((yc - top) / cell)
+    if not 0 <= row < _GLYPH_ROWS:
+        return ()
+    bit = 1 << row
+    spans = []
+    for i, offset in enumerate(offsets):
+        x = left + i * _GLYPH_ADVANCE * cell
+        for column in range(5):
+            if _FONT[offset + column] & bit:
+                spans.append((x + column * cell, x + (column + 1 + bold) * cell))
+    return spans
+
+_SPANS = {'box': _box_spans, 'disc': _disc_spans, 'poly': _poly_spans, 'text': _text_spans}
+
+class _Builder:
+    """Walks an SVG tree and collects its drawing operations in paint order."""
+    
+    def __init__(self, root):
+        self.ops = []
+        self.ids = {elem.get('id'): elem for elem in root.iter() if elem.get('id')}
+        self.tag_rules = []
+        self.class_rules = []
+        for elem in root.iter():
+            if _local_name(elem.tag) == 'style' and elem.text:
+                for kind, name, props in parse_css(elem.text):
+                    (self.class_rules if kind == 'class' else self.tag_rules).append((name, props))
+        self.using = set()
+    
+    def style(self, elem, tag, parent):
+        """Computed style: inherited, presentation attributes, CSS, style attribute."""
+        style = dict(parent)
+        for name in _INITIAL_STYLE:
+            value = elem.get(name)
+            if value is not None:
+                style[name] = value
+        for name, props in self.tag_rules:
+            if name == tag:
+                style.update(props)
+        classes = elem.get('class', '').split()
+        if classes:
+            for name, props in self.class_rules:
+                if name in classes:
+                    style.update(props)
+        if elem.get('style'):
+            style.update(_declarations(elem.get('style')))
+        return style
+    
+    def walk(self, elem, transform, parent_style):
+        tag = _local_name(elem.tag)
+        if tag in _NOT_DRAWN:
+            return
+        style = self.style(elem, tag, parent_style)
+        if elem.get('transform'):
+            transform = _compose(transform, elem.get('transform'))
+        
+        if tag in ('g', 'svg'):
+            for child in elem:
+                self.walk(child, transform, style)
+        elif tag == 'use':
+            self.use(elem, transform, style)
+        elif tag == 'rect':
+            self.rect(elem, transform, style)
+        elif tag == 'circle':
+            self.circle(elem, transform, style)
+        elif tag == 'line':
+            points = [(_length(elem.get('x1')), _length(elem.get('y1'))),
+                      (_length(elem.get('x2')), _length(elem.get('y2')))]
+            self.stroke_path(points, transform, style)
+        elif tag in ('polyline', 'polygon'):
+            values = _numbers(elem.get('points', ''))
+            points = list(zip(values[0::2], values[1::2]))
+            if tag == 'polygon' and points:
+                points.append(points[0])
+            self.stroke_path(points, transform, style)
+        elif tag == 'text':
+            self.text(elem, transform, style)
+    
+    def use(self, elem, transform, style):
+        href = elem.get(XLINK_HREF) or elem.get('href') or ''
+        target = self.ids.get(href[1:]) if href.startswith('#') else None
+        if target is None or href in self.using:
+            return
+        sx, sy, tx, ty = transform
+        transform = (sx, sy, tx + _length(elem.get('x')) * sx, ty + _length(elem.get('y')) * sy)
+        self.using.add(href)
+        if _local_name(target.tag) == 'symbol':
+            for child in target:
+                self.walk(child, transform, style)
+        else:
+            self.walk(target, transform, style)
+        self.using.discard(href)
+    
+    def add(self, kind, bbox, colour, *params):
+        self.ops.append((kind, bbox, colour) + params)
+    
+    def rect(self, elem, transform, style):
+        sx, sy, tx, ty = transform
+        x0 = _length(elem.get('x')) * sx + tx
+        y0 = _length(elem.get('y')) * sy + ty
+        x1 = x0 + _length(elem.get('width')) * sx
+        y1 = y0 + _length(elem.get('height')) * sy
+        if x1 <= x0 or y1 <= y0:
+            return
+        rx, ry = elem.get('rx'), elem.get('ry')
+        rx, ry = _length(rx if rx is not None else ry) * sx, _length(ry if ry is not None else rx) * sy
+        
+        fill = parse_colour(style['fill'])
+        if fill is not None:
+            self.add('box', (x0, y0, x1, y1), fill, _box(x0, y0, x1, y1, rx, ry), None)
+        stroke = parse_colour(style['stroke'])
+        if stroke is not None:
+            half = self.stroke_width(style, transform) / 2
+            outer = _box(x0 - half, y0 - half, x1 + half, y1 + half,
+                         rx + half if rx else 0.0, ry + half if ry else 0.0)
+            inner = None
+            if x1 - x0 > 2 * half and y1 - y0 > 2 * half:
+                inner = _box(x0 + half, y0 + half, x1 - half, y1 - half,
+                             max(0.0, rx - half), max(0.0, ry - half))
+            self.add('box', outer[:4], stroke, outer, inner)
+    
+    def circle(self, elem, transform, style):
+        sx, sy, tx, ty = transform
+        cx = _length(elem.get('cx')) * sx + tx
+        cy = _length(elem.get('cy')) * sy + ty
+        r = _length(elem.get('r')) * sx
+        if r <= 0:
+            return
+        fill = parse_colour(style['fill'])
+        if fill is not None:
+            self.add('disc', (cx - r, cy - r, cx + r, cy + r), fill, cx, cy, r, None)
+        stroke = parse_colour(style['stroke'])
+        if stroke is not None:
+            half = self.stroke_width(style, transform) / 2
+            outer = r + half
+            self.add('disc', (cx - outer, cy - outer, cx + outer, cy + outer), stroke,
+                     cx, cy, outer, r - half if r > half else None)
+    
+    def stroke_width(self, style, transform):
+        # Hairlines are widened to one pixel so they never vanish at low DPI
+        return max(1.0, _length(style['stroke-width'], 1.0) * transform[0])
+    
+    def stroke_path(self, points, transform, style):
+        colour = parse_colour(style['stroke'])
+        if colour is None or len(points) < 2:
+            return
+        sx, sy, tx, ty = transform
+        points = [(x * sx + tx, y * sy + ty) for x, y in points]
+        width = self.stroke_width(style, transform)
+        
+        dashes = []
+        if style['stroke-dasharray'] not in ('none', ''):
+            dashes = [d * sx for d in _numbers(style['stroke-dasharray'])]
+            if len(dashes) % 2:
+                dashes *= 2
+            if sum(dashes) <= 0:
+                dashes = []
+        
+        if dashes:
+            index, left, drawing = 0, dashes[0], True
+            for (x0, y0), (x1, y1) in zip(points, points[1:]):
+                length = math.hypot(x1 - x0, y1 - y0)
+                pos = 0.0
+                while pos < length:
+                    step = min(left, length - pos)
+                    if drawing:
+                        t0, t1 = pos / length, (pos + step) / length
+                        self.segment((x0 + (x1 - x0) * t0, y0 + (y1 - y0) * t0),
+                                     (x0 + (x1 - x0) * t1, y0 + (y1 - y0) * t1), width, colour)
+                    pos += step
+                    left -= step
+                    if left <= 1e-9:
+                        index = (index + 1) % len(dashes)
+                        left, drawing = dashes[index], not drawing
+            return
+        
+        for p, q in zip(points, points[1:]):
+            self.segment(p, q, width, colour)
+        # Joins: round ones as discs, the right-angle corners of wires as squares
+        half = width / 2
+        for x, y in points[1:-1]:
+            if style['stroke-linejoin'] == 'round':
+                self.add('disc', (x - half, y - half, x + half, y + half), colour, x, y, half, None)
+            else:
+                box = _box(x - half, y - half, x + half, y + half)
+                self.add('box', box[:4], colour, box, None)
+    
+    def segment(self, p, q, width, colour):
+        (x0, y0), (x1, y1) = p, q
+        length = math.hypot(x1 - x0, y1 - y0)
+        if length == 0:
+            return
+        nx, ny = -(y1 - y0) / length * width / 2, (x1 - x0) / length * width / 2
+        quad = ((x0 + nx, y0 + ny), (x1 + nx, y1 + ny), (x1 - nx, y1 - ny), (x0 - nx, y0 - ny))
+        xs, ys = [x for x, _ in quad], [y for _, y in quad]
+        self.add('poly', (min(xs), min(ys), max(xs), max(ys)), colour, quad)
+    
+    def text(self, elem, transform, style):
+        colour = parse_colour(style['fill'])
+        content = ' '.join(''.join(elem.itertext()).split())
+        if colour is None or not content:
+            return
+        sx, sy, tx, ty = transform
+        cell = _length(style['font-size'], 16.0) * sy / 10
+        bold = 1 if style['font-weight'] in ('bold', 'bolder', '600', '700', '800', '900') else 0
+        width = (len(content) * _GLYPH_ADVANCE - 1 + bold) * cell
+        x = _length(elem.get('x')) * sx + tx
+        y = _length(elem.get('y')) * sy + ty
+        anchor = style['text-anchor']
+        if anchor == 'middle':
+            x -= width / 2
+        elif anchor == 'end':
+            x -= width
+        top = y - _GLYPH_ROWS * cell
+        offsets = tuple((ord(c) - 32) * 5 if 32 <= ord(c) < 127 else _UNKNOWN_GLYPH for c in content)
+        self.add('text', (x, top, x + width, y), colour, x, top, cell, offsets, bold)
+
+def load_display_list(svg_file, dpi=DPI):
+    """Parse an SVG file into drawing operations in device pixels.
+    
+    Returns (width, height, ops) with the image size in pixels.
+    """
+    root = ET.parse(svg_file).getroot()
+    width = _length(root.get('width'), 800.0)
+    height = _length(root.get('height'), 600.0)
+    view_box = _numbers(root.get('viewBox', '')) or [0.0, 0.0, width, height]
+    if len(view_box) != 4 or view_box[2] <= 0 or view_box[3] <= 0:
+        raise ValueError(f"{svg_file} has an invalid viewBox")
+    
+    scale = dpi / 96
+    sx, sy = width / view_box[2] * scale, height / view_box[3] * scale
+    transform = (sx, sy, -view_box[0] * sx, -view_box[1] * sy)
+    builder = _Builder(root)
+    style = builder.style(root, 'svg', _INITIAL_STYLE)
+    for child in root:
+        builder.walk(child, transform, style)
+    return max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale)), builder.ops
+
+def render_tile(task):
+    """Render one tile; task is (x0, y0, width, height, ops). Returns RGB bytes.
+    
+    Areas the SVG leaves transparent are white.
+    """
+    x0, y0, width, height, ops = task
+    buf = bytearray(b'\xff' * (width * height * 3))
+    x_end = x0 + width
+    for op in ops:
+        bx0, by0, bx1, by1 = op[1]
+        colour = op[2]
+        first = max(math.ceil(by0 - 0.5), y0)
+        last = min(math.ceil(by1 - 0.5), y0 + height)
+        
+        # Square-cornered filled boxes cover the same columns on every row
+        if op[0] == 'box' and op[4] is None and not (op[3][4] and op[3][5]):
+            i0 = max(math.ceil(bx0 - 0.5), x0)
+            i1 = min(math.ceil(bx1 - 0.5), x_end)
+            if i1 > i0:
+                fill = colour * (i1 - i0)
+                for y in range(first, last):
+                    start = ((y - y0) * width + i0 - x0) * 3
+                    buf[start:start + len(fill)] = fill
+            continue
+        
+        spans_of = _SPANS[op[0]]
+        for y in range(first, last):
+            row = (y - y0) * width
+            for a, b in spans_of(op, y + 0.5):
+                i0 = max(math.ceil(a - 0.5), x0)
+                i1 = min(math.ceil(b - 0.5), x_end)
+                if i1 > i0:
+                    start = (row + i0 - x0) * 3
+                    buf[start:start + (i1 - i0) * 3] = colour * (i1 - i0)
+    return bytes(buf)
+
+def _tile_tasks(width, height, ops, tile_size):
+    """Tiles in row-major order, each with the operations that touch it."""
+    columns = math.ceil(width / tile_size)
+    rows = math.ceil(height / tile_size)
+    buckets = [[[] for _ in range(columns)] for _ in range(rows)]
+    for op in ops:
+        bx0, by0, bx1, by1 = op[1]
+        c0, c1 = max(0, math.ceil(bx0 - 0.5)), min(width, math.ceil(bx1 - 0.5))
+        r0, r1 = max(0, math.ceil(by0 - 0.5)), min(height, math.ceil(by1 - 0.5))
+        if c1 <= c0 or r1 <= r0:
+            continue
+        for ty in range(r0 // tile_size, (r1 - 1) // tile_size + 1):
+            for tx in range(c0 // tile_size, (c1 - 1) // tile_size + 1):
+                buckets[ty][tx].append(op)
+    for ty in range(rows):
+        y0 = ty * tile_size
+        for tx in range(columns):
+            x0 = tx * tile_size
+            yield (x0, y0, min(tile_size, width - x0), min(tile_size, height - y0), buckets[ty][tx])
+        buckets[ty] = None
+
+def render_bands(width, height, ops, tile_size=TILE_SIZE, jobs=1):
+    """Yield the image as bands of tile_size rows, each a list of RGB row bytes.
+    
+    With jobs > 1 tiles render in a process pool; at most a band plus two
+    tiles per worker are in flight, so memory stays bounded by the width.
+    """
+    columns = math.ceil(width / tile_size)
+    tasks = _tile_tasks(width, height, ops, tile_size)
+    
+    if jobs > 1:
+        # Imported here so serial runs skip the cost
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        pending = collections.deque()
+        
+        def tiles():
+            for task in tasks:
+                pending.append(executor.submit(render_tile, task))
+                if len(pending) >= columns + 2 * jobs:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+    else:
+        executor = None
+        
+        def tiles():
+            return map(render_tile, tasks)
+    
+    try:
+        band = []
+        for tile in tiles():
+            band.append(tile)
+            if len(band) == columns:
+                band_height = len(band[0]) // (min(tile_size, width) * 3)
+                strides = [len(t) // band_height for t in band]
+                yield [b''.join(t[r * s:(r + 1) * s] for t, s in zip(band, strides))
+                       for r in range(band_height)]
+                band = []
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+def _png_chunk(f, kind, data):
+    f.write(struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data)))
+
+def write_png(out_file, width, height, bands, dpi=DPI):
+    """Write RGB bands as a PNG, compressing each row as it arrives.
+    
+    A row equal to the one above is stored with the Up filter, as zeros.
+    IDAT chunks have a fixed size, so the file depends only on the pixels.
+    """
+    tmp_file = str(out_file) + '.tmp'
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n')
+            _png_chunk(f, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            pixels_per_metre = round(dpi / 0.0254)
+            _png_chunk(f, b'pHYs', struct.pack('>IIB', pixels_per_metre, pixels_per_metre, 1))
+        
+            compressor = zlib.compressobj(6)
+            data = bytearray()
+            repeated = b'\x02' + bytes(width * 3)
+            previous = None
+            for rows in bands:
+                for row in rows:
+                    data += compressor.compress(repeated if row == previous else b'\x00' + row)
+                    previous = row
+                while len(data) >= IDAT_SIZE:
+                    _png_chunk(f, b'IDAT', bytes(data[:IDAT_SIZE]))
+                    del data[:IDAT_SIZE]
+            data += compressor.flush()
+            for start in range(0, len(data), IDAT_SIZE):
+                _png_chunk(f, b'IDAT', bytes(data[start:start + IDAT_SIZE]))
+            _png_chunk(f, b'IEND', b'')
+    except BaseException:
+        # Rendering failed or was interrupted: leave no partial file behind
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_file)
+        raise
+    os.replace(tmp_file, out_file)
+
+def write_jpeg(out_file, width, height, bands, dpi=DPI, quality=JPEG_QUALITY):
+    """Write RGB bands as a JPEG with Pillow (which holds the whole image)."""
+    if Image is None:
+        raise ValueError("JPEG output needs Pillow (pip install Pillow); PNG output is built in")
+    image = Image.new('RGB', (width, height), 'white')
+    y = 0
+    for rows in bands:
+        image.paste(Image.frombytes('RGB', (width, len(rows)), b''.join(rows)), (0, y))
+        y += len(rows)
+    image.save(out_file, 'JPEG', quality=quality, dpi=(dpi, dpi))
+
+def rasterize(svg_file, out_file, dpi=DPI, tile_size=TILE_SIZE, jobs=1, quality=JPEG_QUALITY):
+    """Render svg_file to out_file (.png, or .jpg/.jpeg with Pillow).
+    
+    Returns the image (width, height) in pixels.
+    """
+    suffix = Path(out_file).suffix.lower()
+    if suffix not in ('.png', '.jpg', '.jpeg'):
+        raise ValueError(f"Unsupported raster format '{suffix}' (use .png, .jpg or .jpeg)")
+    if suffix != '.png' and Image is None:
+        raise ValueError("JPEG output needs Pillow (pip install Pillow); PNG output is built in")
+    if dpi <= 0 or tile_size < 1:
+        raise ValueError("DPI and tile size must be positive")
+    
+    width, height, ops = load_display_list(svg_file, dpi)
+    bands = render_bands(width, height, ops, tile_size, jobs)
+    if suffix == '.png':
+        write_png(out_file, width, height, bands, dpi)
+    else:
+        write_jpeg(out_file, width, height, bands, dpi, quality)
+    return width, height
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description='Render an SVG symbol sheet or block diagram to PNG or JPEG',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # PNG of the combined sheet at screen resolution
+  %(prog)s docs/images/combined_diagrams.svg
+  
+  # Print resolution, rendered by 8 worker processes
+  %(prog)s docs/images/combined_diagrams.svg -o docs/images/combined_diagrams.png --dpi 300 --jobs 8
+  
+  # JPEG (needs Pillow)
+  %(prog)s docs/images/combined_diagrams.svg -o docs/images/combined_diagrams.jpg
+        """
+    )
+    parser.add_argument('input', help='SVG file to render')
+    parser.add_argument('-o', '--output', action='append',
+                        help='Output .png/.jpg file; may be repeated (default: input with .png suffix)')
+    parser.add_argument('--dpi', type=float, default=DPI, help=f'Resolution (default: {DPI}, one pixel per SVG unit)')
+    parser.add_argument('--tile', type=int, default=TILE_SIZE,
+                        help=f'Tile edge in pixels; one row of tiles is held in memory (default: {TILE_SIZE})')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of worker processes rendering tiles (0 = one per CPU, default: 1)')
+    parser.add_argument('--quality', type=int, default=JPEG_QUALITY,
+                        help=f'JPEG quality (default: {JPEG_QUALITY})')
+    args = parser.parse_args(argv)
+    
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or a positive number")
+    jobs = args.jobs or os.cpu_count() or 1
+    
+    for output in args.output or [str(Path(args.input).with_suffix('.png'))]:
+        try:
+            width, height = rasterize(args.input, output, args.dpi, args.tile, jobs, args.quality)
+        except (OSError, ValueError, ET.ParseError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print(f"🖼️  {width} × {height} px at {args.dpi:g} DPI saved to: {output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Verilog Preprocessor
+Lightweight handling of the compiler directives that change which ports a
+module has: `define/`undef, `ifdef/`ifndef/`elsif/`else/`endif and
+`include, plus macro uses (with arguments and SystemVerilog defaults).
+Other directives (`timescale, `celldefine, ...) are dropped.
+
+Comments, strings and line numbers are kept, so the symbol generator
+sees the same text it would without directives. Missing include files
+are skipped with a warning, since netlists often include vendor cell
+libraries that only exist on the design servers.
+
+One Preprocessor is meant to serve a whole directory run: included files
+are read once, and the text and macro table each one produces are cached
+per macro environment, so a shared header is expanded once per run. Each
+cached expansion remembers the modification time and size of every file
+it read, and is redone when one of them changes, so a long-lived
+Preprocessor (verilog_to_svg.py --watch) picks up edited headers.
+
+    pre = Preprocessor({'XCELIUM': ''}, include_dirs=['include/'])
+    code = pre.process(open('top.v').read(), 'top.v')
+"""
+
+import os
+import re
+import sys
+import argparse
+from pathlib import Path
+
+# Comments and strings (copied untouched) and compiler directives / macro uses
+_TOKEN_RE = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|`([A-Za-z_][\w$]*)', re.DOTALL)
+_NAME_ARG_RE = re.compile(r'[ \t]*([A-Za-z_][\w$]*)')
+_INCLUDE_RE = re.compile(r'[ \t]*(?:"([^"\n]*)"|<([^>\n]*)>)')
+_DEFINE_RE = re.compile(r'[ \t]+([A-Za-z_][\w$]*)(\([^)]*\))?')
+_LINE_END_RE = re.compile(r'(?:\\\r?\n|[^\n])*')
+_LINE_COMMENT_RE = re.compile(r'//(?:[^\n"]|"[^"\n]*")*$')
+
+# Directives that take the rest of the line as arguments, and those that take none
+_LINE_DIRECTIVES = frozenset(('timescale', 'default_nettype', 'line', 'pragma', 'begin_keywords',
+                              'unconnected_drive', 'default_decay_time', 'default_trireg_strength',
+                              'delay_mode_distributed', 'delay_mode_path', 'delay_mode_unit',
+                              'delay_mode_zero'))
+_BARE_DIRECTIVES = frozenset(('resetall', 'celldefine', 'endcelldefine', 'nounconnected_drive',
+                              'end_keywords', 'undefineall'))
+_CONDITIONALS = frozenset(('ifdef', 'ifndef', 'elsif', 'else', 'endif'))
+
+# Guards against recursive includes and self-referencing macros
+MAX_DEPTH = 32
+
+class Preprocessor:
+    """Expands compiler directives, caching include files across calls.
+    
+    defines maps macro names to their text ('' for a bare -D NAME);
+    include_dirs are searched, after the including file's directory, for
+    `include files. warnings collects messages about skipped includes,
+    each reported once per run; stats counts include reads and cache hits.
+    included maps the include files read by the last process() call,
+    nested ones too, to their file_stamp().
+    """
+    
+    def __init__(self, defines=None, include_dirs=None):
+        self.defines = dict(defines or {})
+        self.include_dirs = [Path(d) for d in include_dirs or ()]
+        self.sources = {}
+        self.expanded = {}
+        self.warnings = []
+        self.missing = set()
+        self.stats = {'include_reads': 0, 'include_hits': 0}
+        self.included = {}
+        # Include files read by the expansions in progress, innermost last
+        self._reading = []
+    
+    def process(self, text, path='<input>'):
+        """Return text with its directives applied, starting from the user defines."""
+        self.included = {}
+        if '`' not in text:
+            return text
+        env = {name: (None, str(value)) for name, value in self.defines.items()}
+        out = []
+        self._reading = [self.included]
+        self._run(text, Path(path), env, out, 0)
+        return ''.join(out)
+    
+    def _run(self, text, path, env, out, depth):
+        """Preprocess one file (or macro body) into out, updating env."""
+        if depth > MAX_DEPTH:
+            raise ValueError(f"{path}: `include or macro nesting deeper than {MAX_DEPTH}")
+        stack = []
+        active = True
+        pos = 0
+        while True:
+            m = _TOKEN_RE.search(text, pos)
+            chunk = text[pos:m.start() if m else len(text)]
+            out.append(chunk if active else '\n' * chunk.count('\n'))
+            if m is None:
+                break
+            name = m.group(1)
+            pos = m.end()
+            
+            # Comments and strings
+            if name is None:
+                out.append(m.group() if active else '\n' * m.group().count('\n'))
+            
+            # Conditional compilation
+            elif name in _CONDITIONALS:
+                if name in ('ifdef', 'ifndef', 'elsif'):
+                    arg = _NAME_ARG_RE.match(text, pos)
+                    if arg is None:
+                        raise ValueError(f"{path}: `{name} without a macro name")
+                    pos = arg.end()
+                    defined = arg.group(1) in env
+                if name in ('ifdef', 'ifndef'):
+                    taken = defined == (name == 'ifdef')
+                    stack.append([active, taken])
+                    active = active and taken
+                elif not stack:
+                    raise ValueError(f"{path}: `{name} without `ifdef")
+                elif name == 'endif':
+                    active = stack.pop()[0]
+                else:
+                    outer, taken = stack[-1]
+                    branch = not taken and (name == 'else' or defined)
+                    stack[-1][1] = taken or branch
+                    active = outer and branch
+            
+            elif not active:
+                # Skip the directive, but not the newlines of a `define body
+                if name == 'define':
+                    end = _LINE_END_RE.match(text, pos).end()
+                    out.append('\n' * text.count('\n', pos, end))
+                    pos = end
+            
+            elif name == 'define':
+                pos = self._define(text, pos, path, env, out)
+            
+            elif name == 'undef':
+                arg = _NAME_ARG_RE.match(text, pos)
+                if arg is not None:
+                    env.pop(arg.group(1), None)
+                    pos = arg.end()
+            
+            elif name == 'include':
+                arg = _INCLUDE_RE.match(text, pos)
+                if arg is None:
+                    raise ValueError(f"{path}: `include without a file name")
+                pos = arg.end()
+                out.append(self._include(arg.group(1) or arg.group(2), path, env, depth))
+            
+            elif name in _LINE_DIRECTIVES:
+                pos = _LINE_END_RE.match(text, pos).end()
+            
+            elif name in _BARE_DIRECTIVES:
+                pass
+            
+            elif name in env:
+                body, pos = self._expand(name, text, pos, path, env, depth)
+                out.append(body)
+            
+            else:
+                # Undefined macro: leave it for the parser, as without preprocessing
+                out.append(m.group())
+        
+        if stack:
+            raise ValueError(f"{path}: `ifdef without `endif")
+    
+    def _define(self, text, pos, path, env, out):
+        """Record a `define in env; returns the position after its body."""
+        m = _DEFINE_RE.match(text, pos)
+        if m is None:
+            raise ValueError(f"{path}: `define without a macro name")
+        end = _LINE_END_RE.match(text, m.end()).end()
+        body = text[m.end():end]
+        out.append('\n' * body.count('\n'))
+        body = _LINE_COMMENT_RE.sub('', re.sub(r'\\\r?\n', '\n', body)).strip()
+        params = None
+        if m.group(2) is not None:
+            params = []
+            for param in m.group(2)[1:-1].split(','):
+                param_name, has_default, default = param.partition('=')
+                if param_name.strip():
+                    params.append((param_name.strip(), default.strip() if has_default else None))
+            params = tuple(params)
+        env[m.group(1)] = (params, body)
+        return end
+    
+    def _expand(self, name, text, pos, path, env, depth):
+        """Expand a macro use at pos; returns (text, position after the use)."""
+        params, body = env[name]
+        if params is not None:
+            args, end = _read_args(text, pos)
+            if args is None:
+                return '`' + name, pos
+            pos = end
+            values = {}
+            for idx, (param, default) in enumerate(params):
+                value = args[idx].strip() if idx < len(args) else ''
+                values[param] = value if value or default is None else default
+            if values:
+                body = re.sub(r'\b(' + '|'.join(map(re.escape, values)) + r')\b',
+                              lambda m: values[m.group(1)], body)
+        if '`' in body:
+            out = []
+            self._run(body, path, env, out, depth + 1)
+            body = ''.join(out)
+        return body, pos
+    
+    def _include(self, name, path, env, depth):
+        """Text of an included file, expanded in (and updating) env."""
+        resolved = self._resolve(name, path)
+        if resolved is None:
+            if name not in self.missing:
+                self.missing.add(name)
+                self.warnings.append(f"{path}: include file not found, skipped: {name}")
+            return ''
+        
+        # Same file in the same macro environment, none of the files it read
+        # changed since: reuse its text and macros
+        key = (resolved, tuple(sorted(env.items())))
+        cached = self.expanded.get(key)
+        if cached is not None and all(file_stamp(f) == stamp for f, stamp in cached[2].items()):
+            self.stats['include_hits'] += 1
+            text, env_after, read = cached
+            self._reading[-1].update(read)
+            env.clear()
+            env.update(env_after)
+            return text
+        
+        stamp = file_stamp(resolved)
+        source = self.sources.get(resolved)
+        if source is None or source[0] != stamp:
+            with open(resolved, 'r') as f:
+                source = self.sources[resolved] = (stamp, f.read())
+            self.stats['include_reads'] += 1
+        read = {resolved: stamp}
+        self._reading.append(read)
+        out = []
+        try:
+            self._run(source[1], resolved, env, out, depth + 1)
+        finally:
+            self._reading.pop()
+        self._reading[-1].update(read)
+        text = ''.join(out)
+        # A header of only macros adds nothing, not even blank lines
+        if not text.strip():
+            text = ''
+        self.expanded[key] = (text, dict(env), read)
+        return text
+    
+    def _resolve(self, name, path):
+        """Find an include file next to the including file, then in the include dirs."""
+        candidate = Path(name)
+        if candidate.is_absolute():
+            return candidate if candidate.is_file() else None
+        for folder in [path.parent] + self.include_dirs:
+            if (folder / candidate).is_file():
+                return folder / candidate
+        return None
+
+def file_stamp(path):
+    """(modification time in ns, size) of a file, or None if it cannot be read."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def _read_args(text, pos):
+    """Read a parenthesised macro argument list at pos (after spaces).
+    
+    Returns (arguments, position after the closing parenthesis), or
+    (None, pos) if no argument list follows.
+    """
+    start = pos
+    while start < len(text) and text[start] in ' \t\r\n':
+        start += 1
+    if start >= len(text) or text[start] != '(':
+        return None, pos
+    args = []
+    depth = 0
+    current = start + 1
+    idx = start + 1
+    while idx < len(text):
+        char = text[idx]
+        if char == '"':
+            idx = text.find('"', idx + 1)
+            if idx == -1:
+                break
+        elif char in '([{':
+            depth += 1
+        elif char in '}]' or char == ')' and depth:
+            depth -= 1
+        elif char == ')':
+            args.append(text[current:idx])
+            return args, idx + 1
+        elif char == ',' and depth == 0:
+            args.append(text[current:idx])
+            current = idx + 1
+        idx += 1
+    raise ValueError("unterminated macro argument list")
+
+def parse_defines(items):
+    """Turn -D NAME[=VALUE] arguments into a defines dict."""
+    defines = {}
+    for item in items or ():
+        name, _, value = item.partition('=')
+        defines[name.strip()] = value
+    return defines
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description='Expand `define/`ifdef/`include in Verilog files and print the result',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Show the ports the simulator sees with XCELIUM defined
+  %(prog)s adc/verilog/ns_sar.v -D XCELIUM
+  
+  # Resolve `include files from a header directory
+  %(prog)s source/TLM.v -I include/ -D ENABLE_REGISTER_CRC
+        """
+    )
+    parser.add_argument('files', nargs='+', help='Verilog files to preprocess')
+    parser.add_argument('-D', '--define', action='append', metavar='NAME[=VALUE]',
+                        help='Define a macro (repeatable)')
+    parser.add_argument('-I', '--include-dir', action='append', metavar='DIR',
+                        help='Search DIR for `include files (repeatable)')
+    args = parser.parse_args(argv)
+    
+    preprocessor = Preprocessor(parse_defines(args.define), args.include_dir)
+    for verilog_file in args.files:
+        try:
+            with open(verilog_file, 'r') as f:
+                sys.stdout.write(preprocessor.process(f.read(), verilog_file))
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+    for warning in preprocessor.warnings:
+        print(f"Warning: {warning}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
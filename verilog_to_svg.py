@@ -5,13 +5,763 @@ Creates a basic block symbol with inputs on left, outputs on right.
 Handles both ANSI and non-ANSI style port declarations.
 """
 
+import io
+import os
 import re
+import ast
+import math
 import sys
+import mmap
+import shutil
+import operator
+import time
 import argparse
+import contextlib
+import hashlib
+import json
+import fnmatch
+import itertools
+from collections import deque
+from xml.sax.saxutils import escape
 from pathlib import Path
 
-def parse_verilog_module(verilog_code):
-    """Extract module name, inputs, and outputs from Verilog code."""
+# Bump whenever parsing or SVG output changes, so cached symbols are rebuilt
+GENERATOR_VERSION = "4"
+
+# Default name of the incremental cache file written in directory mode
+CACHE_FILENAME = '.verilog_to_svg_cache.json'
+
+# File name patterns of Verilog sources in directory mode (see find_verilog_files)
+DEFAULT_INCLUDE = ('*.v', '*.sv')
+
+# Files at least this large are memory-mapped instead of read into a str
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+# Buffer size of the symbol files write_svg() streams into
+WRITE_BUFFER = 1 << 16
+
+# Rendered symbol templates kept per process, most recently used first out
+SYMBOL_CACHE_SIZE = 256
+
+# Pin layouts of write_svg(): evenly spread pins in a fixed-size block, or
+# pins on a grid grouped under their port list comments, sized to the labels
+PIN_LAYOUTS = ('fixed', 'grouped')
+
+# Stage profiler installed by --profile (see enable_profiling); None when off
+_profiler = None
+
+# Threads reading ahead in a pipelined directory run (see IOPipeline)
+PIPELINE_READERS = 4
+
+# Prefetching reader and background writer of a pipelined directory run; None when serial
+_pipeline = None
+
+# Preprocessor installed by -D/-I/--preprocess (see enable_preprocessing); None when off
+_preprocessor = None
+
+# Console output mode set by --quiet/--json (see set_output_mode)
+_quiet = False
+
+# Stream receiving one JSON record per module with --json; None when off
+_record_out = None
+
+# Scanner for module headers and port declarations. Comments, attributes and
+# compiler directives are cut out; string literals are stepped over; the
+# remaining alternatives are the structural characters the parser acts on.
+_SCAN_RE = re.compile(r"""
+    (?P<cut>//[^\n]*
+           |/\*.*?\*/
+           |\(\*(?!\s*\)).*?\*\)
+           |`(?:define|include|timescale|default_nettype|line|pragma)\b(?:\\\n|[^\n])*
+           |`(?:ifdef|ifndef|elsif|undef)\s+\w+
+           |`(?:else|endif|resetall|celldefine|endcelldefine)\b)
+  | (?P<string>"(?:\\.|[^"\\])*")
+  | (?P<op>[#();])
+""", re.VERBOSE | re.DOTALL)
+
+# Search pattern for the module body: comments, strings, attributes and
+# `define bodies are matched only so that keywords inside them are ignored.
+# Keyword patterns start with a literal (no leading \b) so the regex engine
+# can skip ahead quickly; the left word boundary is checked by _word_start().
+_BODY_RE = re.compile(r"""
+    //[^\n]*
+  | /\*.*?\*/
+  | \(\*(?!\s*\)).*?\*\)
+  | "(?:\\.|[^"\\])*"
+  | `define\b(?:\\\n|[^\n])*
+  | (?P<kw>input|output|inout|endmodule)\b
+""", re.VERBOSE | re.DOTALL)
+
+# Same as _BODY_RE, also stopping at parameter declarations (for port records)
+_BODY_PARAM_RE = re.compile(_BODY_RE.pattern.replace('|endmodule)', '|endmodule|parameter|localparam)'),
+                            re.VERBOSE | re.DOTALL)
+
+_MODULE_RE = re.compile(r'module\b')
+_ENDMODULE_RE = re.compile(r'endmodule\b')
+_NAME_RE = re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/)*([A-Za-z_][\w$]*|\\\S+)', re.DOTALL)
+_RANGE_RE = re.compile(r'\[[^\]]*\]')
+_SIGNED_RE = re.compile(r'\bsigned\b')
+_INTEGER_RE = re.compile(r'\binteger\b')
+
+# Based literals such as 8'hFF or 'd10 in constant expressions
+_LITERAL_RE = re.compile(r"(?:\d[\d_]*)?\s*'[sS]?([bBoOdDhH])\s*([0-9a-fA-F_]+)")
+_LITERAL_BASES = {'b': 2, 'o': 8, 'd': 10, 'h': 16}
+
+# Operators allowed in constant expressions; Verilog '/' on integers truncates
+_BINARY_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+    ast.LShift: operator.lshift, ast.RShift: operator.rshift,
+    ast.BitAnd: operator.and_, ast.BitOr: operator.or_, ast.BitXor: operator.xor,
+}
+_UNARY_OPS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Invert: operator.invert}
+
+_DIRECTIONS = ('input', 'output', 'inout')
+
+# Net/variable type keywords that may sit between a direction and a port name
+TYPE_KEYWORDS = frozenset((
+    'wire', 'reg', 'logic', 'signed', 'unsigned', 'var', 'tri', 'tri0', 'tri1',
+    'triand', 'trior', 'trireg', 'wand', 'wor', 'uwire', 'supply0', 'supply1',
+    'integer', 'real', 'realtime', 'time', 'bit', 'byte', 'shortint', 'int',
+    'longint', 'interconnect',
+))
+
+# Words of a port list line, and comment lines that can head a group of ports
+_WORD_RE = re.compile(r'[A-Za-z_][\w$]*')
+_TITLE_RE = re.compile(r'[A-Za-z0-9]')
+
+_IDENTIFIER_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$`\\')
+
+# Bytes versions of the patterns above, for scanning memory-mapped files
+_SCAN_BRE = re.compile(_SCAN_RE.pattern.encode(), re.VERBOSE | re.DOTALL)
+_BODY_BRE = re.compile(_BODY_RE.pattern.encode(), re.VERBOSE | re.DOTALL)
+_BODY_PARAM_BRE = re.compile(_BODY_PARAM_RE.pattern.encode(), re.VERBOSE | re.DOTALL)
+_MODULE_BRE = re.compile(rb'module\b')
+_IDENTIFIER_BYTES = frozenset(''.join(_IDENTIFIER_CHARS).encode())
+
+# Mapped pages already scanned are handed back to the OS in steps of this size
+_RELEASE_BYTES = 8 * 1024 * 1024
+
+class Port:
+    """A module port as read from its declaration.
+    
+    width_expr is the packed range as written (e.g. '[WIDTH-1:0]', '' for a
+    scalar) and width the number of bits it resolves to with the module's
+    parameter defaults, or None if it depends on anything else. section is
+    the comment heading the port is declared under in the port list (e.g.
+    'CREF Section'), or None. A port prints as its name, so lists of
+    records read like lists of names.
+    """
+    __slots__ = ('name', 'direction', 'width_expr', 'width', 'signed', 'section')
+    
+    def __init__(self, name, direction, width_expr='', width=1, signed=False, section=None):
+        self.name = name
+        self.direction = direction
+        self.width_expr = width_expr
+        self.width = width
+        self.signed = signed
+        self.section = section
+    
+    def __repr__(self):
+        section = f", section={self.section!r}" if self.section is not None else ''
+        return (f"Port({self.name!r}, {self.direction!r}, {self.width_expr!r}, "
+                f"{self.width!r}, {self.signed!r}{section})")
+    
+    def __str__(self):
+        return self.name
+    
+    def __eq__(self, other):
+        if not isinstance(other, Port):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in Port.__slots__)
+    
+    def __hash__(self):
+        return hash((self.name, self.direction, self.width_expr))
+    
+    @property
+    def label(self):
+        """Name with its bus range, e.g. 'ADC_data[127:0]'."""
+        return self.name + self.width_expr
+
+def _clog2(value):
+    return max(0, (value - 1).bit_length())
+
+def _literal_value(m):
+    return str(int(m.group(2).replace('_', ''), _LITERAL_BASES[m.group(1).lower()]))
+
+def eval_constant(expr, parameters=None):
+    """Evaluate a Verilog constant expression to an int.
+    
+    Names are looked up in parameters (name -> int). Arithmetic, shifts,
+    bitwise operators, based literals and $clog2 are understood; anything
+    else (or an unknown name) gives None.
+    """
+    expr = _LITERAL_RE.sub(_literal_value, expr).replace('$clog2', '_clog2').replace('/', '//')
+    try:
+        tree = ast.parse(expr.strip(), mode='eval')
+    except SyntaxError:
+        return None
+    parameters = parameters or {}
+    
+    def value(node):
+        if isinstance(node, ast.Constant) and type(node.value) is int:
+            return node.value
+        if isinstance(node, ast.Name):
+            return parameters[node.id]
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+            left, right = value(node.left), value(node.right)
+            if isinstance(node.op, (ast.Pow, ast.LShift)) and right > 64:
+                raise ValueError("constant too large")
+            return _BINARY_OPS[type(node.op)](left, right)
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+            return _UNARY_OPS[type(node.op)](value(node.operand))
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id == '_clog2' and len(node.args) == 1):
+            return _clog2(value(node.args[0]))
+        raise ValueError("not a constant expression")
+    
+    try:
+        result = value(tree.body)
+    except (KeyError, ValueError, TypeError, ZeroDivisionError, OverflowError):
+        return None
+    return result if isinstance(result, int) else None
+
+def _range_width(ranges, parameters):
+    """Number of bits of a list of packed '[msb:lsb]' ranges, or None."""
+    width = 1
+    for bounds in ranges:
+        msb, colon, lsb = bounds[1:-1].partition(':')
+        msb = eval_constant(msb, parameters)
+        if colon:
+            lsb = eval_constant(lsb, parameters)
+            if msb is None or lsb is None:
+                return None
+            width *= abs(msb - lsb) + 1
+        elif msb is None:
+            return None
+        else:
+            width *= msb
+    return width
+
+def _port_shape(item, name):
+    """(packed ranges, signed, integer) declared before name in a declaration item."""
+    head = item.partition('=')[0]
+    head = head[:head.rfind(name)]
+    if '[' not in head and 'signed' not in head and 'integer' not in head:
+        return (), False, False
+    integer = _INTEGER_RE.search(head) is not None
+    signed = integer or (_SIGNED_RE.search(head) is not None and 'unsigned' not in head)
+    return tuple(_RANGE_RE.findall(head)), signed, integer
+
+def _read_parameters(text, parameters):
+    """Add the 'NAME = default' assignments of a parameter list to parameters."""
+    for item in split_top_level(text):
+        name, equals, default = item.partition('=')
+        words = declared_words(name)
+        if equals and words and words[-1] not in ('parameter', 'localparam'):
+            parameters[words[-1]] = eval_constant(default, parameters)
+
+def _port_records(names, direction, shapes, parameters, sections):
+    """Build Port records for names from their recorded declaration shapes."""
+    ports = []
+    for name in names:
+        ranges, signed, integer = shapes.get(name, ((), False, False))
+        if integer and not ranges:
+            width = 32
+        else:
+            width = _range_width(ranges, parameters)
+        ports.append(Port(name, direction, ''.join(''.join(r.split()) for r in ranges),
+                          width, signed, sections.get(name)))
+    return ports
+
+def _section_title(comments):
+    """Heading of a run of comment lines: the last one that reads like a title.
+    
+    Prose (ending in a full stop) and rules such as '// -----' are skipped,
+    so '// Analog Outputs' followed by '// CREF Section' gives 'CREF Section'.
+    """
+    for comment in reversed(comments):
+        if _TITLE_RE.search(comment) and not comment.endswith('.'):
+            return comment
+    return None
+
+def _port_sections(text, start, end):
+    """Map the names in a port list to the comment heading above them.
+    
+    A heading is a run of whole-line // comments; it applies to every port
+    below it up to the next heading. Trailing comments on a declaration
+    line are not headings.
+    """
+    sections = {}
+    heading = None
+    comments = []
+    for line in text[start:end].splitlines():
+        line = line.strip()
+        if line.startswith('//'):
+            comments.append(line.lstrip('/').strip())
+            continue
+        if comments:
+            heading = _section_title(comments) or heading
+            comments = []
+        if heading is not None:
+            for word in _WORD_RE.findall(line.partition('//')[0]):
+                sections.setdefault(word, heading)
+    return sections
+
+def _word_start(text, pos):
+    """Check that a keyword match at pos is not the tail of a longer identifier."""
+    return pos == 0 or text[pos - 1] not in _IDENTIFIER_CHARS
+
+def _in_comment(text, start, pos):
+    """Check whether pos lies inside a // or /* */ comment (scanning from start)."""
+    line_start = text.rfind('\n', start, pos) + 1
+    if text.find('//', line_start, pos) != -1:
+        return True
+    return text.rfind('/*', start, pos) > text.rfind('*/', start, pos)
+
+def find_module(text, pos):
+    """Return the end offset of the next module keyword outside comments, or -1."""
+    while True:
+        m = _MODULE_RE.search(text, pos)
+        if m is None:
+            return -1
+        if _word_start(text, m.start()) and not _in_comment(text, pos, m.start()):
+            return m.end()
+        pos = m.end()
+
+def _find_endmodule(text, pos):
+    """Return (start, end) of the endmodule closing the module body at pos."""
+    start = pos
+    while True:
+        m = _ENDMODULE_RE.search(text, pos)
+        if m is None:
+            return len(text), len(text)
+        if _word_start(text, m.start()) and not _in_comment(text, start, m.start()):
+            return m.start(), m.end()
+        pos = m.end()
+
+def split_top_level(text):
+    """Split text on commas outside (), [] and {}."""
+    if '(' not in text and '{' not in text:
+        return text.split(',')
+    items = []
+    depth = 0
+    last = 0
+    for i, char in enumerate(text):
+        if char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            items.append(text[last:i])
+            last = i + 1
+    items.append(text[last:])
+    return items
+
+def declared_words(item):
+    """Words of a declaration item with ranges and any '= default' removed."""
+    item = item.partition('=')[0]
+    if '[' in item:
+        item = _RANGE_RE.sub(' ', item)
+    return [word for word in item.split() if word not in TYPE_KEYWORDS]
+
+def clean_span(text, start, end):
+    """Return text[start:end] with comments, attributes and directives cut out."""
+    chunk = text[start:end]
+    if '/' not in chunk and '(*' not in chunk and '`' not in chunk:
+        return chunk
+    pieces = []
+    for m in _SCAN_RE.finditer(text, start, end):
+        if m.lastgroup == 'cut':
+            pieces.append(text[start:m.start()])
+            start = m.end()
+    pieces.append(text[start:end])
+    return ' '.join(pieces)
+
+def _read_declaration(text, pos):
+    """Read a declaration from pos up to its ';'; return (clean text, end offset)."""
+    end = text.find(';', pos)
+    if end == -1:
+        return text[pos:], len(text)
+    chunk = text[pos:end]
+    if '/' not in chunk and '(*' not in chunk and '`' not in chunk:
+        return chunk, end + 1
+    # Slow path: the ';' found may sit inside a comment or attribute
+    pieces = []
+    for m in _SCAN_RE.finditer(text, pos):
+        if m.lastgroup == 'cut':
+            pieces.append(text[pos:m.start()])
+            pos = m.end()
+        elif m.group() == ';':
+            pieces.append(text[pos:m.start()])
+            return ' '.join(pieces), m.end()
+    pieces.append(text[pos:])
+    return ' '.join(pieces), len(text)
+
+def scan_module(text, pos=0, records=False):
+    """Scan the next module in text, starting at offset pos.
+    
+    Returns (module_name, inputs, outputs, end) where end is the offset just
+    past the module's endmodule, or None when no module follows pos. A module
+    without a port list gives None for inputs and outputs. With records the
+    port lists hold Port records instead of names.
+    """
+    pos = find_module(text, pos)
+    if pos == -1:
+        return None
+    
+    name_match = _NAME_RE.match(text, pos)
+    if not name_match:
+        raise ValueError("No module declaration found")
+    module_name = name_match.group(1)
+    
+    # Walk the header up to its ';', noting the span of the port list group
+    # (the first top-level (...) not introduced by '#')
+    port_span = None
+    param_span = None
+    group_start = 0
+    is_params = False
+    depth = 0
+    header_end = None
+    for m in _SCAN_RE.finditer(text, name_match.end()):
+        if m.lastgroup != 'op':
+            continue
+        char = m.group()
+        if char == '(':
+            depth += 1
+            if depth == 1:
+                group_start = m.end()
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                if is_params:
+                    is_params = False
+                    param_span = (group_start, m.start())
+                elif port_span is None:
+                    port_span = (group_start, m.start())
+        elif depth == 0:
+            if char == '#':
+                is_params = True
+            else:
+                header_end = m.end()
+                break
+    
+    if port_span is None or header_end is None:
+        if header_end is None:
+            return module_name, None, None, len(text)
+        return module_name, None, None, _find_endmodule(text, header_end)[1]
+    
+    # ANSI entries carry their direction (and pass it on to following bare
+    # names); anything else is a non-ANSI name declared in the body
+    ansi = {'input': [], 'output': [], 'inout': []}
+    simple_port_names = []
+    direction = None
+    # Record mode: parameter defaults and each port's (ranges, signed, integer)
+    parameters = {}
+    shapes = {}
+    shape = ((), False, False)
+    if records and param_span is not None:
+        _read_parameters(clean_span(text, *param_span), parameters)
+    for item in split_top_level(clean_span(text, *port_span)):
+        item = item.strip()
+        if not item:
+            continue
+        first = item.split(None, 1)[0]
+        if first in ansi:
+            direction = first
+        if direction is not None:
+            words = declared_words(item)
+            if words and words[-1] not in ansi:
+                ansi[direction].append(words[-1])
+                if records:
+                    # Names following a declaration share its range and type
+                    if first in ansi or '[' in item:
+                        shape = _port_shape(item, words[-1])
+                    shapes[words[-1]] = shape
+        elif item[0] == '{':
+            # Concatenation such as {BUS[1],BUS[0]}: every name it references
+            for name in _RANGE_RE.sub(' ', item).strip('{} \t\r\n').replace(',', ' ').split():
+                if name not in simple_port_names:
+                    simple_port_names.append(name)
+        else:
+            words = declared_words(item)
+            if words:
+                simple_port_names.append(words[-1])
+    
+    # Walk the body to endmodule, reading direction declarations for the
+    # non-ANSI names. Fully ANSI modules only need the endmodule located.
+    declared = {'input': [], 'output': [], 'inout': []}
+    if not simple_port_names:
+        end = _find_endmodule(text, header_end)[1]
+    else:
+        wanted = set(simple_port_names)
+        end = len(text)
+        pos = header_end
+        body_re = _BODY_PARAM_RE if records else _BODY_RE
+        while True:
+            m = body_re.search(text, pos)
+            if m is None:
+                break
+            pos = m.end()
+            keyword = m.group('kw')
+            if keyword is None or not _word_start(text, m.start()):
+                continue
+            if keyword == 'endmodule':
+                end = pos
+                break
+            declaration, pos = _read_declaration(text, pos)
+            if keyword not in declared:
+                _read_parameters(declaration, parameters)
+                continue
+            items = split_top_level(declaration)
+            shape = None
+            for item in items:
+                words = declared_words(item)
+                if words and words[0] in wanted:
+                    declared[keyword].append(words[0])
+                    if records:
+                        # The range and type are written before the first name only
+                        if shape is None:
+                            first_words = declared_words(items[0])
+                            shape = _port_shape(items[0], first_words[0]) if first_words else ((), False, False)
+                        shapes[words[0]] = shape
+    
+    # Prefer the body declarations when there are any, as they are complete
+    if declared['input'] or declared['output']:
+        chosen = declared
+    else:
+        chosen = ansi
+    
+    # Remove duplicates while preserving order
+    inputs = list(dict.fromkeys(chosen['input']))
+    outputs = list(dict.fromkeys(chosen['output']))
+    inouts = list(dict.fromkeys(chosen['inout']))
+    
+    if records:
+        # Comment headings of the port list (see _port_sections)
+        sections = {}
+        if '//' in text[port_span[0]:port_span[1]]:
+            sections = _port_sections(text, *port_span)
+        inputs = _port_records(inputs, 'input', shapes, parameters, sections)
+        outputs = _port_records(outputs, 'output', shapes, parameters, sections)
+        inouts = _port_records(inouts, 'inout', shapes, parameters, sections)
+    
+    # Treat inouts as both inputs and outputs for display purposes
+    return module_name, inputs + inouts, outputs + inouts, end
+
+def parse_verilog_module(verilog_code, records=False):
+    """Extract module name, inputs, and outputs from Verilog code.
+    
+    The first module is read in one left-to-right scan that stops only at
+    comments, parentheses and the keywords that matter, so no stripped
+    copies of the source are made and nothing past its endmodule is read.
+    
+    inputs and outputs are lists of port names, or of Port records (with
+    bus widths resolved from the parameter defaults) when records is set.
+    """
+    result = scan_module(verilog_code, 0, records)
+    if result is None:
+        raise ValueError("No module declaration found")
+    module_name, inputs, outputs, _ = result
+    if inputs is None:
+        raise ValueError("No port list found in module declaration")
+    return module_name, inputs, outputs
+
+def parse_verilog_modules(verilog_code, records=False):
+    """Yield (module_name, inputs, outputs) for every module in Verilog code.
+    
+    Each module is scanned once, resuming where the previous endmodule left
+    off, so a netlist with many cells is processed in a single pass over the
+    text. Modules without a port list (e.g. testbenches) are skipped. See
+    parse_verilog_module() for records.
+    """
+    pos = 0
+    while True:
+        result = scan_module(verilog_code, pos, records)
+        if result is None:
+            return
+        module_name, inputs, outputs, pos = result
+        if inputs is not None:
+            yield module_name, inputs, outputs
+
+def _word_start_bytes(buf, pos):
+    return pos == 0 or buf[pos - 1] not in _IDENTIFIER_BYTES
+
+def _in_comment_bytes(buf, start, pos):
+    line_start = buf.rfind(b'\n', start, pos) + 1
+    if buf.find(b'//', line_start, pos) != -1:
+        return True
+    return buf.rfind(b'/*', start, pos) > buf.rfind(b'*/', start, pos)
+
+def _declaration_end_bytes(buf, pos):
+    """Offset just past the ';' ending the declaration at pos (see _read_declaration)."""
+    end = buf.find(b';', pos)
+    if end == -1:
+        return len(buf)
+    chunk = buf[pos:end]
+    if b'/' not in chunk and b'(*' not in chunk and b'`' not in chunk:
+        return end + 1
+    for m in _SCAN_BRE.finditer(buf, pos):
+        if m.lastgroup == 'op' and m.group() == b';':
+            return m.end()
+    return len(buf)
+
+def _scan_module_bytes(buf, pos=0, records=False):
+    """scan_module() over bytes or a memory map, decoding only what it needs.
+    
+    The module keyword, the end of the header and, in the body, the port
+    (and parameter) declarations and endmodule are found with bytes regexes.
+    Only the header and those declarations are decoded; they are handed to
+    scan_module() as a small stand-in module, so both paths give the same
+    ports. Offsets, including the returned end, are byte offsets. Pages of
+    a memory map are released as the body scan passes them, so resident
+    memory does not grow with the size of the file.
+    """
+    while True:
+        m = _MODULE_BRE.search(buf, pos)
+        if m is None:
+            return None
+        if _word_start_bytes(buf, m.start()) and not _in_comment_bytes(buf, pos, m.start()):
+            break
+        pos = m.end()
+    start = m.start()
+    
+    # The header ends at the first ';' outside parentheses
+    depth = 0
+    header_end = len(buf)
+    for m in _SCAN_BRE.finditer(buf, m.end()):
+        if m.lastgroup != 'op':
+            continue
+        char = m.group()
+        if char == b'(':
+            depth += 1
+        elif char == b')':
+            depth -= 1
+        elif char == b';' and depth == 0:
+            header_end = m.end()
+            break
+    pieces = [buf[start:header_end].decode('utf-8', 'replace')]
+    
+    # Body: keep the declarations, skip everything else up to endmodule
+    end = len(buf)
+    pos = header_end
+    body_re = _BODY_PARAM_BRE if records else _BODY_BRE
+    release = isinstance(buf, mmap.mmap) and hasattr(mmap, 'MADV_DONTNEED')
+    released = start - start % mmap.PAGESIZE
+    while True:
+        m = body_re.search(buf, pos)
+        if m is None:
+            break
+        pos = m.end()
+        if release and pos - released >= _RELEASE_BYTES:
+            upto = pos - pos % mmap.PAGESIZE
+            buf.madvise(mmap.MADV_DONTNEED, released, upto - released)
+            released = upto
+        keyword = m.group('kw')
+        if keyword is None or not _word_start_bytes(buf, m.start()):
+            continue
+        if keyword == b'endmodule':
+            end = pos
+            break
+        pos = _declaration_end_bytes(buf, pos)
+        pieces.append(buf[m.start():pos].decode('utf-8', 'replace'))
+    pieces.append('endmodule')
+    
+    module_name, inputs, outputs, _ = scan_module('\n'.join(pieces), 0, records)
+    return module_name, inputs, outputs, end
+
+def _mapped_modules(input_file, records):
+    """Yield _scan_module_bytes() results for every module of a file via mmap."""
+    with open(input_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            pos = 0
+            while True:
+                result = _scan_module_bytes(buf, pos, records)
+                if result is None:
+                    return
+                pos = result[3]
+                yield result
+
+def parse_verilog_file(input_file, records=False):
+    """parse_verilog_module() for a file, read through a memory map.
+    
+    Only the module header and port declarations are decoded, so peak
+    memory stays near the size of those rather than of the file.
+    """
+    for module_name, inputs, outputs, _ in _mapped_modules(input_file, records):
+        if inputs is None:
+            raise ValueError("No port list found in module declaration")
+        return module_name, inputs, outputs
+    raise ValueError("No module declaration found")
+
+def parse_verilog_file_modules(input_file, records=False):
+    """parse_verilog_modules() for a file, read through a memory map."""
+    for module_name, inputs, outputs, _ in _mapped_modules(input_file, records):
+        if inputs is not None:
+            yield module_name, inputs, outputs
+
+def enable_preprocessing(defines=None, include_dirs=None):
+    """Expand `define/`ifdef/`include in the files converted from now on.
+    
+    One Preprocessor (verilog_preprocess.py) serves every file, so include
+    files shared by a directory run are read and expanded once; its cache
+    is checked against the modification time and size of the headers, so
+    an edited header is re-read. Each file
+    starts from the given defines. Returns the Preprocessor; pass
+    defines=False to switch preprocessing off again.
+    """
+    global _preprocessor
+    if defines is False:
+        _preprocessor = None
+        return None
+    from verilog_preprocess import Preprocessor
+    _preprocessor = Preprocessor(defines, include_dirs)
+    return _preprocessor
+
+def _preprocess_key():
+    """Preprocessor settings stored with cached symbols (None when off)."""
+    if _preprocessor is None:
+        return None
+    return [[[name, value] for name, value in sorted(_preprocessor.defines.items())],
+            [str(d) for d in _preprocessor.include_dirs]]
+
+def _preprocess(input_file, verilog_code):
+    """Apply the preprocessor, if enabled; memory-mapped files are read in full for it."""
+    if _preprocessor is None:
+        return verilog_code
+    if verilog_code is None:
+        with open(input_file, 'r') as f:
+            verilog_code = f.read()
+    verilog_code = _preprocessor.process(verilog_code, input_file)
+    for warning in _preprocessor.warnings:
+        print(f"Warning: {warning}")
+    _preprocessor.warnings.clear()
+    return verilog_code
+
+def _read_verilog(input_file):
+    """Return the source of input_file, or None if it is to be memory-mapped."""
+    if os.path.getsize(input_file) >= MMAP_THRESHOLD:
+        return None
+    with open(input_file, 'r') as f:
+        return f.read()
+
+def _write_source(f, input_file, verilog_code):
+    """Append the Verilog source to a debug file without loading mapped files."""
+    if verilog_code is not None:
+        f.write(verilog_code)
+        return
+    f.flush()
+    with open(input_file, 'rb') as source:
+        shutil.copyfileobj(source, f.buffer)
+
+def parse_verilog_module_reference(verilog_code):
+    """Extract module name, inputs, and outputs from Verilog code.
+    
+    Original multi-pass regex implementation, kept as the reference that
+    parse_verilog_module() is benchmarked against.
+    """
     # Remove comments
     verilog_code = re.sub(r'//.*$', '', verilog_code, flags=re.MULTILINE)
     verilog_code = re.sub(r'/\*.*?\*/', '', verilog_code, flags=re.DOTALL)
@@ -252,8 +1002,104 @@ def parse_verilog_module(verilog_code):
     
     return module_name, all_inputs, all_outputs
 
-def generate_svg(module_name, inputs, outputs):
-    """Generate SVG symbol for the module with proper sizing."""
+# Shared definitions for compact symbols: the pin glyphs and the label style.
+# The ids are fixed so a combined sheet needs only one copy.
+_COMPACT_DEFS = """  <defs>
+    <style id="pepper-style">.pin{font-family:Arial, Helvetica, sans-serif;font-size:13px;fill:#2c3e50}.pin-in{text-anchor:end}</style>
+    <symbol id="pepper-pin-in" overflow="visible">
+      <line x1="-25" y1="0" x2="0" y2="0" stroke="#34495e" stroke-width="1.5"/>
+      <rect x="-190" y="-10" width="160" height="20" fill="white" stroke="none"/>
+      <circle cx="0" cy="0" r="3.5" fill="#2c3e50"/>
+    </symbol>
+    <symbol id="pepper-pin-out" overflow="visible">
+      <line x1="0" y1="0" x2="25" y2="0" stroke="#34495e" stroke-width="1.5"/>
+      <rect x="30" y="-10" width="160" height="20" fill="white" stroke="none"/>
+      <circle cx="0" cy="0" r="3.5" fill="#2c3e50"/>
+    </symbol>
+  </defs>"""
+
+# Same for the grouped layout, whose pins have no fixed-width label box
+_GROUPED_DEFS = """  <defs>
+    <style id="pepper-grouped-style">.pin{font-family:Arial, Helvetica, sans-serif;font-size:13px;fill:#2c3e50}.pin-in{text-anchor:end}.pin-group{font-family:Arial, Helvetica, sans-serif;font-size:11px;font-style:italic;fill:#7f8c8d}</style>
+    <symbol id="pepper-pin-in-bare" overflow="visible">
+      <line x1="-25" y1="0" x2="0" y2="0" stroke="#34495e" stroke-width="1.5"/>
+      <circle cx="0" cy="0" r="3.5" fill="#2c3e50"/>
+    </symbol>
+    <symbol id="pepper-pin-out-bare" overflow="visible">
+      <line x1="0" y1="0" x2="25" y2="0" stroke="#34495e" stroke-width="1.5"/>
+      <circle cx="0" cy="0" r="3.5" fill="#2c3e50"/>
+    </symbol>
+  </defs>"""
+
+# Advance widths of Helvetica/Arial for ASCII 32-126, in 1/1000 of the font
+# size (from the standard font metrics), so labels are sized without a renderer
+_CHAR_WIDTHS = dict(zip(map(chr, range(32, 127)), (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)))
+_BOLD_WIDTHS = dict(zip(map(chr, range(32, 127)), (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)))
+
+# Width assumed for characters outside the table (the widest capitals)
+_WIDE_CHAR = 1000
+
+def text_width(text, font_size=13, bold=False):
+    """Width in px of text set in Arial/Helvetica, from the font metrics table."""
+    widths = _BOLD_WIDTHS if bold else _CHAR_WIDTHS
+    return sum(widths.get(char, _WIDE_CHAR) for char in text) * font_size / 1000
+
+def _pin_rows(ports):
+    """Rows of one side of a grouped symbol: (label, None) for a pin, (None, heading) between groups."""
+    rows = []
+    section = None
+    for port in ports:
+        port_section = getattr(port, 'section', None)
+        if port_section != section:
+            # An unnamed group after a named one gets an empty heading row as a gap
+            section = port_section
+            rows.append((None, section or ''))
+        rows.append((str(getattr(port, 'label', port)), None))
+    return rows
+
+def generate_svg(module_name, inputs, outputs, compact=False, pin_layout='fixed'):
+    """Generate SVG symbol for the module with proper sizing.
+    
+    Ports may be names or Port records; records of buses are labelled with
+    their range, e.g. 'ADC_data[127:0]'. See write_svg() for compact and
+    pin_layout.
+    """
+    out = io.StringIO()
+    write_svg(out, module_name, inputs, outputs, compact, pin_layout)
+    return out.getvalue()
+
+def write_svg(out, module_name, inputs, outputs, compact=False, pin_layout='fixed'):
+    """Write the SVG symbol for a module to the text stream out.
+    
+    With compact, each pin is a <use> of a shared <symbol> plus a label
+    styled by a CSS class, instead of four fully styled elements, which
+    makes wide modules about three times smaller.
+    
+    pin_layout 'grouped' draws the pins on a grid instead, each group of
+    Port records from one port list section under its comment heading, and
+    sizes the block and margins from the label widths (see text_width())
+    rather than the fixed 350px block and 160px label boxes.
+    """
+    if pin_layout == 'grouped':
+        _write_grouped_svg(out, module_name, inputs, outputs, compact)
+        return
+    if pin_layout != 'fixed':
+        raise ValueError(f"Unknown pin layout: {pin_layout!r} (expected one of {', '.join(PIN_LAYOUTS)})")
+    write = out.write
     
     # Configuration
     BLOCK_WIDTH = 350
@@ -279,96 +1125,246 @@ def generate_svg(module_name, inputs, outputs):
     block_y = TOP_MARGIN + (ports_height - block_height) / 2
     
     # Start building SVG
-    svg = []
-    svg.append('<?xml version="1.0" encoding="UTF-8"?>')
-    svg.append(f'<svg width="{svg_width}" height="{svg_height}" '
-               f'viewBox="0 0 {svg_width} {svg_height}" '
-               f'xmlns="http://www.w3.org/2000/svg">')
+    write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    write(f'<svg width="{svg_width}" height="{svg_height}" '
+          f'viewBox="0 0 {svg_width} {svg_height}" '
+          f'xmlns="http://www.w3.org/2000/svg"')
+    if compact:
+        write(' xmlns:xlink="http://www.w3.org/1999/xlink">\n')
+        write(_COMPACT_DEFS)
+        write('\n')
+    else:
+        write('>\n')
     
     # White background
-    svg.append(f'  <rect x="0" y="0" width="{svg_width}" height="{svg_height}" fill="white"/>')
+    write(f'  <rect x="0" y="0" width="{svg_width}" height="{svg_height}" fill="white"/>\n')
     
     # Main block
-    svg.append(f'  <rect x="{block_x}" y="{block_y}" width="{BLOCK_WIDTH}" height="{block_height}" '
-               f'fill="#f8f9fa" stroke="#2c3e50" stroke-width="2.5" rx="10" ry="10"/>')
+    write(f'  <rect x="{block_x}" y="{block_y}" width="{BLOCK_WIDTH}" height="{block_height}" '
+          f'fill="#f8f9fa" stroke="#2c3e50" stroke-width="2.5" rx="10" ry="10"/>\n')
     
     # Module name with background for better visibility
-    svg.append(f'  <rect x="{block_x + BLOCK_WIDTH/2 - 120}" y="{block_y - 40}" '
-               f'width="240" height="30" fill="white" stroke="none"/>')
-    svg.append(f'  <text x="{block_x + BLOCK_WIDTH/2}" y="{block_y - 18}" '
-               f'text-anchor="middle" font-family="Arial, Helvetica, sans-serif" '
-               f'font-size="20" font-weight="bold" fill="#2c3e50">{module_name}</text>')
+    write(f'  <rect x="{block_x + BLOCK_WIDTH/2 - 120}" y="{block_y - 40}" '
+          f'width="240" height="30" fill="white" stroke="none"/>\n')
+    write(f'  <text x="{block_x + BLOCK_WIDTH/2}" y="{block_y - 18}" '
+          f'text-anchor="middle" font-family="Arial, Helvetica, sans-serif" '
+          f'font-size="20" font-weight="bold" fill="#2c3e50" class="module-name">{escape(module_name)}</text>\n')
     
     # Input ports (left side)
     if inputs:
         input_spacing = block_height / (len(inputs) + 1)
         for i, port in enumerate(inputs, 1):
             port_y = block_y + i * input_spacing
+            label = escape(getattr(port, 'label', port))
             
-            # Connection line
-            svg.append(f'  <line x1="{block_x - 25}" y1="{port_y}" '
-                       f'x2="{block_x}" y2="{port_y}" stroke="#34495e" stroke-width="1.5"/>')
+            if compact:
+                write(f'  <use xlink:href="#pepper-pin-in" x="{block_x}" y="{port_y}"/>\n'
+                      f'  <text class="pin pin-in" x="{block_x - 30}" y="{port_y + 5}">{label}</text>\n')
+                continue
             
-            # Port name with white background for readability
-            svg.append(f'  <rect x="{block_x - 190}" y="{port_y - 10}" '
-                       f'width="160" height="20" fill="white" stroke="none"/>')
-            svg.append(f'  <text x="{block_x - 30}" y="{port_y + 5}" '
-                       f'text-anchor="end" font-family="Arial, Helvetica, sans-serif" '
-                       f'font-size="13" fill="#2c3e50">{port}</text>')
-            
-            # Port dot
-            svg.append(f'  <circle cx="{block_x}" cy="{port_y}" r="3.5" fill="#2c3e50"/>')
+            # Connection line, port name with white background for
+            # readability, and port dot, in one write
+            write(f'  <line x1="{block_x - 25}" y1="{port_y}" '
+                  f'x2="{block_x}" y2="{port_y}" stroke="#34495e" stroke-width="1.5"/>\n'
+                  f'  <rect x="{block_x - 190}" y="{port_y - 10}" '
+                  f'width="160" height="20" fill="white" stroke="none"/>\n'
+                  f'  <text x="{block_x - 30}" y="{port_y + 5}" '
+                  f'text-anchor="end" font-family="Arial, Helvetica, sans-serif" '
+                  f'font-size="13" fill="#2c3e50">{label}</text>\n'
+                  f'  <circle cx="{block_x}" cy="{port_y}" r="3.5" fill="#2c3e50"/>\n')
     
     # Output ports (right side)
     if outputs:
         output_spacing = block_height / (len(outputs) + 1)
         for i, port in enumerate(outputs, 1):
             port_y = block_y + i * output_spacing
+            label = escape(getattr(port, 'label', port))
             
-            # Connection line
-            svg.append(f'  <line x1="{block_x + BLOCK_WIDTH}" y1="{port_y}" '
-                       f'x2="{block_x + BLOCK_WIDTH + 25}" y2="{port_y}" stroke="#34495e" stroke-width="1.5"/>')
-            
-            # Port name with white background for readability
-            svg.append(f'  <rect x="{block_x + BLOCK_WIDTH + 30}" y="{port_y - 10}" '
-                       f'width="160" height="20" fill="white" stroke="none"/>')
-            svg.append(f'  <text x="{block_x + BLOCK_WIDTH + 35}" y="{port_y + 5}" '
-                       f'text-anchor="start" font-family="Arial, Helvetica, sans-serif" '
-                       f'font-size="13" fill="#2c3e50">{port}</text>')
+            if compact:
+                write(f'  <use xlink:href="#pepper-pin-out" x="{block_x + BLOCK_WIDTH}" y="{port_y}"/>\n'
+                      f'  <text class="pin" x="{block_x + BLOCK_WIDTH + 35}" y="{port_y + 5}">{label}</text>\n')
+                continue
             
-            # Port dot
-            svg.append(f'  <circle cx="{block_x + BLOCK_WIDTH}" cy="{port_y}" r="3.5" fill="#2c3e50"/>')
+            # Connection line, label with background, and port dot
+            write(f'  <line x1="{block_x + BLOCK_WIDTH}" y1="{port_y}" '
+                  f'x2="{block_x + BLOCK_WIDTH + 25}" y2="{port_y}" stroke="#34495e" stroke-width="1.5"/>\n'
+                  f'  <rect x="{block_x + BLOCK_WIDTH + 30}" y="{port_y - 10}" '
+                  f'width="160" height="20" fill="white" stroke="none"/>\n'
+                  f'  <text x="{block_x + BLOCK_WIDTH + 35}" y="{port_y + 5}" '
+                  f'text-anchor="start" font-family="Arial, Helvetica, sans-serif" '
+                  f'font-size="13" fill="#2c3e50">{label}</text>\n'
+                  f'  <circle cx="{block_x + BLOCK_WIDTH}" cy="{port_y}" r="3.5" fill="#2c3e50"/>\n')
     
     # Add I/O count summary
-    svg.append(f'  <text x="{svg_width/2}" y="{svg_height - 20}" '
-               f'text-anchor="middle" font-family="Arial, Helvetica, sans-serif" '
-               f'font-size="11" fill="#7f8c8d">Inputs: {len(inputs)}  |  Outputs: {len(outputs)}</text>')
+    write(f'  <text x="{svg_width/2}" y="{svg_height - 20}" '
+          f'text-anchor="middle" font-family="Arial, Helvetica, sans-serif" '
+          f'font-size="11" fill="#7f8c8d">Inputs: {len(inputs)}  |  Outputs: {len(outputs)}</text>\n')
+    
+    write('</svg>')
+
+def _write_grouped_svg(out, module_name, inputs, outputs, compact, title_width=None):
+    """write_svg() with pin_layout='grouped'.
     
-    svg.append('</svg>')
+    title_width overrides the measured width of the module name, so
+    SymbolIndex can render a template for every name of that width.
+    """
+    write = out.write
     
-    return '\n'.join(svg)
+    # Configuration
+    ROW_SPACING = 24
+    PIN_LENGTH = 25
+    LABEL_GAP = 5
+    SIDE_PADDING = 15
+    BLOCK_MIN_WIDTH = 120
+    BLOCK_MIN_ROWS = 3
+    TITLE_PADDING = 30
+    TOP_MARGIN = 60
+    BOTTOM_MARGIN = 45
+    
+    left_rows = _pin_rows(inputs)
+    right_rows = _pin_rows(outputs)
+    
+    # Each side is as wide as its longest label or heading
+    def side_width(rows):
+        if not rows:
+            return SIDE_PADDING
+        widest = max(text_width(label) if label is not None else text_width(heading, 11)
+                     for label, heading in rows)
+        return PIN_LENGTH + LABEL_GAP + math.ceil(widest) + SIDE_PADDING
+    
+    left_width = side_width(left_rows)
+    right_width = side_width(right_rows)
+    if title_width is None:
+        title_width = math.ceil(text_width(module_name, 20, bold=True))
+    block_width = max(BLOCK_MIN_WIDTH, title_width + TITLE_PADDING)
+    block_height = (max(len(left_rows), len(right_rows), BLOCK_MIN_ROWS) + 1) * ROW_SPACING
+    
+    # The I/O count summary below the block may be wider than the symbol
+    summary = f"Inputs: {len(inputs)}  |  Outputs: {len(outputs)}"
+    svg_width = left_width + block_width + right_width
+    extra = max(0, math.ceil(text_width(summary, 11)) + 2 * SIDE_PADDING - svg_width)
+    svg_width += extra
+    svg_height = TOP_MARGIN + block_height + BOTTOM_MARGIN
+    
+    block_x = left_width + extra // 2
+    block_y = TOP_MARGIN
+    
+    write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    write(f'<svg width="{svg_width}" height="{svg_height}" '
+          f'viewBox="0 0 {svg_width} {svg_height}" '
+          f'xmlns="http://www.w3.org/2000/svg"')
+    if compact:
+        write(' xmlns:xlink="http://www.w3.org/1999/xlink">\n')
+        write(_GROUPED_DEFS)
+        write('\n')
+    else:
+        write('>\n')
+    write(f'  <rect x="0" y="0" width="{svg_width}" height="{svg_height}" fill="white"/>\n')
+    write(f'  <rect x="{block_x}" y="{block_y}" width="{block_width}" height="{block_height}" '
+          f'fill="#f8f9fa" stroke="#2c3e50" stroke-width="2.5" rx="10" ry="10"/>\n')
+    write(f'  <rect x="{block_x + (block_width - title_width) / 2 - 10:g}" y="{block_y - 40}" '
+          f'width="{title_width + 20}" height="30" fill="white" stroke="none"/>\n')
+    write(f'  <text x="{block_x + block_width / 2:g}" y="{block_y - 18}" '
+          f'text-anchor="middle" font-family="Arial, Helvetica, sans-serif" '
+          f'font-size="20" font-weight="bold" fill="#2c3e50" class="module-name">{escape(module_name)}</text>\n')
+    
+    # Pins one grid row apart, headings in the row above their group. Headings
+    # are free comment text, so everything is escaped (and measured unescaped)
+    for rows, pin_x, label_x, side in ((left_rows, block_x, block_x - PIN_LENGTH - LABEL_GAP, 'in'),
+                                       (right_rows, block_x + block_width,
+                                        block_x + block_width + PIN_LENGTH + LABEL_GAP, 'out')):
+        anchor = 'end' if side == 'in' else 'start'
+        for row, (label, heading) in enumerate(rows, 1):
+            y = block_y + row * ROW_SPACING
+            if label is None:
+                if not heading:
+                    continue
+                if compact:
+                    write(f'  <text class="pin-group{" pin-in" if side == "in" else ""}" '
+                          f'x="{label_x}" y="{y + 4}">{escape(heading)}</text>\n')
+                else:
+                    write(f'  <text x="{label_x}" y="{y + 4}" text-anchor="{anchor}" '
+                          f'font-family="Arial, Helvetica, sans-serif" font-size="11" '
+                          f'font-style="italic" fill="#7f8c8d">{escape(heading)}</text>\n')
+            elif compact:
+                write(f'  <use xlink:href="#pepper-pin-{side}-bare" x="{pin_x}" y="{y}"/>\n'
+                      f'  <text class="pin{" pin-in" if side == "in" else ""}" '
+                      f'x="{label_x}" y="{y + 5}">{escape(label)}</text>\n')
+            else:
+                line_x = pin_x - PIN_LENGTH if side == 'in' else pin_x + PIN_LENGTH
+                write(f'  <line x1="{line_x}" y1="{y}" x2="{pin_x}" y2="{y}" '
+                      f'stroke="#34495e" stroke-width="1.5"/>\n'
+                      f'  <text x="{label_x}" y="{y + 5}" text-anchor="{anchor}" '
+                      f'font-family="Arial, Helvetica, sans-serif" '
+                      f'font-size="13" fill="#2c3e50">{escape(label)}</text>\n'
+                      f'  <circle cx="{pin_x}" cy="{y}" r="3.5" fill="#2c3e50"/>\n')
+    
+    write(f'  <text x="{svg_width / 2:g}" y="{svg_height - 20}" '
+          f'text-anchor="middle" font-family="Arial, Helvetica, sans-serif" '
+          f'font-size="11" fill="#7f8c8d">{summary}</text>\n')
+    write('</svg>')
+
+def port_signature(inputs, outputs, compact=False, pin_layout='fixed'):
+    """Key shared by all modules whose symbols differ only in their name."""
+    key = (tuple(str(getattr(port, 'label', port)) for port in inputs),
+           tuple(str(getattr(port, 'label', port)) for port in outputs),
+           compact)
+    if pin_layout == 'fixed':
+        return key
+    # Grouped symbols also depend on the section headings
+    return key + (pin_layout,
+                  tuple(getattr(port, 'section', None) for port in inputs),
+                  tuple(getattr(port, 'section', None) for port in outputs))
 
-def verilog_to_svg(input_file, output_file=None, debug=False):
-    """Convert Verilog file to SVG symbol."""
+class SymbolIndex:
+    """Port-signature index of rendered symbols.
     
-    # Read Verilog file
-    try:
-        with open(input_file, 'r') as f:
-            verilog_code = f.read()
-    except FileNotFoundError:
-        print(f"Error: File '{input_file}' not found")
-        return False
-    except Exception as e:
-        print(f"Error reading file: {e}")
-        return False
+    A symbol depends on the module name only through its title text, so
+    each distinct port signature is rendered once, split around the name,
+    and every later module with the same ports is written from that
+    template. Grouped symbols also size the block to the name, so their
+    templates are kept per title width.
+    """
     
-    # Parse module
-    try:
-        module_name, inputs, outputs = parse_verilog_module(verilog_code)
-    except ValueError as e:
-        print(f"Error parsing Verilog: {e}")
-        return False
+    def __init__(self, cache_size=SYMBOL_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.templates = {}
+        self.rendered = 0
+        self.reused = 0
     
+    def write(self, out, module_name, inputs, outputs, compact=False, pin_layout='fixed'):
+        """Write the symbol of a module to out, rendering it only if its signature is new."""
+        signature = port_signature(inputs, outputs, compact, pin_layout)
+        key = signature
+        title_width = None
+        if pin_layout == 'grouped':
+            title_width = math.ceil(text_width(module_name, 20, bold=True))
+            key += (title_width,)
+        template = self.templates.pop(key, None)
+        if template is None:
+            buffer = io.StringIO()
+            if title_width is None:
+                write_svg(buffer, '\0', inputs, outputs, compact, pin_layout)
+            else:
+                _write_grouped_svg(buffer, '\0', inputs, outputs, compact, title_width)
+            template = buffer.getvalue().split('\0')
+            self.rendered += 1
+            if len(self.templates) >= self.cache_size:
+                del self.templates[next(iter(self.templates))]
+        else:
+            self.reused += 1
+        self.templates[key] = template
+        
+        prefix, suffix = template
+        out.write(prefix)
+        out.write(escape(module_name))
+        out.write(suffix)
+
+# Index used by the conversions in this process
+_symbols = SymbolIndex()
+
+def print_module_summary(module_name, inputs, outputs):
+    """Print the parsed ports of a module."""
     if not inputs and not outputs:
         print("Warning: No inputs or outputs found")
     
@@ -376,43 +1372,537 @@ def verilog_to_svg(input_file, output_file=None, debug=False):
     print(f"📦 Module: {module_name}")
     print(f"📥 Inputs ({len(inputs)}):")
     for i, inp in enumerate(inputs, 1):
-        print(f"    {i:2d}. {inp}")
+        print(f"    {i:2d}. {getattr(inp, 'label', inp)}")
     print(f"📤 Outputs ({len(outputs)}):")
     for i, out in enumerate(outputs, 1):
-        print(f"    {i:2d}. {out}")
+        print(f"    {i:2d}. {getattr(out, 'label', out)}")
     print("=" * 70)
+
+class StageProfiler:
+    """Wall-clock time and net memory block growth per pipeline stage.
+    
+    Each stage() adds its duration and the change in the number of live
+    memory blocks (sys.getallocatedblocks) to the stage totals. That is
+    what a stage kept, not how many allocations it made: blocks allocated
+    and freed inside the stage cancel out, and a stage freeing earlier
+    data can come out negative. It is cheap enough not to skew the times,
+    unlike tracemalloc. With trace=True every call is also kept as a
+    Chrome trace event (chrome://tracing, Perfetto).
+    """
     
-    # Generate SVG
-    svg_content = generate_svg(module_name, inputs, outputs)
+    def __init__(self, trace=False):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.events = [] if trace else None
+        self.current_file = None
+        self.cprofile = None
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            totals = self.stages.setdefault(name, [0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += end - start
+            totals[2] += sys.getallocatedblocks() - blocks
+            if self.events is not None:
+                self.events.append({'name': name, 'cat': 'stage', 'ph': 'X',
+                                    'pid': os.getpid(), 'tid': 0,
+                                    'ts': round((start - self.started) * 1e6, 3),
+                                    'dur': round((end - start) * 1e6, 3),
+                                    'args': {'file': self.current_file}})
+    
+    def print_summary(self):
+        """Print the per-stage totals, slowest stage first."""
+        wall = time.perf_counter() - self.started
+        print(f"\n{'='*70}")
+        print(f"PROFILE ({wall * 1e3:.1f} ms wall clock):")
+        print(f"  {'Stage':<10}{'calls':>7}{'total ms':>12}{'mean ms':>10}{'%':>7}{'net blocks':>13}")
+        for name, (calls, seconds, blocks) in sorted(self.stages.items(), key=lambda kv: -kv[1][1]):
+            print(f"  {name:<10}{calls:>7}{seconds * 1e3:>12.2f}{seconds * 1e3 / calls:>10.3f}"
+                  f"{100 * seconds / wall if wall else 0:>7.1f}{blocks:>13}")
+        print(f"{'='*70}\n")
+    
+    def write_trace(self, trace_file):
+        """Write the recorded stage events as a Chrome trace JSON file."""
+        with open(trace_file, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+def enable_profiling(output_file=None):
+    """Start recording per-stage timings for the conversions that follow.
+    
+    An output_file ending in .json also records a Chrome trace; any other
+    output_file gets cProfile statistics (readable with pstats/snakeviz).
+    """
+    global _profiler
+    _profiler = StageProfiler(trace=bool(output_file) and output_file.endswith('.json'))
+    if output_file and not output_file.endswith('.json'):
+        import cProfile
+        _profiler.cprofile = cProfile.Profile()
+        _profiler.cprofile.enable()
+    return _profiler
+
+def finish_profiling(output_file=None):
+    """Stop profiling and write the trace or cProfile output, if requested."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return
+    if profiler.cprofile is not None:
+        profiler.cprofile.disable()
+        profiler.cprofile.dump_stats(output_file)
+        print(f"📈 cProfile statistics saved to: {output_file}")
+    elif output_file:
+        profiler.write_trace(output_file)
+        print(f"📈 Chrome trace saved to: {output_file}")
+
+def _stage(name):
+    """Context manager timing a pipeline stage when profiling is enabled."""
+    if _profiler is None:
+        return contextlib.nullcontext()
+    return _profiler.stage(name)
+
+def set_output_mode(quiet=False, record_out=None):
+    """Select the console output of the conversions that follow.
+    
+    With quiet, the module banners, per-port lines and progress messages
+    are skipped; errors, warnings and the directory SUMMARY are still
+    printed. With a record_out stream (such as sys.stdout or an open
+    .jsonl file), one JSON record is written per module symbol:
+    file, module, inputs, outputs, output, parse_ms and render_ms, or
+    file and error for a file that failed. Records imply quiet.
+    """
+    global _quiet, _record_out
+    _quiet = quiet or record_out is not None
+    _record_out = record_out
+
+def _say(*lines):
+    """Print progress lines unless the output mode is quiet."""
+    if not _quiet:
+        for line in lines:
+            print(line)
+
+def _record(**fields):
+    """Write one JSON record when --json is on."""
+    if _record_out is not None:
+        _record_out.write(json.dumps(fields) + '\n')
+
+def _error(input_file, message):
+    """Report a failed conversion on the console and as a record; returns False."""
+    # Without the per-file separators, quiet errors name their file
+    print(f"{input_file}: {message}" if _quiet else message)
+    _record(file=str(input_file), error=message)
+    return False
+
+class IOPipeline:
+    """Overlapped file I/O for a directory run.
+    
+    Reader threads fetch up to read_ahead Verilog files ahead of the one
+    being parsed, and symbols are rendered into memory and handed to a
+    writer thread through a queue holding at most write_behind files, so
+    parsing overlaps both the reads and the writes. Files are still
+    parsed, printed and rendered in order in the calling thread, so the
+    output is identical to a serial run. Output files are opened before
+    they are queued, so a bad path fails immediately; errors of the
+    background write itself are collected in failed and reported by
+    close().
+    """
+    
+    def __init__(self, read_ahead=8, write_behind=8):
+        import queue
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        
+        self.read_ahead = max(0, read_ahead)
+        self.reader = ThreadPoolExecutor(max_workers=max(1, min(PIPELINE_READERS, self.read_ahead)))
+        self.fetched = {}
+        self.failed = {}
+        self.queue = queue.Queue(maxsize=max(1, write_behind))
+        self.writer = threading.Thread(target=self._drain, name='svg-writer', daemon=True)
+        self.writer.start()
+    
+    def prefetch(self, input_file):
+        """Start reading a file that will be asked for soon (at most read_ahead ahead)."""
+        self.fetched[input_file] = self.reader.submit(_read_verilog, input_file)
+    
+    def read(self, input_file):
+        """Verilog source of a file (see _read_verilog), prefetched if possible."""
+        future = self.fetched.pop(input_file, None)
+        if future is None:
+            return _read_verilog(input_file)
+        return future.result()
+    
+    def write(self, output_file, module_name, inputs, outputs, compact=False, pin_layout='fixed'):
+        """Render a symbol and queue it for the writer thread."""
+        f = open(output_file, 'w', buffering=WRITE_BUFFER)
+        try:
+            buffer = io.StringIO()
+            _symbols.write(buffer, module_name, inputs, outputs, compact, pin_layout)
+        except BaseException:
+            f.close()
+            raise
+        self.queue.put((f, buffer.getvalue()))
+    
+    def _drain(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            f, text = item
+            # Any error (e.g. UnicodeEncodeError) is recorded and the thread keeps
+            # draining, so write() never blocks on a full queue with no writer
+            try:
+                with f:
+                    f.write(text)
+            except Exception as e:
+                self.failed[f.name] = e
+    
+    def close(self):
+        """Finish the queued writes; returns {output file: error} of failed ones."""
+        self.queue.put(None)
+        self.writer.join()
+        for future in self.fetched.values():
+            future.cancel()
+        self.reader.shutdown()
+        for output_file, e in self.failed.items():
+            print(f"Error writing SVG file {output_file}: {e}")
+            _record(output=output_file, error=str(e))
+        return self.failed
+
+def _source(input_file):
+    """Read a Verilog file, through the pipeline's prefetch when one is running."""
+    if _pipeline is not None:
+        return _pipeline.read(input_file)
+    return _read_verilog(input_file)
+
+def _write_symbol(output_file, module_name, inputs, outputs, compact=False, pin_layout='fixed'):
+    """Write a symbol file, queued to the pipeline's writer when one is running."""
+    if _pipeline is not None:
+        _pipeline.write(output_file, module_name, inputs, outputs, compact, pin_layout)
+        return
+    with open(output_file, 'w', buffering=WRITE_BUFFER) as f:
+        _symbols.write(f, module_name, inputs, outputs, compact, pin_layout)
+
+def verilog_to_svg(input_file, output_file=None, debug=False, compact=False, pin_layout='fixed'):
+    """Convert Verilog file to SVG symbol (see write_svg() for compact and pin_layout)."""
+    start = time.perf_counter()
+    
+    # Read Verilog file (large files are memory-mapped while parsing instead)
+    try:
+        with _stage('read'):
+            verilog_code = _source(input_file)
+    except FileNotFoundError:
+        return _error(input_file, f"Error: File '{input_file}' not found")
+    except Exception as e:
+        return _error(input_file, f"Error reading file: {e}")
+    
+    # Parse module
+    try:
+        # The debug dump keeps the source as written, so parse a separate copy
+        with _stage('preprocess'):
+            parse_code = _preprocess(input_file, verilog_code)
+        with _stage('parse'):
+            if parse_code is None:
+                module_name, inputs, outputs = parse_verilog_file(input_file, records=True)
+            else:
+                module_name, inputs, outputs = parse_verilog_module(parse_code, records=True)
+    except ValueError as e:
+        return _error(input_file, f"Error parsing Verilog: {e}")
+    except OSError as e:
+        return _error(input_file, f"Error reading file: {e}")
+    parsed = time.perf_counter()
+    
+    if not _quiet:
+        with _stage('print'):
+            print_module_summary(module_name, inputs, outputs)
     
     # Determine output filename
     if not output_file:
         output_file = Path(input_file).stem + '_symbol.svg'
     
-    # Write SVG file
+    # Generate the SVG straight into the output file
     try:
-        with open(output_file, 'w') as f:
-            f.write(svg_content)
-        print(f"✅ SVG symbol saved to: {output_file}")
+        rendered = time.perf_counter()
+        with _stage('render'):
+            _write_symbol(output_file, module_name, inputs, outputs, compact, pin_layout)
+        finished = time.perf_counter()
+        with _stage('print'):
+            _say(f"✅ SVG symbol saved to: {output_file}")
         
         # Debug info
         if debug:
             debug_file = Path(input_file).stem + '_debug.txt'
-            with open(debug_file, 'w') as f:
+            with _stage('debug'), open(debug_file, 'w') as f:
                 f.write(f"Module: {module_name}\n")
-                f.write(f"Inputs ({len(inputs)}): {inputs}\n")
-                f.write(f"Outputs ({len(outputs)}): {outputs}\n")
+                f.write(f"Inputs ({len(inputs)}): {[port.label for port in inputs]}\n")
+                f.write(f"Outputs ({len(outputs)}): {[port.label for port in outputs]}\n")
                 f.write("\nOriginal Verilog:\n")
-                f.write(verilog_code)
-            print(f"🔍 Debug info saved to: {debug_file}")
-        
-        return True
+                _write_source(f, input_file, verilog_code)
+            _say(f"🔍 Debug info saved to: {debug_file}")
     except Exception as e:
-        print(f"Error writing SVG file: {e}")
-        return False
+        return _error(input_file, f"Error writing SVG file: {e}")
+    
+    _record(file=str(input_file), module=module_name, inputs=len(inputs), outputs=len(outputs),
+            output=str(output_file), parse_ms=round((parsed - start) * 1e3, 3),
+            render_ms=round((finished - rendered) * 1e3, 3))
+    return True
+
+def verilog_modules_to_svg(input_file, output_dir=None, debug=False, compact=False, pin_layout='fixed'):
+    """Convert every module in a Verilog file to its own SVG symbol.
+    
+    Symbols are written as <module>_symbol.svg in output_dir (default: the
+    input file's directory). Returns the list of files written, or False.
+    """
+    start = time.perf_counter()
+    
+    # Read Verilog file (large files are memory-mapped while parsing instead)
+    try:
+        with _stage('read'):
+            verilog_code = _source(input_file)
+    except FileNotFoundError:
+        return _error(input_file, f"Error: File '{input_file}' not found")
+    except Exception as e:
+        return _error(input_file, f"Error reading file: {e}")
+    
+    output_path = Path(output_dir) if output_dir else Path(input_file).parent
+    written = []
+    modules = []
+    
+    try:
+        output_path.mkdir(parents=True, exist_ok=True)
+        with _stage('preprocess'):
+            parse_code = _preprocess(input_file, verilog_code)
+        with _stage('parse'):
+            if parse_code is None:
+                parsed = list(parse_verilog_file_modules(input_file, records=True))
+            else:
+                parsed = list(parse_verilog_modules(parse_code, records=True))
+        parse_ms = round((time.perf_counter() - start) * 1e3, 3)
+        for module_name, inputs, outputs in parsed:
+            if not _quiet:
+                with _stage('print'):
+                    print_module_summary(module_name, inputs, outputs)
+            output_file = output_path / (module_name + '_symbol.svg')
+            rendered = time.perf_counter()
+            with _stage('render'):
+                _write_symbol(output_file, module_name, inputs, outputs, compact, pin_layout)
+            render_ms = round((time.perf_counter() - rendered) * 1e3, 3)
+            with _stage('print'):
+                _say(f"✅ SVG symbol saved to: {output_file}")
+            written.append(str(output_file))
+            modules.append((module_name, inputs, outputs, render_ms))
+    except ValueError as e:
+        return _error(input_file, f"Error parsing Verilog: {e}")
+    except Exception as e:
+        return _error(input_file, f"Error writing SVG file: {e}")
+    
+    if not written:
+        return _error(input_file, "Error parsing Verilog: No module with a port list found")
+    
+    # Debug info
+    if debug:
+        debug_file = Path(input_file).stem + '_debug.txt'
+        with _stage('debug'), open(debug_file, 'w') as f:
+            for module_name, inputs, outputs, _ in modules:
+                f.write(f"Module: {module_name}\n")
+                f.write(f"Inputs ({len(inputs)}): {[port.label for port in inputs]}\n")
+                f.write(f"Outputs ({len(outputs)}): {[port.label for port in outputs]}\n\n")
+            f.write("Original Verilog:\n")
+            _write_source(f, input_file, verilog_code)
+        _say(f"🔍 Debug info saved to: {debug_file}")
+    
+    for output_file, (module_name, inputs, outputs, render_ms) in zip(written, modules):
+        _record(file=str(input_file), module=module_name, inputs=len(inputs), outputs=len(outputs),
+                output=output_file, parse_ms=parse_ms, render_ms=render_ms)
+    _say(f"📚 {len(written)} module symbol(s) written from {Path(input_file).name}")
+    return written
+
+def file_digest(input_file):
+    """Hash a Verilog file's content together with the generator version."""
+    digest = hashlib.sha256(GENERATOR_VERSION.encode())
+    with open(input_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_cache(cache_file):
+    """Load the incremental cache, returning an empty one if missing or stale."""
+    try:
+        with open(cache_file, 'r') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('version') != GENERATOR_VERSION:
+        return {}
+    return cache.get('files', {})
+
+def save_cache(cache_file, entries):
+    """Write the incremental cache atomically."""
+    tmp_file = str(cache_file) + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({'version': GENERATOR_VERSION, 'files': entries}, f, indent=1, sort_keys=True)
+    os.replace(tmp_file, cache_file)
+
+def _output_target(verilog_file, output_dir, all_modules, base=None):
+    """Output SVG path for a file in directory mode (its directory with all_modules).
+    
+    Below output_dir, a file found under the base directory keeps its
+    subdirectory, so files with the same name in different folders of a
+    recursive run do not overwrite each other's symbols.
+    """
+    if output_dir:
+        output_path = Path(output_dir)
+        if base is not None:
+            output_path = output_path / verilog_file.parent.relative_to(base)
+        output_path.mkdir(parents=True, exist_ok=True)
+    else:
+        output_path = verilog_file.parent
+    if all_modules:
+        return output_path
+    return output_path / (verilog_file.stem + '_symbol.svg')
+
+def _convert(job):
+    """Convert one directory-mode job; returns the list of SVGs written, or False."""
+    input_file, output, debug, all_modules, compact, pin_layout = job
+    if all_modules:
+        return verilog_modules_to_svg(input_file, output, debug, compact, pin_layout)
+    return [output] if verilog_to_svg(input_file, output, debug, compact, pin_layout) else False
+
+def _convert_captured(job):
+    """Run _convert() in a worker process and capture its console output and records."""
+    global _record_out
+    buffer = io.StringIO()
+    records = io.StringIO() if _record_out is not None else None
+    saved, _record_out = _record_out, records
+    try:
+        with contextlib.redirect_stdout(buffer):
+            written = _convert(job)
+    finally:
+        _record_out = saved
+    return written, buffer.getvalue(), records.getvalue() if records is not None else ''
+
+def _init_worker(quiet, records, preprocess):
+    """Give a worker process the parent's output mode and preprocessor settings.
+    
+    Records are captured per job; the worker keeps its own include cache.
+    """
+    set_output_mode(quiet, io.StringIO() if records else None)
+    if preprocess is not None:
+        enable_preprocessing(dict(preprocess[0]), preprocess[1])
+
+def _matches(name, relative, patterns):
+    """Whether a glob pattern matches the name (or, with a '/', the relative path)."""
+    return any(fnmatch.fnmatchcase(relative if '/' in pattern else name, pattern) for pattern in patterns)
+
+def find_verilog_files(directory_path, recursive=False, include=None, exclude=None):
+    """Yield the Verilog files of a directory in sorted order, as they are found.
+    
+    include (default DEFAULT_INCLUDE) and exclude are glob patterns matched
+    against the file name, or against the path relative to the directory
+    when they contain a '/'. With recursive, each subdirectory is searched
+    after the files of its parent, skipping hidden directories and those
+    matching an exclude pattern; directory symlinks are not followed.
+    """
+    include = include or DEFAULT_INCLUDE
+    exclude = exclude or ()
+    stack = [(Path(directory_path), '')]
+    while stack:
+        folder, prefix = stack.pop()
+        try:
+            with os.scandir(folder) as scan:
+                entries = sorted(scan, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            relative = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if recursive and not entry.name.startswith('.') and not _matches(entry.name, relative, exclude):
+                    subdirs.append((folder / entry.name, relative + '/'))
+            elif (entry.is_file() and _matches(entry.name, relative, include)
+                  and not _matches(entry.name, relative, exclude)):
+                yield folder / entry.name
+        stack.extend(reversed(subdirs))
 
-def process_directory(directory_path, output_dir=None, debug=False):
-    """Process all Verilog files in a directory."""
+def expand_verilog_paths(paths):
+    """Expand files and directories (see find_verilog_files) into a list of Verilog files.
+    
+    Files are kept as given; missing paths are reported and skipped.
+    """
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(find_verilog_files(path))
+        elif path.exists():
+            files.append(path)
+        else:
+            print(f"Warning: '{path}' not found, skipping")
+    return files
+
+def _directory_jobs(verilog_files, dir_path, output_dir, debug, all_modules, compact, pin_layout, cache):
+    """Yield (file, job, digest, cache hit) for each file, hashing it when caching."""
+    for verilog_file in verilog_files:
+        output = str(_output_target(verilog_file, output_dir, all_modules, dir_path))
+        job = (str(verilog_file), output, debug, all_modules, compact, pin_layout)
+        digest = None
+        hit = False
+        if cache is not None:
+            try:
+                with _stage('hash'):
+                    digest = file_digest(job[0])
+            except OSError:
+                pass
+            else:
+                entry = cache.get(job[0])
+                hit = (entry is not None
+                       and entry.get('digest') == digest
+                       and entry.get('target') == output
+                       and entry.get('compact', False) == compact
+                       and entry.get('pin_layout', 'fixed') == pin_layout
+                       and entry.get('preprocess') == _preprocess_key()
+                       and all(Path(f).exists() for f in entry.get('outputs', [])))
+        yield verilog_file, job, digest, hit
+
+def process_directory(directory_path, output_dir=None, debug=False, jobs=1, cache_file=None,
+                      all_modules=False, compact=False, read_ahead=0, write_behind=0,
+                      recursive=False, include=None, exclude=None, pin_layout='fixed'):
+    """Process all Verilog files in a directory.
+    
+    Files are selected by find_verilog_files() (recursive, include and
+    exclude globs). With recursive, discovered files are fed to the
+    conversion as the tree is walked instead of being listed first, and a
+    file in a subdirectory gets its symbol in the same subdirectory of
+    output_dir.
+    
+    With jobs > 1 the files are converted in a process pool. Each worker's
+    console output is captured and replayed in sorted file order, so the
+    log and the SUMMARY counts match a sequential run.
+    
+    With a cache_file, files whose content hash matches the previous run and
+    whose symbols still exist are skipped without parsing or rendering, and
+    their SVGs are left untouched. The cache also records the preprocessor
+    defines and include dirs (see enable_preprocessing), but not the
+    content of include files: clear it after editing a shared header.
+    
+    With all_modules, every module in each file gets its own symbol, named
+    after the module. With compact, symbols use shared pin definitions;
+    pin_layout 'grouped' groups the pins by their port list comments (see
+    write_svg).
+    
+    With read_ahead or write_behind in a sequential run, file reads and
+    symbol writes run in background threads (see IOPipeline): up to
+    read_ahead files are prefetched and up to write_behind rendered
+    symbols wait to be written, so parsing overlaps the I/O. The log and
+    the files written are the same as without them.
+    
+    When profiling is enabled (see enable_profiling), files are converted
+    sequentially and a per-stage summary is printed at the end.
+    """
+    global _pipeline
     
     dir_path = Path(directory_path)
     
@@ -424,50 +1914,247 @@ def process_directory(directory_path, output_dir=None, debug=False):
         print(f"Error: '{directory_path}' is not a directory")
         return False
     
-    # Find all Verilog files (.v and .sv extensions)
-    verilog_files = list(dir_path.glob('*.v')) + list(dir_path.glob('*.sv'))
+    # Find the Verilog files (.v and .sv by default); a recursive walk is streamed
+    verilog_files = find_verilog_files(dir_path, recursive, include, exclude)
+    if recursive:
+        _say(f"\n{'='*70}", f"Scanning '{directory_path}' recursively", f"{'='*70}\n")
+    else:
+        verilog_files = list(verilog_files)
+        if not verilog_files:
+            print(f"No Verilog files (.v or .sv) found in '{directory_path}'")
+            return False
+        _say(f"\n{'='*70}", f"Found {len(verilog_files)} Verilog file(s) in '{directory_path}'", f"{'='*70}\n")
+    
+    success_count = 0
+    fail_count = 0
+    total = 0
     
-    if not verilog_files:
+    # Unchanged files are looked up in the incremental cache as they are found
+    cache = load_cache(cache_file) if cache_file else {}
+    stream = _directory_jobs(verilog_files, dir_path, output_dir, debug, all_modules, compact, pin_layout,
+                             cache if cache_file else None)
+    
+    # Stage timings are collected in this process only
+    if _profiler is not None:
+        jobs = 1
+    
+    # Files discovered, hashed and started ahead of the one being reported
+    executor = None
+    if jobs > 1:
+        window = jobs * 4
+    elif read_ahead > 0 or write_behind > 0:
+        # Overlap reads and writes with parsing in a sequential run
+        _pipeline = IOPipeline(read_ahead, write_behind)
+        window = read_ahead + 1
+    else:
+        window = 1
+    ahead = deque()
+    converted = []
+    # A single file to convert is not worth starting the pool for
+    first_miss = None
+    
+    try:
+        while True:
+            for verilog_file, job, digest, hit in itertools.islice(stream, window - len(ahead)):
+                future = None
+                if hit:
+                    pass
+                elif jobs > 1 and first_miss is None:
+                    first_miss = job
+                elif jobs > 1:
+                    if executor is None:
+                        # Imported here so single-file runs and library users skip the cost
+                        from concurrent.futures import ProcessPoolExecutor
+                        executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                                       initargs=(_quiet, _record_out is not None,
+                                                                 _preprocess_key()))
+                    future = executor.submit(_convert_captured, job)
+                elif _pipeline is not None:
+                    _pipeline.prefetch(job[0])
+                ahead.append((verilog_file, job, digest, hit, future))
+            if not ahead:
+                break
+            verilog_file, job, digest, hit, future = ahead.popleft()
+            total += 1
+            
+            _say(f"\n{'─'*70}", f"Processing: {verilog_file.name}", f"{'─'*70}")
+            if _profiler is not None:
+                _profiler.current_file = str(verilog_file)
+            
+            if hit:
+                _say(f"⏩ Unchanged, keeping: {job[1]}")
+                written = cache[job[0]]['outputs']
+                for output in written:
+                    _record(file=job[0], output=output, cached=True)
+            elif future is not None:
+                written, output, records = future.result()
+                sys.stdout.write(output)
+                if records:
+                    _record_out.write(records)
+            else:
+                written = _convert(job)
+            
+            if written:
+                success_count += 1
+                if not hit:
+                    converted.append((job, written))
+                if cache_file and digest is not None:
+                    cache[job[0]] = {'digest': digest, 'target': job[1], 'compact': compact,
+                                     'pin_layout': pin_layout, 'preprocess': _preprocess_key(),
+                                     'outputs': written}
+            else:
+                fail_count += 1
+                cache.pop(job[0], None)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        pipeline, _pipeline = _pipeline, None
+        failed = pipeline.close() if pipeline is not None else {}
+    
+    if not total:
         print(f"No Verilog files (.v or .sv) found in '{directory_path}'")
         return False
     
-    print(f"\n{'='*70}")
-    print(f"Found {len(verilog_files)} Verilog file(s) in '{directory_path}'")
-    print(f"{'='*70}\n")
-    
-    success_count = 0
-    fail_count = 0
+    # Symbols whose background write failed count as failed files
+    if failed:
+        for job, written in converted:
+            if any(output in failed for output in written):
+                success_count -= 1
+                fail_count += 1
+                cache.pop(job[0], None)
     
-    for verilog_file in sorted(verilog_files):
-        print(f"\n{'─'*70}")
-        print(f"Processing: {verilog_file.name}")
-        print(f"{'─'*70}")
-        
-        # Determine output file path
-        if output_dir:
-            output_path = Path(output_dir)
-            output_path.mkdir(parents=True, exist_ok=True)
-            output_file = output_path / (verilog_file.stem + '_symbol.svg')
-        else:
-            output_file = verilog_file.parent / (verilog_file.stem + '_symbol.svg')
-        
-        if verilog_to_svg(str(verilog_file), str(output_file), debug):
-            success_count += 1
-        else:
-            fail_count += 1
+    if cache_file:
+        try:
+            save_cache(cache_file, cache)
+        except OSError as e:
+            print(f"Warning: could not write cache file: {e}")
     
     # Summary
     print(f"\n{'='*70}")
     print(f"SUMMARY:")
     print(f"  ✅ Successfully processed: {success_count}")
     print(f"  ❌ Failed: {fail_count}")
-    print(f"  📊 Total: {len(verilog_files)}")
+    print(f"  📊 Total: {total}")
     print(f"{'='*70}\n")
     
+    if _profiler is not None:
+        _profiler.print_summary()
+    
     return fail_count == 0
 
-def main():
+def _verilog_mtimes(dir_path, recursive=False, include=None, exclude=None):
+    """Map each Verilog file of a directory (see find_verilog_files) to its modification time."""
+    mtimes = {}
+    for verilog_file in find_verilog_files(dir_path, recursive, include, exclude):
+        try:
+            mtimes[verilog_file] = verilog_file.stat().st_mtime_ns
+        except OSError:
+            pass
+    return mtimes
+
+def _sheet_symbols(svg_root, sheet_file, recursive=False, exclude=None):
+    """Symbols a directory-mode sheet combines: the SVGs below the output root, except the sheet.
+    
+    They are found like the Verilog sources (see find_verilog_files), so a
+    recursive run's sheet holds the symbols of every subdirectory.
+    """
+    sheet = Path(sheet_file).resolve()
+    return [svg_file for svg_file in find_verilog_files(svg_root, recursive, ('*.svg',), exclude)
+            if svg_file.resolve() != sheet]
+
+def _update_sheet(sheet_file, svg_files):
+    """Patch the changed symbols into the combined sheet, or rebuild it if needed.
+    
+    Both keep the layout settings the sheet was built with, as recorded in
+    its index.
+    """
+    import combine_svgs
+    
+    settings = combine_svgs.index_settings(sheet_file)
+    options = {key: settings[key] for key in ('columns', 'spacing', 'layout', 'dedupe') if key in settings}
+    patched = combine_svgs.patch_sheet(svg_files, sheet_file, **options) if Path(sheet_file).exists() else None
+    if patched is not None:
+        for name in patched:
+            _say(f"🧩 Patched {name} in {sheet_file}")
+        return
+    
+    # A symbol was added or changed size, so the sheet has to be re-flowed
+    combine_svgs.combine(svg_files, sheet_file, stream=settings.get('stream', False), **options)
+    _say(f"🗺️  Rebuilt {sheet_file} ({len(svg_files)} symbols)")
+
+def _included_files(verilog_file):
+    """Include files the preprocessor reads for a Verilog file, with their file_stamp()."""
+    try:
+        with open(verilog_file, 'r') as f:
+            _preprocessor.process(f.read(), verilog_file)
+    except (OSError, ValueError):
+        return {}
+    # Already reported by the conversion
+    _preprocessor.warnings.clear()
+    return dict(_preprocessor.included)
+
+def watch_directory(directory_path, output_dir=None, sheet_file=None, interval=0.5, all_modules=False,
+                    compact=False, recursive=False, include=None, exclude=None, pin_layout='fixed'):
+    """Regenerate symbols for Verilog files as they change, until interrupted.
+    
+    The directory is polled every interval seconds and only files whose
+    modification time changed are re-parsed. With a sheet_file, each new
+    symbol is patched into the combined sheet of every symbol below the
+    output directory in place through its index (see
+    combine_svgs.patch_sheet), keeping the sheet's layout settings; the
+    sheet is only rebuilt when a symbol is added or changes size.
+    recursive, include, exclude, compact and pin_layout are as in
+    process_directory(). Progress lines follow the output mode (see
+    set_output_mode).
+    
+    With preprocessing on, the `include files each Verilog file reads are
+    watched too, and an edited header regenerates the files including it.
+    """
+    dir_path = Path(directory_path)
+    seen = _verilog_mtimes(dir_path, recursive, include, exclude)
+    headers = {}
+    if _preprocessor is not None:
+        from verilog_preprocess import file_stamp
+        headers = {verilog_file: _included_files(verilog_file) for verilog_file in seen}
+    svg_root = output_dir or dir_path
+    _say(f"👀 Watching '{directory_path}' for changes every {interval}s (Ctrl+C to stop)")
+    
+    try:
+        while True:
+            time.sleep(interval)
+            current = _verilog_mtimes(dir_path, recursive, include, exclude)
+            changed = {f for f, mtime in current.items() if seen.get(f) != mtime}
+            seen = current
+            
+            # Files whose include files changed, each header checked once
+            stamps = {}
+            for verilog_file, included in headers.items():
+                if verilog_file in current and any(
+                        stamps.setdefault(header, file_stamp(header)) != stamp
+                        for header, stamp in included.items()):
+                    changed.add(verilog_file)
+            
+            for verilog_file in sorted(changed):
+                start = time.perf_counter()
+                output = _output_target(verilog_file, output_dir, all_modules, dir_path)
+                _say(f"\n{'─'*70}", f"Changed: {verilog_file.name}", f"{'─'*70}")
+                
+                written = _convert((str(verilog_file), str(output), False, all_modules, compact, pin_layout))
+                if _preprocessor is not None:
+                    headers[verilog_file] = _included_files(verilog_file)
+                if written and sheet_file:
+                    try:
+                        _update_sheet(sheet_file, _sheet_symbols(svg_root, sheet_file, recursive, exclude))
+                    except (OSError, ValueError) as e:
+                        print(f"Error updating {sheet_file}: {e}")
+                _say(f"⏱️  Updated in {(time.perf_counter() - start) * 1e3:.0f} ms")
+    except KeyboardInterrupt:
+        _say("\nStopped watching")
+    return True
+
+def main(argv=None, prog=None):
     parser = argparse.ArgumentParser(
+        prog=prog,
         description='Generate SVG block symbol from Verilog module(s)',
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
@@ -484,6 +2171,40 @@ Examples:
   # Process directory with custom output location
   %(prog)s -d ./verilog_files/ -o ./svg_output/
   
+  # Write one symbol per module of a multi-module netlist
+  %(prog)s adc/verilog/ns_sar.v --all-modules -o ./svg_output/
+  
+  # The whole tree in one run, skipping testbenches and deprecated code
+  %(prog)s -d . -r --exclude 'tb_*' --exclude deprecated -o ./svg_output/
+  
+  # Process directory using 8 worker processes
+  %(prog)s -d ./verilog_files/ --jobs 8
+  
+  # Only regenerate symbols whose Verilog changed since the last run
+  %(prog)s -d ./verilog_files/ -o ./svg_output/ --cache
+  
+  # Keep symbols and the combined sheet up to date while editing
+  %(prog)s -d ./verilog_files/ -o docs/images/ --watch --sheet docs/images/combined_diagrams.svg
+  
+  # Find where the time goes: per-stage summary plus a Chrome trace
+  %(prog)s -d ./verilog_files/ --profile trace.json
+  
+  # Prefetch 16 files and write symbols in the background (slow network disks)
+  %(prog)s -d ./verilog_files/ -o ./svg_output/ --read-ahead 16 --write-behind 16
+  
+  # Smaller symbols sharing one pin definition (<symbol>/<use> and CSS)
+  %(prog)s -d ./verilog_files/ -o ./svg_output/ --compact
+  
+  # Pins grouped by the port list's "// ... Section" comments, sized to the labels
+  %(prog)s source/TLM.v --pin-layout grouped --compact
+  
+  # CI logs: no per-port lines, one JSON record per module to a file
+  %(prog)s -d ./verilog_files/ -o ./svg_output/ --json symbols.jsonl
+  
+  # Evaluate `ifdef blocks and macros the way the simulator sees them
+  %(prog)s adc/verilog/ns_sar.v -m -o ./svg_output/ -D XCELIUM
+  %(prog)s -d source/ -o ./svg_output/ -D ENABLE_REGISTER_CRC -I include/
+  
   # Enable debug mode
   %(prog)s module.v --debug
         """
@@ -494,20 +2215,127 @@ Examples:
     parser.add_argument('-d', '--directory', help='Process all .v and .sv files in this directory')
     parser.add_argument('-o', '--output', help='Output SVG file or directory (default: same location as input with _symbol.svg suffix)')
     parser.add_argument('--debug', action='store_true', help='Enable debug output')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='Skip module banners, per-port lines and progress messages; '
+                             'only errors, warnings and the SUMMARY are printed')
+    parser.add_argument('--json', nargs='?', const='-', metavar='FILE',
+                        help='Write one JSON record per module (file, module, port counts, output, '
+                             'parse_ms, render_ms) to FILE as JSON lines, or to stdout with the other '
+                             'console output moved to stderr; implies --quiet')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Also process the subdirectories of -d (hidden ones skipped); with -o, '
+                             'symbols keep their subdirectory below the output directory')
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                        help='Only process files matching GLOB, e.g. "dig_*.v" (repeatable; matched '
+                             'against the path below -d when it contains a /; default: *.v and *.sv)')
+    parser.add_argument('--exclude', action='append', metavar='GLOB',
+                        help='Skip files and, with -r, directories matching GLOB, e.g. "tb_*" (repeatable)')
+    parser.add_argument('-m', '--all-modules', action='store_true',
+                        help='Write one <module>_symbol.svg per module in each file; -o is then an output directory')
+    parser.add_argument('-D', '--define', action='append', metavar='NAME[=VALUE]',
+                        help='Define a macro for the preprocessor (repeatable; enables preprocessing)')
+    parser.add_argument('-I', '--include-dir', action='append', metavar='DIR',
+                        help='Search DIR for `include files (repeatable; enables preprocessing)')
+    parser.add_argument('--preprocess', action='store_true',
+                        help='Expand `define/`ifdef/`include before parsing (see verilog_preprocess.py), '
+                             'even without -D/-I; off by default, so every `ifdef branch is parsed')
+    parser.add_argument('--compact', action='store_true',
+                        help='Draw pins as <use> references to shared <symbol> definitions styled '
+                             'with CSS classes (about 3x smaller for wide modules)')
+    parser.add_argument('--pin-layout', choices=PIN_LAYOUTS, default='fixed',
+                        help='fixed: pins spread evenly over a 350px block (default); grouped: pins '
+                             'grouped under the comment headings of the port list, with the block '
+                             'and margins sized to the labels')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of worker processes for directory mode (0 = one per CPU, default: 1)')
+    parser.add_argument('--read-ahead', type=int, default=0, metavar='N',
+                        help='In a sequential directory run, read up to N files ahead in background '
+                             'threads while parsing (default: 0, no prefetch)')
+    parser.add_argument('--write-behind', type=int, default=0, metavar='N',
+                        help='In a sequential directory run, queue up to N rendered symbols for a '
+                             'background writer thread (default: 0, or 1 with --read-ahead)')
+    parser.add_argument('--cache', nargs='?', const='', metavar='FILE',
+                        help=f'Skip unchanged files in directory mode using a content-hash cache '
+                             f'(default file: {CACHE_FILENAME} in the output directory)')
+    
+    parser.add_argument('--watch', action='store_true',
+                        help='After processing the directory, keep regenerating symbols of changed files')
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help='Polling interval in seconds for --watch (default: 0.5)')
+    parser.add_argument('--sheet', metavar='FILE',
+                        help='Combined sheet (see combine_svgs.py) to patch in place in --watch mode')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help='Print wall time and net change in live memory blocks per stage (read, parse, render '
+                             'including the file write, print); FILE.json saves a Chrome trace, any other FILE cProfile '
+                             'statistics. Directory runs are sequential while profiling')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Check if we have either input file or directory
     if not args.input and not args.directory:
         parser.error("Either provide an input file or use -d/--directory option")
     
+    if args.watch and not args.directory:
+        parser.error("--watch requires -d/--directory")
+    
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or a positive number")
+    if args.read_ahead < 0 or args.write_behind < 0:
+        parser.error("--read-ahead and --write-behind must be 0 or positive numbers")
+    jobs = args.jobs or os.cpu_count() or 1
+    
+    # JSON records to stdout move the rest of the console output to stderr
+    with contextlib.ExitStack() as stack:
+        if args.json == '-':
+            record_out = sys.stdout
+            stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        elif args.json:
+            record_out = stack.enter_context(open(args.json, 'w'))
+        else:
+            record_out = None
+        set_output_mode(args.quiet, record_out)
+        if args.preprocess or args.define or args.include_dir:
+            from verilog_preprocess import parse_defines
+            enable_preprocessing(parse_defines(args.define), args.include_dir)
+        
+        if args.profile is not None:
+            enable_profiling(args.profile)
+        try:
+            _run(args, jobs)
+        finally:
+            set_output_mode()
+            enable_preprocessing(False)
+            if args.profile is not None:
+                if _profiler is not None and not args.directory:
+                    _profiler.print_summary()
+                finish_profiling(args.profile)
+
+def _run(args, jobs):
+    """Run the conversion selected by the parsed command-line arguments."""
     # Directory mode
     if args.directory:
-        if not process_directory(args.directory, args.output, args.debug):
+        cache_file = None
+        if args.cache is not None:
+            cache_file = args.cache or str(Path(args.output or args.directory) / CACHE_FILENAME)
+        ok = process_directory(args.directory, args.output, args.debug, jobs, cache_file,
+                               args.all_modules, args.compact, args.read_ahead, args.write_behind,
+                               args.recursive, args.include, args.exclude, args.pin_layout)
+        if args.watch:
+            if args.sheet and not Path(args.sheet).exists():
+                import combine_svgs
+                combine_svgs.combine(_sheet_symbols(args.output or args.directory, args.sheet, args.recursive,
+                                                    args.exclude), args.sheet)
+            watch_directory(args.directory, args.output, args.sheet, args.interval, args.all_modules,
+                            args.compact, args.recursive, args.include, args.exclude, args.pin_layout)
+        elif not ok:
+            sys.exit(1)
+    # Single file, one symbol per module
+    elif args.all_modules:
+        if not verilog_modules_to_svg(args.input, args.output, args.debug, args.compact, args.pin_layout):
             sys.exit(1)
     # Single file mode
     else:
-        if not verilog_to_svg(args.input, args.output, args.debug):
+        if not verilog_to_svg(args.input, args.output, args.debug, args.compact, args.pin_layout):
             sys.exit(1)
 
 if __name__ == '__main__':